@@ -0,0 +1 @@
+"""Offline benchmarks of the research pipeline, see run_benchmarks.py"""
@@ -0,0 +1,72 @@
+"""
+Compare two benchmark result files and flag the regressions.
+
+Works with the output of both microbenchmarks.py (median_ms of each parameter combination)
+and run_benchmarks.py (mean_seconds of each scenario). A result is a regression when the
+current time is more than threshold (default 10%) above the baseline. The exit status is 1
+when there is a regression, so the script can fail a CI job.
+
+    python -m benchmarks.compare_results baseline.json current.json --threshold 0.15
+"""
+import argparse
+import json
+import sys
+
+
+def _flatten(results):
+    """{name: milliseconds} for every benchmark result that was not skipped"""
+    timings = {}
+    for benchmark, benchmark_results in results.get("results", {}).items():
+        for result in benchmark_results:
+            if "median_ms" in result:
+                params = ",".join(f"{key}={value}" for key, value in result["params"].items())
+                timings[f"{benchmark}[{params}]"] = result["median_ms"]
+    for scenario, result in results.get("scenarios", {}).items():
+        if "mean_seconds" in result:
+            timings[scenario] = result["mean_seconds"] * 1000
+    return timings
+
+
+def compare_results(baseline, current, threshold=0.10):
+    """A row per benchmark in both files: (name, baseline_ms, current_ms, change, status)"""
+    baseline_timings = _flatten(baseline)
+    current_timings = _flatten(current)
+    rows = []
+    for name, baseline_ms in baseline_timings.items():
+        if name not in current_timings:
+            continue
+        current_ms = current_timings[name]
+        change = (current_ms - baseline_ms) / baseline_ms if baseline_ms else 0.0
+        if change > threshold:
+            status = "REGRESSION"
+        elif change < -threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append((name, baseline_ms, current_ms, change, status))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag regressions between two benchmark runs")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10, help="0.10 flags a 10%% slowdown")
+    args = parser.parse_args()
+
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    with open(args.current, "r", encoding="utf-8") as file:
+        current = json.load(file)
+
+    rows = compare_results(baseline, current, args.threshold)
+    for name, baseline_ms, current_ms, change, status in rows:
+        print(f"{status:<10} {change:>+8.1%}  {baseline_ms:>10.2f} -> {current_ms:>10.2f} ms  {name}")
+
+    regressions = [row for row in rows if row[4] == "REGRESSION"]
+    print(f"\n{len(rows)} compared, {len(regressions)} regressions above {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+A synthetic document corpus and a local HTTP server for the offline benchmarks.
+
+`build_corpus` writes the same documents in three forms:
+    docs/<id>.html   scraped by web_scraper, every fifth document is a PDF instead
+    docs/<id>.pdf    scraped by pdf_scraper
+    local_store/<id>.txt  loaded by the LOCAL_STORE vector store
+
+`CorpusServer` serves the corpus directory on 127.0.0.1, `fake_search` in
+internet_search.py returns URLs that point to it.
+
+    corpus_dir = build_corpus("/tmp/corpus")
+    with CorpusServer(corpus_dir) as corpus_server:
+        os.environ["FAKE_SEARCH_URL"] = corpus_server.url
+"""
+import functools
+import html
+import os
+import random
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_analyst.chat_models.fake import WORDS
+
+DOCS_DIR_NM = "docs"
+LOCAL_STORE_DIR_NM = "local_store"
+
+
+def get_document_text(doc_id, word_count):
+    """Paragraphs of words from the FAKE_Model vocabulary, so queries find similar chunks"""
+    rng = random.Random(doc_id)
+    paragraphs = []
+    while word_count > 0:
+        paragraph_words = min(word_count, rng.randint(60, 120))
+        paragraphs.append(" ".join(rng.choices(WORDS, k=paragraph_words)) + ".")
+        word_count -= paragraph_words
+    return paragraphs
+
+
+def _get_html(doc_id, paragraphs):
+    body = "\n".join(f"<p>{html.escape(paragraph)}</p>" for paragraph in paragraphs)
+    return (
+        f"<html><head><title>Document {doc_id}</title></head>"
+        f"<body><h1>Document {doc_id}</h1>\n{body}\n</body></html>"
+    )
+
+
+def _escape_pdf_text(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def get_pdf(paragraphs, line_length=90, lines_per_page=50):
+    """A minimal PDF 1.4 file with the paragraphs as Helvetica text, one page per 50 lines"""
+    lines = []
+    for paragraph in paragraphs:
+        words = paragraph.split()
+        line = ""
+        for word in words:
+            if len(line) + len(word) + 1 > line_length:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}".strip()
+        lines.append(line)
+    pages = [lines[start : start + lines_per_page] for start in range(0, len(lines), lines_per_page)]
+
+    # Objects 1 catalog, 2 pages, 3 font, then a page and a content stream per page
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for page_lines in pages:
+        text = "".join(f"({_escape_pdf_text(line)}) Tj T* " for line in page_lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 760 Td {text}ET".encode("latin-1")
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % page_ref for page_ref in page_refs),
+        len(page_refs),
+    )
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for object_number, pdf_object in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (object_number, pdf_object)
+    xref_offset = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        pdf += b"%010d 00000 n \n" % offset
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref_offset,
+    )
+    return bytes(pdf)
+
+
+def build_corpus(corpus_dir, doc_count=50, words_per_doc=1500):
+    """Write doc_count synthetic documents to corpus_dir, existing files are rewritten"""
+    docs_dir = os.path.join(corpus_dir, DOCS_DIR_NM)
+    local_store_dir = os.path.join(corpus_dir, LOCAL_STORE_DIR_NM)
+    os.makedirs(docs_dir, exist_ok=True)
+    os.makedirs(local_store_dir, exist_ok=True)
+
+    for doc_id in range(doc_count):
+        paragraphs = get_document_text(doc_id, words_per_doc)
+        # Matches the file fake_search links to
+        if doc_id % 5 == 4:
+            with open(os.path.join(docs_dir, f"{doc_id}.pdf"), "wb") as file:
+                file.write(get_pdf(paragraphs))
+        else:
+            with open(os.path.join(docs_dir, f"{doc_id}.html"), "w", encoding="utf-8") as file:
+                file.write(_get_html(doc_id, paragraphs))
+        with open(os.path.join(local_store_dir, f"{doc_id}.txt"), "w", encoding="utf-8") as file:
+            file.write("\n\n".join(paragraphs))
+    return corpus_dir
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class CorpusServer:
+    """Serves corpus_dir at http://127.0.0.1:<port> from a daemon thread, port 0 picks a free port"""
+
+    def __init__(self, corpus_dir, port=0):
+        handler = functools.partial(_QuietHandler, directory=corpus_dir)
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
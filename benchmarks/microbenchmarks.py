@@ -0,0 +1,233 @@
+"""
+Microbenchmarks of the hot paths, with scaling curves over generated corpora.
+
+    context_compressor  ContextCompressor.get_context            pages x chunk_size x sub_queries
+    vector_store        VectorStore.retrieve_docs_for_query      index_size x k
+    document_loader     DocumentLoader.load_local_documents      files x format
+
+Embeddings are HashEmbeddings, so nothing is downloaded and no request leaves the machine.
+A benchmark whose dependencies are not installed (Chroma for the vector store, a loader
+backend for a file format) is recorded as skipped.
+
+    python -m benchmarks.microbenchmarks --output micro_baseline.json
+    python -m benchmarks.microbenchmarks --quick --benchmarks context_compressor
+    python -m benchmarks.compare_results micro_baseline.json micro_current.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus_server import get_document_text, get_pdf
+from llm_analyst.chat_models.fake import WORDS
+
+BENCHMARKS = ("context_compressor", "vector_store", "document_loader")
+
+GRIDS = {
+    "context_compressor": {
+        "pages": (5, 20, 50),
+        "chunk_size": (500, 1000, 2000),
+        "sub_queries": (1, 4),
+    },
+    "vector_store": {"index_size": (100, 1000, 5000), "k": (4, 16)},
+    "document_loader": {"files": (10, 50, 200), "format": ("txt", "md", "csv", "pdf", "docx")},
+}
+QUICK_GRIDS = {
+    "context_compressor": {"pages": (5, 20), "chunk_size": (1000,), "sub_queries": (1, 4)},
+    "vector_store": {"index_size": (100, 500), "k": (4,)},
+    "document_loader": {"files": (10,), "format": ("txt", "pdf")},
+}
+WORDS_PER_PAGE = 1500
+
+
+def _get_queries(count):
+    return [" ".join(WORDS[(index * 5 + offset) % len(WORDS)] for offset in range(4)) for index in range(count)]
+
+
+def _time_it(run, repeats):
+    """Median and min of repeats calls of run, in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start_time) * 1000)
+    return {"median_ms": statistics.median(timings), "min_ms": min(timings), "repeats": repeats}
+
+
+def _get_pages(page_count):
+    return [
+        {
+            "url": f"https://example.com/docs/{doc_id}",
+            "raw_content": "\n\n".join(get_document_text(doc_id, WORDS_PER_PAGE)),
+        }
+        for doc_id in range(page_count)
+    ]
+
+
+def bench_context_compressor(params, repeats, work_dir):
+    """One ContextCompressor per sub-query over the same pages, in threads, as the analyst does"""
+    from llm_analyst.embedding_methods.compressor import ContextCompressor
+    from llm_analyst.embedding_methods.hash_embeddings import HashEmbeddings
+
+    embeddings = HashEmbeddings()
+    pages = _get_pages(params["pages"])
+    queries = _get_queries(params["sub_queries"])
+
+    async def compress_all():
+        return await asyncio.gather(
+            *[
+                asyncio.to_thread(
+                    ContextCompressor(
+                        documents=pages, embeddings=embeddings, chunk_size=params["chunk_size"]
+                    ).get_context,
+                    query,
+                    8,
+                )
+                for query in queries
+            ]
+        )
+
+    return _time_it(lambda: asyncio.run(compress_all()), repeats)
+
+
+def bench_vector_store(params, repeats, work_dir):
+    """The query time of a Chroma index of index_size 1000 character chunks"""
+    from llm_analyst.documents.vector_store import VectorStore
+    from llm_analyst.embedding_methods.hash_embeddings import HashEmbeddings
+
+    # Chunks are 1000 characters, roughly 150 words
+    local_data_dir = os.path.join(work_dir, f"vector_store_{params['index_size']}")
+    if not os.path.isdir(local_data_dir):
+        os.makedirs(local_data_dir)
+        chunks_per_file = 10
+        for doc_id in range(0, params["index_size"], chunks_per_file):
+            with open(os.path.join(local_data_dir, f"{doc_id}.txt"), "w", encoding="utf-8") as file:
+                file.write("\n\n".join(get_document_text(doc_id, 150 * chunks_per_file)))
+
+    build_start = time.perf_counter()
+    vector_store = asyncio.run(
+        VectorStore.create(
+            os.path.join(local_data_dir, "cache"),
+            local_data_dir,
+            embedding_function=HashEmbeddings(),
+        )
+    )
+    build_ms = (time.perf_counter() - build_start) * 1000
+    queries = _get_queries(8)
+
+    async def retrieve_all():
+        for query in queries:
+            await vector_store.retrieve_docs_for_query(query, max_docs=params["k"])
+
+    result = _time_it(lambda: asyncio.run(retrieve_all()), repeats)
+    result["build_ms"] = build_ms
+    result["queries"] = len(queries)
+    return result
+
+
+def _write_file(file_path, file_format, doc_id):
+    paragraphs = get_document_text(doc_id, WORDS_PER_PAGE)
+    match file_format:
+        case "txt":
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write("\n\n".join(paragraphs))
+        case "md":
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write(f"# Document {doc_id}\n\n" + "\n\n".join(paragraphs))
+        case "csv":
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write("paragraph,text\n")
+                file.writelines(f'{index},"{paragraph}"\n' for index, paragraph in enumerate(paragraphs))
+        case "pdf":
+            with open(file_path, "wb") as file:
+                file.write(get_pdf(paragraphs))
+        case "docx":
+            import docx
+
+            document = docx.Document()
+            document.add_heading(f"Document {doc_id}")
+            for paragraph in paragraphs:
+                document.add_paragraph(paragraph)
+            document.save(file_path)
+
+
+def bench_document_loader(params, repeats, work_dir):
+    from llm_analyst.documents.document import DocumentLoader
+
+    file_format = params["format"]
+    local_data_dir = os.path.join(work_dir, f"document_loader_{file_format}_{params['files']}")
+    if not os.path.isdir(local_data_dir):
+        os.makedirs(local_data_dir)
+        for doc_id in range(params["files"]):
+            _write_file(os.path.join(local_data_dir, f"{doc_id}.{file_format}"), file_format, doc_id)
+
+    document_loader = DocumentLoader(local_data_dir)
+    # The loader prints the files it failed to load
+    with contextlib.redirect_stdout(io.StringIO()):
+        documents = asyncio.run(document_loader.load_local_documents())
+        if not documents:
+            return {"skipped": f"No {file_format} documents loaded, is the loader backend installed?"}
+        result = _time_it(lambda: asyncio.run(document_loader.load_local_documents()), repeats)
+    result["documents"] = len(documents)
+    return result
+
+
+BENCHMARK_FUNCTIONS = {
+    "context_compressor": bench_context_compressor,
+    "vector_store": bench_vector_store,
+    "document_loader": bench_document_loader,
+}
+
+
+def run_microbenchmarks(benchmarks=BENCHMARKS, repeats=3, quick=False):
+    """Run each benchmark for every combination of its grid parameters"""
+    grids = QUICK_GRIDS if quick else GRIDS
+    results = {
+        "settings": {"repeats": repeats, "quick": quick, "python": sys.version.split()[0]},
+        "results": {},
+    }
+    work_dir = tempfile.mkdtemp(prefix="microbenchmarks-")
+    for benchmark in benchmarks:
+        grid = grids[benchmark]
+        benchmark_results = []
+        for values in itertools.product(*grid.values()):
+            params = dict(zip(grid.keys(), values))
+            try:
+                result = BENCHMARK_FUNCTIONS[benchmark](params, repeats, work_dir)
+            except ImportError as e:
+                result = {"skipped": f"Missing dependency: {e}"}
+            benchmark_results.append({"params": params, **result})
+            print(f"{benchmark:<20} {json.dumps(params):<60} {_format_result(result)}")
+        results["results"][benchmark] = benchmark_results
+    return results
+
+
+def _format_result(result):
+    if "skipped" in result:
+        return f"skipped: {result['skipped']}"
+    return f"median {result['median_ms']:>10.2f} ms  min {result['min_ms']:>10.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the llm_analyst hot paths")
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="a small grid for a fast check")
+    parser.add_argument("--output", help="write the results to this json file")
+    args = parser.parse_args()
+
+    results = run_microbenchmarks(args.benchmarks, repeats=args.repeats, quick=args.quick)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
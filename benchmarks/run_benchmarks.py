@@ -0,0 +1,305 @@
+"""
+Offline end-to-end benchmarks of the research pipeline.
+
+Every run uses the FAKE_Model chat model, fake_search, HashEmbeddings and a local corpus
+server, and non-local network connections are refused, so the results are reproducible
+and only measure the pipeline itself. Each scenario runs in its own process so that its
+peak RSS is not inflated by the scenarios before it.
+
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --runs 5 --llm-latency 0.5 --scenarios research_report
+    python -m benchmarks.run_benchmarks --warmup 0   # include the first run and its lazy imports
+    python -m benchmarks.run_benchmarks --output benchmark_results.json
+
+Reported per scenario:
+    seconds      end-to-end time of each run, and the mean, median and min
+    stages       time per tracing span name (choose_agent, search, scrape_url, compress, ...)
+    totals       LLM requests and tokens, searches, scrapes and bytes, embedded chunks per run
+    throughput   runs per minute, scraped MB and LLM tokens per second
+    peak_rss_mb  peak resident memory of the scenario process
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.corpus_server import LOCAL_STORE_DIR_NM, CorpusServer, build_corpus
+
+SCENARIOS = ("research_report", "detailed_report", "local_store", "select_urls")
+RESEARCH_TOPIC = "The impact of microplastics on marine ecosystems"
+LOCAL_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def _block_network():
+    """Refuse connections to anything but the local corpus server"""
+    socket_connect = socket.socket.connect
+
+    def connect(sock, address):
+        if sock.family in (socket.AF_INET, socket.AF_INET6) and address[0] not in LOCAL_HOSTS:
+            raise OSError(f"Network access is disabled in the benchmarks [{address}]")
+        return socket_connect(sock, address)
+
+    socket.socket.connect = connect
+
+
+def _get_peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024
+
+
+def _get_config(settings, scenario_dir):
+    from llm_analyst.core.config import Config
+
+    config = Config()
+    config.set_values_for_config(
+        {
+            "llm_provider": "fake",
+            "llm_model": "fake-model",
+            "internet_search": "fake_search",
+            "embedding_provider": "hash",
+            "local_store_embedding_provider": "hash",
+            "local_store_dir": os.path.join(settings["corpus_dir"], LOCAL_STORE_DIR_NM),
+            "cache_dir": os.path.join(scenario_dir, "cache"),
+            "report_out_dir": os.path.join(scenario_dir, "reports"),
+            "checkpoint_dir": "",
+            # The client side rate limits are meant for a real provider, they would dominate the timings
+            "llm_requests_per_minute": 0,
+            "llm_tokens_per_minute": 0,
+            "trace_file": "",
+            "metrics_port": "",
+        }
+    )
+    return config
+
+
+async def _run_research(scenario, config, settings):
+    """One research run, returns its run_id"""
+    from llm_analyst.core.config import DataSource, ReportType
+    from llm_analyst.core.research_analyst import LLMAnalyst
+    from llm_analyst.core.research_editor import LLMEditor
+
+    if scenario == "detailed_report":
+        llm_editor = LLMEditor(
+            active_research_topic=RESEARCH_TOPIC,
+            report_type=ReportType.DETAILED_REPORT,
+            config=config,
+        )
+        await llm_editor.create_detailed_report()
+        return llm_editor.run_id
+
+    match scenario:
+        case "local_store":
+            data_source = DataSource.LOCAL_STORE
+        case "select_urls":
+            data_source = DataSource.SELECT_URLS
+        case _:
+            data_source = DataSource.WEB
+    llm_analyst = LLMAnalyst(
+        active_research_topic=RESEARCH_TOPIC,
+        report_type=ReportType.RESEARCH_REPORT,
+        data_source=data_source,
+        custom_search_urls=settings["custom_search_urls"],
+        config=config,
+    )
+    await llm_analyst.conduct_research()
+    await llm_analyst.write_report()
+    return llm_analyst.run_id
+
+
+def _sum_counter(metrics_snapshot, name):
+    return sum(sample["value"] for sample in metrics_snapshot["counters"].get(name, []))
+
+
+def run_scenario(scenario, settings):
+    """Run one scenario settings["runs"] times, in the scenario process"""
+    if not settings["allow_network"]:
+        _block_network()
+    os.environ["FAKE_SEARCH_URL"] = settings["corpus_url"]
+    os.environ["FAKE_SEARCH_CORPUS_SIZE"] = str(settings["corpus_size"])
+    os.environ["FAKE_SEARCH_LATENCY"] = str(settings["search_latency"])
+    os.environ["FAKE_LLM_LATENCY"] = str(settings["llm_latency"])
+
+    if scenario == "local_store":
+        try:
+            import langchain_chroma  # noqa: F401
+        except ImportError as e:
+            return {"skipped": f"LOCAL_STORE needs the vector store dependencies: {e}"}
+
+    from llm_analyst.utils import metrics
+    from llm_analyst.utils.tracing import TRACER
+
+    finished_spans = []
+    TRACER.add_exporter(finished_spans.append)
+    scenario_dir = tempfile.mkdtemp(prefix=f"benchmark-{scenario}-")
+    config = _get_config(settings, scenario_dir)
+
+    # The analyst prints the report as it is streamed
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        # Warmup runs load the lazily imported scrapers, loaders and embeddings
+        for _ in range(settings["warmup"]):
+            asyncio.run(_run_research(scenario, config, settings))
+        finished_spans.clear()
+
+        run_ids = []
+        run_seconds = []
+        for _ in range(settings["runs"]):
+            start_time = time.perf_counter()
+            run_ids.append(asyncio.run(_run_research(scenario, config, settings)))
+            run_seconds.append(time.perf_counter() - start_time)
+
+    run_totals = []
+    for run_id in run_ids:
+        run_metrics = metrics.get_metrics(run_id)
+        run_totals.append(
+            {
+                "llm_requests": _sum_counter(run_metrics, "llm_requests_total"),
+                "llm_input_tokens": _sum_counter(run_metrics, "llm_input_tokens_total"),
+                "llm_output_tokens": _sum_counter(run_metrics, "llm_output_tokens_total"),
+                "searches": _sum_counter(run_metrics, "search_queries_total"),
+                "scrapes": _sum_counter(run_metrics, "scrape_requests_total"),
+                "scrape_bytes": _sum_counter(run_metrics, "scrape_bytes_total"),
+                "embedded_chunks": _sum_counter(run_metrics, "embedding_chunks_total"),
+            }
+        )
+
+    stages = {}
+    for finished_span in finished_spans:
+        stage = stages.setdefault(finished_span.name, {"count": 0, "total_ms": 0.0})
+        stage["count"] += 1
+        stage["total_ms"] += finished_span.duration_ms
+    for stage in stages.values():
+        stage["mean_ms"] = stage["total_ms"] / stage["count"]
+        stage["count"] /= settings["runs"]
+        stage["total_ms"] /= settings["runs"]
+
+    totals = {
+        key: statistics.mean(run_total[key] for run_total in run_totals)
+        for key in run_totals[0]
+    }
+    mean_seconds = statistics.mean(run_seconds)
+    return {
+        "seconds": run_seconds,
+        "mean_seconds": mean_seconds,
+        "median_seconds": statistics.median(run_seconds),
+        "min_seconds": min(run_seconds),
+        "stages": dict(sorted(stages.items(), key=lambda item: -item[1]["total_ms"])),
+        "totals": totals,
+        "throughput": {
+            "runs_per_minute": 60 / mean_seconds,
+            "scrape_mb_per_second": totals["scrape_bytes"] / (1024 * 1024) / mean_seconds,
+            "llm_tokens_per_second": (
+                totals["llm_input_tokens"] + totals["llm_output_tokens"]
+            ) / mean_seconds,
+        },
+        "peak_rss_mb": _get_peak_rss_mb(),
+    }
+
+
+def run_benchmarks(
+    scenarios=SCENARIOS,
+    runs=3,
+    warmup=1,
+    corpus_size=50,
+    llm_latency=0.0,
+    search_latency=0.0,
+    allow_network=False,
+):
+    """Run each scenario in a fresh process against a local corpus server"""
+    corpus_dir = build_corpus(tempfile.mkdtemp(prefix="benchmark-corpus-"), corpus_size)
+    results = {
+        "settings": {
+            "runs": runs,
+            "warmup": warmup,
+            "corpus_size": corpus_size,
+            "llm_latency": llm_latency,
+            "search_latency": search_latency,
+            "python": sys.version.split()[0],
+        },
+        "scenarios": {},
+    }
+    with CorpusServer(corpus_dir) as corpus_server:
+        settings = {
+            **results["settings"],
+            "corpus_dir": corpus_dir,
+            "corpus_url": corpus_server.url,
+            "allow_network": allow_network,
+            "custom_search_urls": [
+                f"{corpus_server.url}/docs/{doc_id}.html"
+                for doc_id in range(corpus_size)
+                if doc_id % 5 != 4
+            ][:10],
+        }
+        spawn_context = multiprocessing.get_context("spawn")
+        for scenario in scenarios:
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn_context) as executor:
+                results["scenarios"][scenario] = executor.submit(
+                    run_scenario, scenario, settings
+                ).result()
+    return results
+
+
+def print_results(results):
+    for scenario, result in results["scenarios"].items():
+        print(f"\n{scenario}")
+        if "skipped" in result:
+            print(f"  skipped: {result['skipped']}")
+            continue
+        print(
+            f"  seconds      mean {result['mean_seconds']:.3f}  median {result['median_seconds']:.3f}"
+            f"  min {result['min_seconds']:.3f}"
+        )
+        print(f"  peak_rss_mb  {result['peak_rss_mb']:.1f}")
+        for key, value in result["throughput"].items():
+            print(f"  {key:<22} {value:.2f}")
+        for key, value in result["totals"].items():
+            print(f"  {key:<22} {value:.0f}")
+        print("  stages (per run)")
+        for name, stage in result["stages"].items():
+            print(
+                f"    {name:<24} count {stage['count']:>6.1f}  total {stage['total_ms']:>9.1f} ms"
+                f"  mean {stage['mean_ms']:>8.1f} ms"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmarks of llm_analyst")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs before the timed runs")
+    parser.add_argument("--corpus-size", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per LLM request")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="seconds per search")
+    parser.add_argument("--allow-network", action="store_true")
+    parser.add_argument("--output", help="write the results to this json file")
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        scenarios=args.scenarios,
+        runs=args.runs,
+        warmup=args.warmup,
+        corpus_size=args.corpus_size,
+        llm_latency=args.llm_latency,
+        search_latency=args.search_latency,
+        allow_network=args.allow_network,
+    )
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
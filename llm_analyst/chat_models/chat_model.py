@@ -0,0 +1,139 @@
+"""
+This module provides `ChatModel`, the request path shared by the chat models.
+
+Every request is estimated for the `ChatScheduler` of its provider, coalesced with identical
+requests in flight through `SINGLE_FLIGHT`, traced as an `llm_call` span and counted by the
+metrics. A chat model only supplies the call to its client and the usage the client reports:
+    _ainvoke(messages, prompt_nm)       the response of the client
+    _get_content(output)                the text of that response
+    _get_usage(messages, output)        (input_tokens, output_tokens, total_tokens)
+    _astream(messages, prompt_nm)       the text of the response as it is generated
+The defaults call a langchain chat model in self.llm.
+
+NOTE: This module is not a chat model, so there is no CHAT_MODEL_Model for the
+"llm_provider" naming convention to pick up.
+"""
+import time
+
+from llm_analyst.chat_models.scheduler import ChatScheduler, estimate_tokens
+from llm_analyst.utils import metrics
+from llm_analyst.utils.single_flight import SINGLE_FLIGHT
+from llm_analyst.utils.tracing import span
+
+
+class ChatModel:
+    """Base class of the chat models, PROVIDER_NM names the provider in its scheduler and metrics"""
+
+    PROVIDER_NM = None
+    # get_chat_response(stream=True) prints each paragraph as it arrives
+    print_stream = True
+
+    def __init__(self, model, temperature, max_tokens, scheduler=None):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.scheduler = scheduler if scheduler else ChatScheduler.for_provider(self.PROVIDER_NM)
+
+    def _get_messages(self, llm_system_prompt, llm_user_prompt):
+        return [
+            {"role": "system", "content": llm_system_prompt},
+            {"role": "user", "content": f"task: {llm_user_prompt}"},
+        ]
+
+    def _ainvoke(self, messages, prompt_nm):
+        return self.llm.ainvoke(messages)
+
+    def _get_content(self, output):
+        return output.content
+
+    def _get_usage(self, messages, output):
+        usage = getattr(output, "usage_metadata", None) or {}
+        return (
+            usage.get("input_tokens", None),
+            usage.get("output_tokens", None),
+            usage.get("total_tokens", None),
+        )
+
+    async def _astream(self, messages, prompt_nm):
+        # Streaming the response using the chain astream method from langchain
+        async for chunk in self.llm.astream(messages):
+            if chunk.content:
+                yield chunk.content
+
+    async def get_chat_response(
+        self, llm_system_prompt, llm_user_prompt, stream=False, prompt_nm=None
+    ):
+        """prompt_nm labels the token metrics of the request"""
+        messages = self._get_messages(llm_system_prompt, llm_user_prompt)
+
+        response = ""
+        if not stream:
+            # Identical requests that are already in flight share the one response. prompt_nm
+            # is part of the request, FAKE_Model answers by it and the metrics are labelled by it.
+            request_key = (
+                type(self).__name__,
+                self.model,
+                self.temperature,
+                self.max_tokens,
+                prompt_nm,
+                llm_system_prompt,
+                llm_user_prompt,
+            )
+            response = await SINGLE_FLIGHT.ado(
+                request_key, lambda: self._get_response(messages, prompt_nm)
+            )
+        else:
+            response = await self._get_stream_response(messages, prompt_nm)
+
+        return response
+
+    async def _get_response(self, messages, prompt_nm=None):
+        estimated_tokens = estimate_tokens(messages, self.max_tokens)
+        with span("llm_call", model=self.model, prompt_nm=prompt_nm) as llm_span:
+            start_time = time.perf_counter()
+            output = await self.scheduler.run(
+                lambda: self._ainvoke(messages, prompt_nm), estimated_tokens
+            )
+            input_tokens, output_tokens, total_tokens = self._get_usage(messages, output)
+            self.scheduler.settle(estimated_tokens, total_tokens)
+            llm_span.set_attributes(input_tokens=input_tokens, output_tokens=output_tokens)
+            metrics.record_llm_call(
+                self.PROVIDER_NM,
+                self.model,
+                prompt_nm,
+                input_tokens,
+                output_tokens,
+                time.perf_counter() - start_time,
+            )
+            return self._get_content(output)
+
+    async def astream_chat_response(self, llm_system_prompt, llm_user_prompt, prompt_nm=None):
+        """Yield the response content as the model generates it"""
+        messages = self._get_messages(llm_system_prompt, llm_user_prompt)
+        async for content in self._astream_content(messages, prompt_nm):
+            yield content
+
+    async def _astream_content(self, messages, prompt_nm=None):
+        estimated_tokens = estimate_tokens(messages, self.max_tokens)
+        # Token usage is not reported when streaming, only the request is counted
+        metrics.record_llm_call(self.PROVIDER_NM, self.model, prompt_nm, None, None, None)
+
+        async for content in self.scheduler.stream(
+            lambda: self._astream(messages, prompt_nm),
+            estimated_tokens,
+            prompt_tokens=estimate_tokens(messages, 0),
+        ):
+            yield content
+
+    async def _get_stream_response(self, messages, prompt_nm=None):
+        paragraph = ""
+        response = ""
+
+        async for content in self._astream_content(messages, prompt_nm):
+            response += content
+            paragraph += content
+            if self.print_stream and "\n" in paragraph:
+                print(f"{paragraph}")
+                paragraph = ""
+
+        return response
@@ -0,0 +1,115 @@
+"""
+This module provides a deterministic chat model for offline benchmarks and tests.
+"llm_provider" :"fake" maps to this module and the `FAKE_Model` class.
+
+No request leaves the process. The response is built from the prompt_nm and a hash of the
+prompts, so the same research run always produces the same agent, sub-queries, subtopics
+and report. Requests still go through the `ChatModel` request path, the `ChatScheduler`,
+`SINGLE_FLIGHT` and the metrics, so a benchmark measures the same overhead as a real provider.
+
+Latency is set with environment variables:
+    FAKE_LLM_LATENCY            seconds added to every request (default 0)
+    FAKE_LLM_TOKENS_PER_SECOND  output rate, 0 returns the response at once (default 0)
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+
+from llm_analyst.chat_models.chat_model import ChatModel
+from llm_analyst.chat_models.scheduler import estimate_tokens
+
+WORDS = (
+    "analysis", "evidence", "method", "result", "study", "model", "sample", "signal",
+    "process", "system", "effect", "review", "trend", "measure", "source", "impact",
+    "network", "design", "factor", "outcome", "survey", "control", "context", "finding",
+)
+
+
+def _get_seed(*texts):
+    hasher = hashlib.sha256()
+    for text in texts:
+        hasher.update((text or "").encode("utf-8"))
+    return int(hasher.hexdigest()[:16], 16)
+
+
+def _get_words(seed, word_count):
+    return " ".join(random.Random(seed).choices(WORDS, k=word_count))
+
+
+class FAKE_Model(ChatModel):
+
+    PROVIDER_NM = "fake"
+    print_stream = False
+
+    def __init__(self, model, temperature, max_tokens, scheduler=None):
+        super().__init__(model, temperature, max_tokens, scheduler)
+        self.latency = float(os.getenv("FAKE_LLM_LATENCY", "0") or 0)
+        self.tokens_per_second = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "0") or 0)
+
+    def get_response_text(self, llm_system_prompt, llm_user_prompt, prompt_nm=None):
+        """The deterministic response for a request"""
+        seed = _get_seed(prompt_nm, llm_system_prompt, llm_user_prompt)
+        match prompt_nm:
+            case "choose_agent_prompt":
+                return json.dumps(
+                    {
+                        "agentType": "Benchmark Agent",
+                        "agentRole": "You are a research assistant that writes factual reports.",
+                    }
+                )
+            case "search_queries_prompt":
+                return json.dumps([f"{_get_words(seed + index, 3)} {index}" for index in range(3)])
+            case "subtopics_prompt":
+                return json.dumps([f"Subtopic {_get_words(seed + index, 2)}" for index in range(3)])
+            case "json_repair":
+                return "[]"
+            case "report_introduction":
+                return f"## Introduction\n\n{_get_words(seed, 120)}."
+            case _ if prompt_nm and prompt_nm.endswith("report_prompt"):
+                return self._get_report(seed)
+            case _:
+                return f"{_get_words(seed, 60)}."
+
+    def _get_report(self, seed):
+        # Roughly the max_tokens of the model, as a real report fills its token limit
+        word_count = max(50, min(int((self.max_tokens or 1000) * 0.75), 3000))
+        section_count = 4
+        sections = [f"# Report {_get_words(seed, 3)}"]
+        for index in range(section_count):
+            sections.append(f"## Section {index + 1} {_get_words(seed + index, 2)}")
+            sections.append(f"{_get_words(seed + index, word_count // section_count)}.")
+        sections.append("## References\n\n- https://example.com/reference")
+        return "\n\n".join(sections)
+
+    async def _generate(self, llm_system_prompt, llm_user_prompt, prompt_nm):
+        response = self.get_response_text(llm_system_prompt, llm_user_prompt, prompt_nm)
+        delay = self.latency
+        if self.tokens_per_second:
+            delay += estimate_tokens([{"content": response}], 0) / self.tokens_per_second
+        if delay:
+            await asyncio.sleep(delay)
+        return response
+
+    def _ainvoke(self, messages, prompt_nm):
+        llm_system_prompt, llm_user_prompt = self._get_prompts(messages)
+        return self._generate(llm_system_prompt, llm_user_prompt, prompt_nm)
+
+    def _get_content(self, output):
+        return output
+
+    def _get_usage(self, messages, output):
+        input_tokens = estimate_tokens(messages, 0)
+        output_tokens = estimate_tokens([{"content": output}], 0)
+        return input_tokens, output_tokens, input_tokens + output_tokens
+
+    async def _astream(self, messages, prompt_nm):
+        """The response one line at a time"""
+        response = await self._ainvoke(messages, prompt_nm)
+        for line in response.splitlines(keepends=True):
+            yield line
+
+    def _get_prompts(self, messages):
+        """(llm_system_prompt, llm_user_prompt) of the messages of _get_messages"""
+        return messages[0]["content"], messages[1]["content"].removeprefix("task: ")
@@ -7,12 +7,15 @@ https://groq.com/
 import os
 
 from langchain_groq import ChatGroq
+from llm_analyst.chat_models.chat_model import ChatModel
 from llm_analyst.core.exceptions import LLMAnalystsException
 
 
-class GROQ_Model:
+class GROQ_Model(ChatModel):
 
-    def __init__(self, model, temperature, max_tokens):
+    PROVIDER_NM = "groq"
+
+    def __init__(self, model, temperature, max_tokens, scheduler=None):
         try:
             api_key = os.environ["GROQ_API_KEY"]
         except:
@@ -20,36 +23,12 @@ class GROQ_Model:
                 "Groq API key not found. Please set the GROQ_API_KEY environment variable."
             )
 
+        # Retries are handled by the ChatScheduler so that they respect the provider limits
         self.llm = ChatGroq(
-            model=model, temperature=temperature, max_tokens=max_tokens, api_key=api_key
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            api_key=api_key,
+            max_retries=0,
         )
-
-    async def get_chat_response(self, llm_system_prompt, llm_user_prompt, stream=False):
-        messages = [
-            {"role": "system", "content": llm_system_prompt},
-            {"role": "user", "content": f"task: {llm_user_prompt}"},
-        ]
-        response = ""
-        if not stream:
-            output = await self.llm.ainvoke(messages)
-            response = output.content
-        else:
-            response = await self._get_stream_response(messages)
-
-        return response
-
-    async def _get_stream_response(self, messages):
-        paragraph = ""
-        response = ""
-
-        # Streaming the response using the chain astream method from langchain
-        async for chunk in self.llm.astream(messages):
-            content = chunk.content
-            if content is not None:
-                response += content
-                paragraph += content
-                if "\n" in paragraph:
-                    print(f"{paragraph}")
-                    paragraph = ""
-
-        return response
+        super().__init__(model, temperature, max_tokens, scheduler)
@@ -0,0 +1,283 @@
+"""
+This module provides a client side scheduler for the chat models. Every call to a provider goes
+through the `ChatScheduler` for that provider, which applies
+1. Token bucket limits on requests per minute and tokens per minute
+2. A limit on the number of requests in flight
+3. Jittered exponential backoff on rate limit and server errors, honoring Retry-After
+
+NOTE: This module is not a chat model, so there is no SCHEDULER_Model for the
+"llm_provider" naming convention to pick up.
+"""
+import asyncio
+import email.utils
+import random
+import time
+import weakref
+
+from llm_analyst.utils.app_logging import logging
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError", "RateLimitError", "TimeoutError"}
+# Most responses are far shorter than max_tokens, so at most this many output tokens are
+# reserved before a call. settle() corrects the reservation once the real usage is known.
+EXPECTED_OUTPUT_TOKENS = 500
+LIMIT_NMS = ("requests_per_minute", "tokens_per_minute", "max_in_flight", "max_retries")
+# Default of the set_limits arguments, the limits that are not passed are left as they are
+_UNCHANGED = object()
+
+
+class TokenBucket:
+    """Allows `capacity` units per minute, refilled continuously."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.last_refill) * self.capacity / 60
+        )
+        self.last_refill = now
+
+    async def acquire(self, amount=1):
+        # A request larger than the bucket can never be served, so cap it at a full bucket
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) * 60 / self.capacity)
+
+    def release(self, amount):
+        """Give back units that were reserved but not used"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def charge(self, amount):
+        """Take units used beyond the reservation, the bucket may go negative"""
+        self._refill()
+        self.tokens -= amount
+
+
+class ChatScheduler:
+    """Rate limits, concurrency limits and retries for one chat model provider"""
+
+    _schedulers = {}
+
+    def __init__(
+        self,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        max_in_flight=8,
+        max_retries=5,
+        base_delay=1.0,
+        max_delay=60.0,
+    ):
+        self._blocked_until = 0.0
+        self.request_bucket = None
+        self.token_bucket = None
+        self.max_in_flight = None
+        self.set_limits(
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            max_in_flight=max_in_flight,
+            max_retries=max_retries,
+            base_delay=base_delay,
+            max_delay=max_delay,
+        )
+
+    @classmethod
+    def for_provider(cls, provider_nm, **limits):
+        """Return the process wide scheduler for a provider.
+        Limits that are passed in replace those of an existing scheduler.
+        """
+        scheduler = cls._schedulers.get(provider_nm, None)
+        if scheduler is None:
+            scheduler = cls(**limits)
+            cls._schedulers[provider_nm] = scheduler
+        elif limits:
+            scheduler.set_limits(**limits)
+        return scheduler
+
+    @classmethod
+    def reset_instance(cls):
+        cls._schedulers = {}
+
+    def set_limits(
+        self,
+        requests_per_minute=_UNCHANGED,
+        tokens_per_minute=_UNCHANGED,
+        max_in_flight=_UNCHANGED,
+        max_retries=_UNCHANGED,
+        base_delay=_UNCHANGED,
+        max_delay=_UNCHANGED,
+    ):
+        """Change the limits that are passed, None for a rate limit is no limit"""
+        # Buckets are only replaced when a limit changes so that usage so far is not forgotten
+        if requests_per_minute is not _UNCHANGED:
+            self.request_bucket = self._get_bucket(self.request_bucket, requests_per_minute)
+        if tokens_per_minute is not _UNCHANGED:
+            self.token_bucket = self._get_bucket(self.token_bucket, tokens_per_minute)
+        if max_in_flight is not _UNCHANGED and max_in_flight != self.max_in_flight:
+            self.max_in_flight = max_in_flight
+            # asyncio.Semaphore binds to an event loop, so keep one per running loop
+            self._semaphores = weakref.WeakKeyDictionary()
+        if max_retries is not _UNCHANGED:
+            self.max_retries = max_retries
+        if base_delay is not _UNCHANGED:
+            self.base_delay = base_delay
+        if max_delay is not _UNCHANGED:
+            self.max_delay = max_delay
+
+    def _get_bucket(self, bucket, capacity):
+        if not capacity:
+            return None
+        if bucket is not None and bucket.capacity == capacity:
+            return bucket
+        return TokenBucket(capacity)
+
+    def _get_semaphore(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop, None)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def _wait_for_capacity(self, estimated_tokens):
+        wait_time = self._blocked_until - time.monotonic()
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+        if self.request_bucket:
+            await self.request_bucket.acquire(1)
+        if self.token_bucket and estimated_tokens:
+            await self.token_bucket.acquire(estimated_tokens)
+
+    async def run(self, make_call, estimated_tokens=0):
+        """Await make_call() under the provider limits, retrying when it is safe to do so.
+        make_call must return a new awaitable each time it is called.
+        The caller settles the estimated_tokens of a call that succeeds, the tokens reserved
+        for a failed attempt are given back here.
+        """
+        attempt = 0
+        while True:
+            await self._wait_for_capacity(estimated_tokens)
+            try:
+                async with self._get_semaphore():
+                    return await make_call()
+            except BaseException as e:
+                # The provider did not count a failed request against the tokens per minute
+                self.settle(estimated_tokens, 0)
+                if not isinstance(e, Exception):
+                    raise
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                delay = self._get_retry_delay(e, attempt)
+                # Every caller to this provider backs off, not only the one that failed
+                self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+                logging.warning(
+                    "ChatScheduler retry %s/%s in %.2fs after %s",
+                    attempt + 1,
+                    self.max_retries,
+                    delay,
+                    type(e).__name__,
+                )
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def stream(self, make_stream, estimated_tokens=0, prompt_tokens=0):
+        """Iterate make_stream() under the provider limits and yield each item as it arrives.
+        A failed stream is only retried if nothing has been yielded yet.
+        Streams report no usage, each attempt is settled with prompt_tokens and the
+        estimate of the text it yielded.
+        """
+        attempt = 0
+        while True:
+            await self._wait_for_capacity(estimated_tokens)
+            started = False
+            output_chars = 0
+            try:
+                async with self._get_semaphore():
+                    async for item in make_stream():
+                        started = True
+                        if isinstance(item, str):
+                            output_chars += len(item)
+                        yield item
+                return
+            except Exception as e:
+                if started or attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                delay = self._get_retry_delay(e, attempt)
+                self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+                logging.warning(
+                    "ChatScheduler stream retry %s/%s in %.2fs after %s",
+                    attempt + 1,
+                    self.max_retries,
+                    delay,
+                    type(e).__name__,
+                )
+                attempt += 1
+                await asyncio.sleep(delay)
+            finally:
+                self.settle(estimated_tokens, prompt_tokens + output_chars // 4)
+
+    def settle(self, estimated_tokens, used_tokens):
+        """Correct a token estimate once the real usage is known, the unused part is given
+        back and the usage beyond the estimate is taken from the bucket"""
+        if not self.token_bucket or used_tokens is None:
+            return
+        if used_tokens < estimated_tokens:
+            self.token_bucket.release(estimated_tokens - used_tokens)
+        elif used_tokens > estimated_tokens:
+            self.token_bucket.charge(used_tokens - estimated_tokens)
+
+    def _is_retryable(self, e):
+        status_code = getattr(e, "status_code", None)
+        if status_code is not None:
+            return status_code in RETRYABLE_STATUS_CODES
+        return type(e).__name__ in RETRYABLE_ERROR_NAMES or isinstance(e, asyncio.TimeoutError)
+
+    def _get_retry_delay(self, e, attempt):
+        backoff = min(self.max_delay, self.base_delay * (2**attempt))
+        retry_after = self._get_retry_after(e)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        # Full jitter keeps concurrent callers from retrying in lock step
+        return random.uniform(0, backoff)
+
+    def _get_retry_after(self, e):
+        response = getattr(e, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+
+        retry_after_ms = headers.get("retry-after-ms", None)
+        if retry_after_ms:
+            try:
+                return float(retry_after_ms) / 1000
+            except ValueError:
+                pass
+
+        retry_after = headers.get("retry-after", None)
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            retry_date = email.utils.parsedate_to_datetime(retry_after)
+            return max(0.0, retry_date.timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def estimate_tokens(messages, max_tokens=None):
+    """Rough token count used to reserve tokens per minute before the call is made.
+    The prompt plus the expected completion, max_tokens capped at EXPECTED_OUTPUT_TOKENS.
+    """
+    prompt_chars = sum(len(message["content"] or "") for message in messages)
+    return prompt_chars // 4 + min(int(max_tokens or 0), EXPECTED_OUTPUT_TOKENS)
@@ -0,0 +1,299 @@
+"""
+This module defines the `Cassette` class, which records the internet searches, scrapes and
+chat model exchanges of research runs to a file and serves them back in later runs.
+
+    cassette_mode = "record"   every search, scraped URL and chat response is appended to
+                               cassette_file, the file is rewritten when the run starts
+    cassette_mode = "replay"   the responses are read from cassette_file, no search provider,
+                               website or chat model is called and no API key is needed
+
+In replay the responses are served with the latency they had when they were recorded, or
+at once when cassette_replay_latency is "zero". A real run can therefore be re-profiled
+after a code change on identical inputs, without spending API quota.
+
+The cassette is a JSONL file with one interaction per line:
+    {"kind": "search" | "scrape" | "chat", "key": ..., "request": ..., "response": ..., "latency": ...}
+A request that is repeated is served the recorded responses in order, then the last one again.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+from llm_analyst.core.exceptions import LLMAnalystsException
+from llm_analyst.search_methods.internet_search import search_many
+from llm_analyst.utils.app_logging import logging
+
+CASSETTE_MODES = ("record", "replay")
+
+
+def _get_key(*parts):
+    return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Records or replays the searches, scrapes and chat responses of research runs."""
+
+    _cassettes = {}
+    _cassettes_lock = threading.Lock()
+
+    def __init__(self, cassette_file, mode, replay_latency="original"):
+        if mode not in CASSETTE_MODES:
+            raise LLMAnalystsException(
+                f"Unknown cassette_mode [{mode}], expected one of {CASSETTE_MODES}"
+            )
+        self.cassette_file = os.path.expanduser(cassette_file)
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self._lock = threading.Lock()
+        self._interactions = {}
+        self._replay_counts = {}
+
+        if mode == "record":
+            directory = os.path.dirname(self.cassette_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.cassette_file, "w", encoding="utf-8"):
+                pass
+        else:
+            self._load()
+
+    @classmethod
+    def for_config(cls, config):
+        """The process wide Cassette for the cassette_file of config,
+        None when cassette_mode or cassette_file is not set."""
+        cassette_file = getattr(config, "cassette_file", None)
+        mode = getattr(config, "cassette_mode", None)
+        if not cassette_file or not mode:
+            return None
+
+        cassette_key = (os.path.expanduser(cassette_file), mode)
+        with cls._cassettes_lock:
+            cassette = cls._cassettes.get(cassette_key, None)
+            if cassette is None:
+                cassette = cls(
+                    cassette_file,
+                    mode,
+                    getattr(config, "cassette_replay_latency", None) or "original",
+                )
+                cls._cassettes[cassette_key] = cassette
+        return cassette
+
+    @classmethod
+    def reset_instance(cls):
+        with cls._cassettes_lock:
+            cls._cassettes = {}
+
+    @property
+    def is_replay(self):
+        return self.mode == "replay"
+
+    def _load(self):
+        if not os.path.exists(self.cassette_file):
+            raise LLMAnalystsException(f"Cassette file not found [{self.cassette_file}]")
+        with open(self.cassette_file, "r", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self._interactions.setdefault(interaction["key"], []).append(interaction)
+        logging.info(
+            "Replaying %s recorded requests from %s", len(self._interactions), self.cassette_file
+        )
+
+    def _record(self, kind, key, request, response, latency):
+        line = json.dumps(
+            {"kind": kind, "key": key, "request": request, "response": response, "latency": latency},
+            default=str,
+        )
+        with self._lock:
+            with open(self.cassette_file, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+
+    def _replay(self, key):
+        """The next recorded interaction for key, None when it was not recorded"""
+        with self._lock:
+            interactions = self._interactions.get(key, None)
+            if not interactions:
+                return None
+            replay_count = self._replay_counts.get(key, 0)
+            self._replay_counts[key] = replay_count + 1
+        return interactions[min(replay_count, len(interactions) - 1)]
+
+    def get_replay_delay(self, latency):
+        if self.replay_latency == "original":
+            return latency or 0
+        return 0
+
+    def search(self, search_method, query, max_results):
+        """search_method(query, max_results=max_results) through the cassette"""
+        provider_nm = search_method.__name__
+        key = _get_key("search", provider_nm, query, max_results)
+        if self.is_replay:
+            interaction = self._replay(key)
+            if interaction is None:
+                raise LLMAnalystsException(
+                    f"The search [{provider_nm}] [{query}] is not in the cassette {self.cassette_file}"
+                )
+            time.sleep(self.get_replay_delay(interaction["latency"]))
+            return interaction["response"]
+
+        start_time = time.perf_counter()
+        search_results = search_method(query, max_results=max_results)
+        self._record(
+            "search",
+            key,
+            {"provider": provider_nm, "query": query, "max_results": max_results},
+            search_results,
+            time.perf_counter() - start_time,
+        )
+        return search_results
+
+    def search_many(self, search_method, queries, max_results):
+        """search_many(search_method, queries, max_results) through the cassette. Every query is
+        recorded on its own, so a replay does not depend on how the queries were batched."""
+        if self.is_replay:
+            provider_nm = search_method.__name__
+            search_results = []
+            delay = 0
+            for query in queries:
+                interaction = self._replay(_get_key("search", provider_nm, query, max_results))
+                if interaction is None:
+                    raise LLMAnalystsException(
+                        f"The search [{provider_nm}] [{query}] is not in the cassette {self.cassette_file}"
+                    )
+                delay = max(delay, self.get_replay_delay(interaction["latency"]))
+                search_results.append(interaction["response"])
+            # The queries of a batch are searched in parallel
+            time.sleep(delay)
+            return search_results
+
+        start_time = time.perf_counter()
+        search_results = search_many(search_method, queries, max_results=max_results)
+        latency = time.perf_counter() - start_time
+        for query, query_results in zip(queries, search_results):
+            self._record(
+                "search",
+                _get_key("search", search_method.__name__, query, max_results),
+                {"provider": search_method.__name__, "query": query, "max_results": max_results},
+                query_results,
+                latency,
+            )
+        return search_results
+
+    def scrape_urls(self, scrape_method, urls):
+        """scrape_method(urls) through the cassette. Every URL is recorded on its own, so a
+        replay still works when the URLs are scraped in different batches."""
+        if self.is_replay:
+            scraped_sites = []
+            delay = 0
+            for url in urls:
+                interaction = self._replay(_get_key("scrape", url))
+                if interaction is None:
+                    logging.warning("The scrape of %s is not in the cassette, it is skipped", url)
+                    continue
+                delay = max(delay, self.get_replay_delay(interaction["latency"]))
+                if interaction["response"] is not None:
+                    scraped_sites.append({"url": url, "raw_content": interaction["response"]})
+            # The URLs of a batch are scraped in parallel
+            time.sleep(delay)
+            return scraped_sites
+
+        start_time = time.perf_counter()
+        scraped_sites = scrape_method(urls)
+        latency = time.perf_counter() - start_time
+        raw_content_by_url = {site["url"]: site["raw_content"] for site in scraped_sites}
+        for url in urls:
+            # A failed scrape is recorded as None so that the replay fails it too
+            self._record(
+                "scrape", _get_key("scrape", url), {"url": url}, raw_content_by_url.get(url), latency
+            )
+        return scraped_sites
+
+    def _get_chat_key(self, model, llm_system_prompt, llm_user_prompt):
+        return _get_key("chat", model, llm_system_prompt, llm_user_prompt)
+
+    def replay_chat(self, model, llm_system_prompt, llm_user_prompt, prompt_nm):
+        interaction = self._replay(self._get_chat_key(model, llm_system_prompt, llm_user_prompt))
+        if interaction is None:
+            raise LLMAnalystsException(
+                f"The chat request [{prompt_nm}] to [{model}] is not in the cassette {self.cassette_file}"
+            )
+        return interaction
+
+    def record_chat(self, model, llm_system_prompt, llm_user_prompt, prompt_nm, response, latency):
+        self._record(
+            "chat",
+            self._get_chat_key(model, llm_system_prompt, llm_user_prompt),
+            {
+                "model": model,
+                "prompt_nm": prompt_nm,
+                "system_prompt": llm_system_prompt,
+                "user_prompt": llm_user_prompt,
+            },
+            response,
+            latency,
+        )
+
+
+class CassetteChatModel:
+    """A chat model client that records to, or replays from, a Cassette.
+    In replay there is no llm_client, the responses only come from the cassette."""
+
+    def __init__(self, cassette, llm_client, model):
+        self.cassette = cassette
+        self.llm_client = llm_client
+        self.model = model
+
+    def __getattr__(self, name):
+        if self.llm_client is None:
+            raise AttributeError(name)
+        return getattr(self.llm_client, name)
+
+    async def get_chat_response(
+        self, llm_system_prompt, llm_user_prompt, stream=False, prompt_nm=None
+    ):
+        if self.cassette.is_replay:
+            interaction = self.cassette.replay_chat(
+                self.model, llm_system_prompt, llm_user_prompt, prompt_nm
+            )
+            await asyncio.sleep(self.cassette.get_replay_delay(interaction["latency"]))
+            return interaction["response"]
+
+        start_time = time.perf_counter()
+        response = await self.llm_client.get_chat_response(
+            llm_system_prompt, llm_user_prompt, stream=stream, prompt_nm=prompt_nm
+        )
+        self.cassette.record_chat(
+            self.model,
+            llm_system_prompt,
+            llm_user_prompt,
+            prompt_nm,
+            response,
+            time.perf_counter() - start_time,
+        )
+        return response
+
+    async def astream_chat_response(self, llm_system_prompt, llm_user_prompt, prompt_nm=None):
+        if self.cassette.is_replay:
+            yield await self.get_chat_response(
+                llm_system_prompt, llm_user_prompt, prompt_nm=prompt_nm
+            )
+            return
+
+        start_time = time.perf_counter()
+        contents = []
+        async for content in self.llm_client.astream_chat_response(
+            llm_system_prompt, llm_user_prompt, prompt_nm=prompt_nm
+        ):
+            contents.append(content)
+            yield content
+        self.cassette.record_chat(
+            self.model,
+            llm_system_prompt,
+            llm_user_prompt,
+            prompt_nm,
+            "".join(contents),
+            time.perf_counter() - start_time,
+        )
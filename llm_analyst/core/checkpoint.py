@@ -0,0 +1,225 @@
+"""
+This module defines the `RunCheckpoint` class, which saves the result of each stage of a
+research run to a run directory so that a failed run can be resumed without repeating the
+LLM calls, searches and scrapes that already succeeded.
+
+A run is identified by the `run_id` of its `ResearchState`, which is copied to every
+`LLMAnalyst` and `LLMWriter` created during the run, and its checkpoints are written
+to `<checkpoint_dir>/<run_id>`. Each stage is stored in its own json file, named after the
+stage and a hash of the inputs it depends on (topic, sub-query, subtopic).
+
+Checkpoints are only used by the states that are part of the run: the state that started
+it, the states the run creates from it, and the states of `resume`. A state that merely
+carries the `run_id`, for example one loaded from a file, starts a new run instead of
+replaying the stage results of the old one.
+Checkpointing is off unless `checkpoint_dir` is configured.
+"""
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime
+
+from llm_analyst.core.exceptions import LLMAnalystsException
+from llm_analyst.core.research_state import ResearchState
+from llm_analyst.utils.app_logging import logging
+
+RUN_STAGE = "run"
+RUN_STATE_STAGE = "run_state"
+STAGE_STATUS = "stage_status"
+STARTED = "started"
+COMPLETE = "complete"
+
+
+class RunCheckpoint:
+    """Saves and loads the stage results of one research run."""
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+
+    @staticmethod
+    def new_run_id():
+        formatted_date_time = datetime.now().strftime("%Y-%m-%d-%H%M%S")
+        return f"run-{formatted_date_time}-{uuid.uuid4().hex[:8]}"
+
+    @staticmethod
+    def get_run_dir(config, run_id):
+        checkpoint_dir = getattr(config, "checkpoint_dir", None)
+        if not checkpoint_dir or not run_id:
+            return None
+        return os.path.join(os.path.expanduser(checkpoint_dir), run_id)
+
+    @staticmethod
+    def join_run(research_state, run_id):
+        """Make research_state part of the run run_id, it replays the checkpoints of the run"""
+        research_state.run_id = run_id
+        # Not a ResearchState attribute, so it is not passed on by dump() or saved to a file
+        research_state.joined_run_id = run_id
+
+    @staticmethod
+    def is_in_run(research_state):
+        """True when research_state is part of the run of its run_id, see join_run"""
+        run_id = getattr(research_state, "run_id", None)
+        return run_id is not None and getattr(research_state, "joined_run_id", None) == run_id
+
+    @classmethod
+    def for_state(cls, research_state, config):
+        """The checkpoint of the run research_state belongs to,
+        None when it is not part of a run or checkpoint_dir is not configured."""
+        if not cls.is_in_run(research_state):
+            return None
+        run_dir = cls.get_run_dir(config, research_state.run_id)
+        if run_dir is None:
+            return None
+        return cls(run_dir)
+
+    @classmethod
+    def start_run(cls, research_state, config, entry):
+        """Give research_state a new run_id and save what is needed to resume it.
+        The run_id is always set, it also identifies the metrics of the run.
+
+        Args:
+            research_state (ResearchState): The state the run starts from.
+            config (Config): Provides the checkpoint_dir.
+            entry (str): The research method that started the run, used by resume.
+        Returns:
+            RunCheckpoint: None when checkpoint_dir is not configured.
+        """
+        run_id = cls.new_run_id()
+        cls.join_run(research_state, run_id)
+        run_dir = cls.get_run_dir(config, run_id)
+        if run_dir is None:
+            return None
+
+        checkpoint = cls(run_dir)
+        checkpoint.save_state(RUN_STATE_STAGE, research_state)
+        checkpoint.save(RUN_STAGE, {"run_id": run_id, "entry": entry})
+        logging.info("Started research run %s", run_id)
+        return checkpoint
+
+    def _get_path(self, stage, key_parts):
+        if key_parts:
+            key = json.dumps(key_parts, default=str)
+            digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+            return os.path.join(self.run_dir, f"{stage}-{digest}.json")
+        return os.path.join(self.run_dir, f"{stage}.json")
+
+    def _write_atomic(self, file_path, write_file):
+        """Write to a temporary file and rename it, a crash never leaves half a checkpoint"""
+        os.makedirs(self.run_dir, exist_ok=True)
+        tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            write_file(tmp_path)
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def has(self, stage, *key_parts):
+        return os.path.exists(self._get_path(stage, key_parts))
+
+    def save(self, stage, value, *key_parts):
+        """Save a json serializable stage result. A failure is logged, never raised,
+        as losing a checkpoint must not fail the research run."""
+        file_path = self._get_path(stage, key_parts)
+
+        def write_file(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(
+                    {"stage": stage, "key": key_parts, "value": value}, file, indent=4, default=str
+                )
+
+        try:
+            self._write_atomic(file_path, write_file)
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning("Failed to save checkpoint %s: %s", file_path, e)
+
+    def load(self, stage, *key_parts, default=None):
+        file_path = self._get_path(stage, key_parts)
+        if not os.path.exists(file_path):
+            return default
+        try:
+            with open(file_path, "r", encoding="utf-8") as file:
+                value = json.load(file)["value"]
+            logging.debug("Resuming from checkpoint %s", file_path)
+            return value
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning("Ignoring unreadable checkpoint %s: %s", file_path, e)
+            return default
+
+    def set_stage_status(self, stage, status, *key_parts):
+        """Mark a research method of the run STARTED or COMPLETE, resume only repeats the
+        methods that were started and are not complete"""
+        self.save(STAGE_STATUS, status, stage, *key_parts)
+
+    def get_stage_status(self, stage, *key_parts):
+        """STARTED, COMPLETE or None when the research method was never started in the run"""
+        return self.load(STAGE_STATUS, stage, *key_parts)
+
+    def save_state(self, stage, research_state, *key_parts):
+        """Save a ResearchState, enums included, using ResearchState.dump"""
+        file_path = self._get_path(stage, key_parts)
+        try:
+            self._write_atomic(file_path, research_state.dump)
+        except (OSError, LLMAnalystsException) as e:
+            logging.warning("Failed to save checkpoint %s: %s", file_path, e)
+
+    def load_state(self, stage, *key_parts):
+        file_path = self._get_path(stage, key_parts)
+        if not os.path.exists(file_path):
+            return None
+        try:
+            research_state = ResearchState.load(file_path)
+            logging.debug("Resuming from checkpoint %s", file_path)
+            return research_state
+        except LLMAnalystsException as e:
+            logging.warning("Ignoring unreadable checkpoint %s: %s", file_path, e)
+            return None
+
+
+async def resume(run_id, config=None):
+    """Resume a research run, every stage that already has a checkpoint is replayed from it.
+    The write_report of an LLMAnalyst run is only repeated when the failed run started it.
+
+    Args:
+        run_id (str): The run_id of the ResearchState of the failed run.
+        config (Config): Must have the same checkpoint_dir as the failed run.
+    Returns:
+        ResearchState: The same result as the method that started the run, for an
+            LLMAnalyst run the state after write_report when the run started it.
+    """
+    # Imported here, the research roles import this module
+    from llm_analyst.core.research_analyst import LLMAnalyst
+    from llm_analyst.core.research_editor import LLMEditor
+    from llm_analyst.core.runtime_context import RuntimeContext
+
+    context = RuntimeContext.for_config(config)
+    run_dir = RunCheckpoint.get_run_dir(context.cfg, run_id)
+    if run_dir is None or not os.path.isdir(run_dir):
+        raise LLMAnalystsException(f"No checkpoints found for research run {run_id}")
+
+    checkpoint = RunCheckpoint(run_dir)
+    run_info = checkpoint.load(RUN_STAGE)
+    research_state = checkpoint.load_state(RUN_STATE_STAGE)
+    if run_info is None or research_state is None:
+        raise LLMAnalystsException(
+            f"Research run {run_id} can not be resumed, {run_dir} is incomplete"
+        )
+
+    logging.info("Resuming research run %s", run_id)
+    match run_info["entry"]:
+        case "create_detailed_report":
+            llm_editor = LLMEditor(context=context, **research_state.dump_refs())
+            RunCheckpoint.join_run(llm_editor, run_id)
+            return await llm_editor.create_detailed_report()
+        case "conduct_research":
+            llm_analyst = LLMAnalyst(context=context, **research_state.dump_refs())
+            RunCheckpoint.join_run(llm_analyst, run_id)
+            research_state = await llm_analyst.conduct_research()
+            if llm_analyst.get_stage_status("write_report") is None:
+                return research_state
+            return await llm_analyst.write_report()
+        case _:
+            raise LLMAnalystsException(
+                f"Unknown entry {run_info['entry']} for research run {run_id}"
+            )
@@ -11,7 +11,9 @@ import json
 import keyword
 
 from enum import Enum
+from llm_analyst.chat_models.scheduler import LIMIT_NMS
 from llm_analyst.core.exceptions import LLMAnalystsException
+from llm_analyst.search_methods.hedged_search import HedgedSearch
 from llm_analyst.utils.app_logging import logging
 from llm_analyst.utils.utilities import get_resource_path
 
@@ -32,21 +34,43 @@ class DataSource(Enum):
     SELECT_URLS = "select_urls"
 
 
+LLM_SETTINGS = ("llm_provider", "llm_model", "llm_temperature", "llm_token_limit")
+# Config keys that are converted to bool, environment variables set them as strings
+BOOLEAN_KEYS = ("speculative_research",)
+TRUE_VALUES = ("true", "1", "yes", "on")
+FALSE_VALUES = ("false", "0", "no", "off", "")
+
+
 class Config:
     """Config class for LLM Analyst.
     """
     
     def __init__(self):
         # These Attributes are added so the IDE identifies them as valid
-        self.internet_search = None              # Any method name from internet_search.py
-        self.embedding_provider = None           # embedding_provider options [ollama, huggingface]
+        self.internet_search = None              # Any method name from internet_search.py, or an ordered list of them to hedge
+        self._embedding_provider_nm = None       # Embeddings are created on first use of embedding_provider
+        self._embedding_provider = None
+        self.embedding_provider = None           # embedding_provider options [ollama, huggingface, hash]
+        self._local_store_embedding_provider_nm = None
+        self._local_store_embedding_provider = None
+        self.local_store_embedding_provider = None  # Embeddings of the LOCAL_STORE vector store
         self.llm_provider = None                 # Any module under "chat_models" directory
         self.llm_model = None                    # A capability from chosen llm_provider
         self.llm_token_limit = None              # An attribute of the chosen llm_provider
         self.llm_temperature = None              # An attribute of the chosen llm_provider
+        self.llm_prompt_routes = None            # Per prompt name overrides of the LLM_SETTINGS
+        self.llm_requests_per_minute = None      # Client side rate limit applied per llm_provider
+        self.llm_tokens_per_minute = None        # Client side rate limit applied per llm_provider
+        self.llm_max_in_flight = None            # Max concurrent requests per llm_provider
+        self.llm_max_retries = None              # Retries on rate limit and server errors
+        self.llm_provider_limits = None          # Per llm_provider overrides of the four limits above
         self.browse_chunk_max_length = None      # NOT USED
         self.summary_token_limit = None          # NOT USED
         self.max_search_results_per_query = None # Used by internet_search provider
+        self.scrape_budget_pages = None          # Max pages scraped per research run, planned over all sub-queries, 0 no limit
+        self.scrape_budget_bytes = None          # Max UTF-8 bytes scraped per research run, 0 no limit
+        self.snippet_threshold = None            # Only search results whose snippet scores this similarity are scraped, "" to scrape all
+        self.speculative_research = None         # true to research the topic while the agent and sub-queries are chosen
         self.total_words = None                  # Passed as an attribute to the report prompt
         self.max_subsections = None              # Passed as an attribute to the SUBTOPIC_REPORT prompt
         self.max_iterations = None               # Passed as an attribute to the search_queries_prompt
@@ -54,6 +78,12 @@ class Config:
         self.report_out_dir = None               # Location where Publisher places output reports
         self.local_store_dir = None              # Location of the local data store
         self.cache_dir = None                    # Location of the Vector DB
+        self.checkpoint_dir = None               # Location of the research run checkpoints, "" (the default) to disable
+        self.trace_file = None                   # JSONL file the tracing spans are appended to, "" to disable
+        self.metrics_port = None                 # Port of the Prometheus /metrics endpoint, "" to disable
+        self.cassette_file = None                # JSONL file the searches, scrapes and chat responses are recorded to
+        self.cassette_mode = None                # cassette_mode options [record, replay], "" to disable
+        self.cassette_replay_latency = None      # cassette_replay_latency options [original, zero]
        
         # Set LLM_ANALYST_CONFIG environment variable to override and default configurations
         config_file_path = os.getenv("LLM_ANALYST_CONFIG", None)
@@ -66,6 +96,44 @@ class Config:
             attributes.append(f"{key}={value}")
         return "\n".join(attributes)
 
+    @property
+    def embedding_provider(self):
+        """The Langchain Embeddings instance, created the first time it is requested."""
+        if self._embedding_provider is None and self._embedding_provider_nm:
+            self._embedding_provider = self._get_embeddings_provider(self._embedding_provider_nm)
+        return self._embedding_provider
+
+    @embedding_provider.setter
+    def embedding_provider(self, value):
+        """Accepts either a provider name [ollama, openai, huggingface] or an Embeddings instance."""
+        if isinstance(value, str):
+            self._embedding_provider_nm = value
+            self._embedding_provider = None
+        else:
+            self._embedding_provider_nm = None
+            self._embedding_provider = value
+
+    @property
+    def local_store_embedding_provider(self):
+        """The Embeddings instance of the LOCAL_STORE vector store, created on first use."""
+        if (
+            self._local_store_embedding_provider is None
+            and self._local_store_embedding_provider_nm
+        ):
+            self._local_store_embedding_provider = self._get_embeddings_provider(
+                self._local_store_embedding_provider_nm
+            )
+        return self._local_store_embedding_provider
+
+    @local_store_embedding_provider.setter
+    def local_store_embedding_provider(self, value):
+        if isinstance(value, str):
+            self._local_store_embedding_provider_nm = value
+            self._local_store_embedding_provider = None
+        else:
+            self._local_store_embedding_provider_nm = None
+            self._local_store_embedding_provider = value
+
     def get_prompt_json_path(self):
         """Get the user defined path to prompts json 'prompt_json_path'
         or return the defaults if a configuration is not provided
@@ -105,7 +173,7 @@ class Config:
             if keyword.iskeyword(key):
                 key += "_"
 
-            if isinstance(value, dict):
+            if isinstance(value, dict) and ("env_var" in value or "default_val" in value):
                 default_val = value.get("default_val", None)
                 env_var = value.get("env_var", None)
                 env_val = os.getenv(env_var) if env_var else None
@@ -120,28 +188,119 @@ class Config:
             if key == "internet_search" and value is not None:
                 value = self._get_search_method(value)
 
-            if key == "embedding_provider" and value is not None:
-                value = self._get_embeddings_provider(value)
-
             if key == "llm_provider" and value is not None:
                 value = self._get_llm_model(value)
 
+            if key == "llm_prompt_routes":
+                value = self._get_llm_prompt_routes(value)
+
+            if key == "llm_provider_limits":
+                value = self._get_llm_provider_limits(value)
+
+            if key in BOOLEAN_KEYS:
+                value = self._get_bool(key, value)
+
             setattr(self, key, value)
 
+    def _get_llm_prompt_routes(self, llm_prompt_routes):
+        """Convert per prompt overrides to settings with the llm_provider resolved.
+        For example {"choose_agent_prompt": {"llm_provider": "groq", "llm_model": "llama3-8b-8192"}}
+        The overrides may also be given as a JSON string through the environment variable.
+        """
+        if not llm_prompt_routes:
+            return {}
+        if isinstance(llm_prompt_routes, str):
+            try:
+                llm_prompt_routes = json.loads(llm_prompt_routes)
+            except json.JSONDecodeError as e:
+                error_msg = f"IN Config._get_llm_prompt_routes - Routes are not valid JSON. [{llm_prompt_routes}]"
+                logging.error(error_msg)
+                raise LLMAnalystsException(error_msg) from e
+
+        routes = {}
+        for prompt_nm, overrides in llm_prompt_routes.items():
+            unknown_keys = set(overrides) - set(LLM_SETTINGS)
+            if unknown_keys:
+                error_msg = f"IN Config._get_llm_prompt_routes - Unknown settings {sorted(unknown_keys)} for [{prompt_nm}]"
+                logging.error(error_msg)
+                raise LLMAnalystsException(error_msg)
+            route = dict(overrides)
+            if isinstance(route.get("llm_provider", None), str):
+                route["llm_provider"] = self._get_llm_model(route["llm_provider"])
+            routes[prompt_nm] = route
+        return routes
+
+    def _get_llm_provider_limits(self, llm_provider_limits):
+        """Validate the per provider overrides of the ChatScheduler limits.
+        For example {"groq": {"requests_per_minute": 30, "tokens_per_minute": 6000}}
+        The overrides may also be given as a JSON string through the environment variable.
+        """
+        if not llm_provider_limits:
+            return {}
+        if isinstance(llm_provider_limits, str):
+            try:
+                llm_provider_limits = json.loads(llm_provider_limits)
+            except json.JSONDecodeError as e:
+                error_msg = f"IN Config._get_llm_provider_limits - Limits are not valid JSON. [{llm_provider_limits}]"
+                logging.error(error_msg)
+                raise LLMAnalystsException(error_msg) from e
+
+        for provider_nm, limits in llm_provider_limits.items():
+            unknown_keys = set(limits) - set(LIMIT_NMS)
+            if unknown_keys:
+                error_msg = f"IN Config._get_llm_provider_limits - Unknown limits {sorted(unknown_keys)} for [{provider_nm}]"
+                logging.error(error_msg)
+                raise LLMAnalystsException(error_msg)
+        return {provider_nm.lower(): dict(limits) for provider_nm, limits in llm_provider_limits.items()}
+
+    def _get_bool(self, key, value):
+        """Convert a bool config value, given as a bool or a string such as "true" or "0" """
+        if value is None or isinstance(value, bool):
+            return bool(value)
+        if str(value).strip().lower() in TRUE_VALUES:
+            return True
+        if str(value).strip().lower() in FALSE_VALUES:
+            return False
+        error_msg = f"IN Config._get_bool - [{key}] is not a boolean. [{value}]"
+        logging.error(error_msg)
+        raise LLMAnalystsException(error_msg)
+
+    def get_llm_settings(self, prompt_nm=None):
+        """The llm_provider, llm_model, llm_temperature and llm_token_limit to use for a prompt.
+        Settings without a per prompt override come from the top level config.
+        """
+        llm_settings = {setting: getattr(self, setting, None) for setting in LLM_SETTINGS}
+        llm_prompt_routes = getattr(self, "llm_prompt_routes", None) or {}
+        if prompt_nm in llm_prompt_routes:
+            llm_settings.update(llm_prompt_routes[prompt_nm])
+        return llm_settings
+
 
-    def _get_search_method(self, search_method: str):
+    def _get_search_method(self, search_method):
         """Convert the search_method from a string to a callable function.
+        An ordered list of methods, or a comma separated string, is converted to a HedgedSearch.
         """
+        if isinstance(search_method, str):
+            search_method = [
+                method_nm.strip() for method_nm in search_method.split(",") if method_nm.strip()
+            ]
+        if not isinstance(search_method, list):
+            search_method = [search_method]
+
         module_name = "llm_analyst.search_methods.internet_search"
-        try:
-            module = importlib.import_module(module_name)
-            internet_search_method = getattr(module, search_method)
-        except (ImportError, AttributeError) as e:
-            error_msg = f"IN Config._get_search_method - Search Method not found. [{search_method}]"
-            logging.error(error_msg)
-            raise LLMAnalystsException(error_msg) from e
+        internet_search_methods = []
+        for method_nm in search_method:
+            try:
+                module = importlib.import_module(module_name)
+                internet_search_methods.append(getattr(module, method_nm))
+            except (ImportError, AttributeError, TypeError) as e:
+                error_msg = f"IN Config._get_search_method - Search Method not found. [{method_nm}]"
+                logging.error(error_msg)
+                raise LLMAnalystsException(error_msg) from e
 
-        return internet_search_method
+        if len(internet_search_methods) == 1:
+            return internet_search_methods[0]
+        return HedgedSearch(internet_search_methods)
 
     def _get_llm_model(self, llm_model_module: str):
         """Convert the llm_model_module from a string to a Chat Model Object.
@@ -180,6 +339,16 @@ class Config:
                 from langchain_huggingface import HuggingFaceEmbeddings
 
                 embeddings = HuggingFaceEmbeddings()
+            case "sentence_transformer":
+                from langchain_community.embeddings.sentence_transformer import (
+                    SentenceTransformerEmbeddings,
+                )
+
+                embeddings = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
+            case "hash":
+                from llm_analyst.embedding_methods.hash_embeddings import HashEmbeddings
+
+                embeddings = HashEmbeddings()
             case _:
                 error_msg = f"IN Config._get_embeddings_provider - Embedding provider not found. [{embeddings_provider_nm}]"
                 logging.error(error_msg)
@@ -0,0 +1,220 @@
+"""
+This module defines the `FindingsStore` class, a content-addressed store for the research
+findings held by `ResearchState`.
+
+Findings are the largest part of a research state and the same text is held many times:
+`initial_findings` usually equals `research_findings`, and every `LLMAnalyst` and `LLMWriter`
+of a detailed report is created from a `dump_refs()` of the state before it.
+A `ResearchState` therefore only keeps `ChunkRefs`, the sha256 ids of its findings, and the
+text is read from the store when a prompt is built.
+Chunks are zstd compressed when the optional `zstandard` package is installed.
+
+When a `ResearchState` is dumped to a file the chunks it references are written to a
+`chunks` directory next to the file, shared by every state dumped to the same directory.
+
+A chunk stays in memory while a `ChunkRefs` made by `put_refs` refers to it. Once the last
+of them is garbage collected, when the states of a run are dropped, the chunk is released.
+"""
+import hashlib
+import os
+import threading
+import uuid
+import weakref
+
+from llm_analyst.core.exceptions import LLMAnalystsException
+from llm_analyst.utils.app_logging import logging
+
+CHUNKS_DIR_NM = "chunks"
+_FILE_EXTENSIONS = {"zstd": ".zst", "none": ".txt"}
+
+
+class ChunkRefs:
+    """The chunk ids of a list of findings, or of a single findings string when is_text is set"""
+
+    __slots__ = ("chunk_ids", "is_text", "__weakref__")
+
+    def __init__(self, chunk_ids, is_text=False):
+        self.chunk_ids = tuple(chunk_ids)
+        self.is_text = is_text
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ChunkRefs)
+            and self.chunk_ids == other.chunk_ids
+            and self.is_text == other.is_text
+        )
+
+    def __hash__(self):
+        return hash((self.chunk_ids, self.is_text))
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    def __repr__(self):
+        return f"ChunkRefs({list(self.chunk_ids)}, is_text={self.is_text})"
+
+    def to_json(self):
+        ref_json = {"__chunks__": list(self.chunk_ids)}
+        if self.is_text:
+            ref_json["__text__"] = True
+        return ref_json
+
+    @classmethod
+    def from_json(cls, ref_json):
+        return cls(ref_json["__chunks__"], is_text=ref_json.get("__text__", False))
+
+
+def _get_zstd():
+    try:
+        import zstandard
+
+        return zstandard
+    except ImportError:
+        return None
+
+
+class FindingsStore:
+    """Findings text by sha256 chunk id, kept in memory and optionally compressed."""
+
+    def __init__(self, compression="zstd"):
+        # Reentrant, a ChunkRefs may be garbage collected and released while the lock is held
+        self._lock = threading.RLock()
+        self._chunks = {}
+        # {chunk_id: number of live ChunkRefs}, and the id() of the ChunkRefs counted
+        self._ref_counts = {}
+        self._tracked_refs = set()
+        self._chunk_dirs = []
+        self._zstd = _get_zstd() if compression == "zstd" else None
+        if compression == "zstd" and self._zstd is None:
+            logging.debug("zstandard is not installed, findings are stored uncompressed")
+        self.compression = "zstd" if self._zstd else "none"
+
+    def _encode(self, data):
+        if self._zstd:
+            return self._zstd.ZstdCompressor().compress(data)
+        return data
+
+    def _decode(self, compression, stored_data):
+        if compression == "zstd":
+            zstd = self._zstd or _get_zstd()
+            if zstd is None:
+                raise LLMAnalystsException("zstandard is required to read zstd compressed findings")
+            return zstd.ZstdDecompressor().decompress(stored_data)
+        return stored_data
+
+    def _get_stored_chunk(self, text):
+        data = text.encode("utf-8")
+        chunk_id = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            stored_chunk = self._chunks.get(chunk_id, None)
+        if stored_chunk is None:
+            stored_chunk = (self.compression, self._encode(data))
+        return chunk_id, stored_chunk
+
+    def put(self, text):
+        """Store text and return its chunk id. The chunk is kept until a ChunkRefs of it
+        made by put_refs is released."""
+        chunk_id, stored_chunk = self._get_stored_chunk(text)
+        with self._lock:
+            self._chunks.setdefault(chunk_id, stored_chunk)
+        return chunk_id
+
+    def _put_refs(self, texts, is_text=False):
+        stored_chunks = [self._get_stored_chunk(text) for text in texts]
+        # The chunks are stored and counted under one lock, a release in between can not drop them
+        with self._lock:
+            for chunk_id, stored_chunk in stored_chunks:
+                self._chunks.setdefault(chunk_id, stored_chunk)
+            chunk_refs = ChunkRefs([chunk_id for chunk_id, _ in stored_chunks], is_text=is_text)
+            self._track(chunk_refs)
+        return chunk_refs
+
+    def _track(self, chunk_refs):
+        """Keep the chunks of chunk_refs in memory until chunk_refs is garbage collected"""
+        with self._lock:
+            if id(chunk_refs) in self._tracked_refs:
+                return
+            self._tracked_refs.add(id(chunk_refs))
+            for chunk_id in chunk_refs.chunk_ids:
+                self._ref_counts[chunk_id] = self._ref_counts.get(chunk_id, 0) + 1
+        weakref.finalize(chunk_refs, self._release, id(chunk_refs), chunk_refs.chunk_ids)
+
+    def _release(self, refs_id, chunk_ids):
+        with self._lock:
+            self._tracked_refs.discard(refs_id)
+            for chunk_id in chunk_ids:
+                ref_count = self._ref_counts.get(chunk_id, 0) - 1
+                if ref_count > 0:
+                    self._ref_counts[chunk_id] = ref_count
+                else:
+                    self._ref_counts.pop(chunk_id, None)
+                    self._chunks.pop(chunk_id, None)
+
+    def get(self, chunk_id):
+        with self._lock:
+            stored_chunk = self._chunks.get(chunk_id, None)
+            chunk_dirs = list(self._chunk_dirs)
+        if stored_chunk is None:
+            stored_chunk = self._read_chunk(chunk_id, chunk_dirs)
+        compression, stored_data = stored_chunk
+        return self._decode(compression, stored_data).decode("utf-8")
+
+    def _read_chunk(self, chunk_id, chunk_dirs):
+        for chunk_dir in reversed(chunk_dirs):
+            for compression, extension in _FILE_EXTENSIONS.items():
+                chunk_path = os.path.join(chunk_dir, f"{chunk_id}{extension}")
+                if os.path.exists(chunk_path):
+                    with open(chunk_path, "rb") as file:
+                        stored_chunk = (compression, file.read())
+                    with self._lock:
+                        self._chunks[chunk_id] = stored_chunk
+                    return stored_chunk
+        raise LLMAnalystsException(f"Findings chunk {chunk_id} not found")
+
+    def add_chunk_dir(self, chunk_dir):
+        """Chunks that are not in memory are looked up in the chunk directories of loaded files"""
+        with self._lock:
+            if chunk_dir not in self._chunk_dirs:
+                self._chunk_dirs.append(chunk_dir)
+
+    def put_refs(self, value):
+        """ChunkRefs for a findings string or list of strings, None for anything else.
+        The chunks are kept in memory while the ChunkRefs is alive, a ChunkRefs that is
+        passed in, for example one loaded from a file, is kept track of the same way."""
+        if isinstance(value, ChunkRefs):
+            self._track(value)
+            return value
+        if isinstance(value, str):
+            return self._put_refs([value], is_text=True)
+        if isinstance(value, (list, tuple)) and all(isinstance(item, str) for item in value):
+            return self._put_refs(value)
+        return None
+
+    def get_value(self, chunk_refs):
+        findings = [self.get(chunk_id) for chunk_id in chunk_refs.chunk_ids]
+        if chunk_refs.is_text:
+            return findings[0] if findings else ""
+        return findings
+
+    def save_chunks(self, chunk_ids, chunk_dir):
+        """Write the chunks to chunk_dir, chunks already in the directory are not rewritten"""
+        os.makedirs(chunk_dir, exist_ok=True)
+        for chunk_id in chunk_ids:
+            with self._lock:
+                stored_chunk = self._chunks.get(chunk_id, None)
+                chunk_dirs = list(self._chunk_dirs)
+            if stored_chunk is None:
+                stored_chunk = self._read_chunk(chunk_id, chunk_dirs)
+            compression, stored_data = stored_chunk
+
+            chunk_path = os.path.join(chunk_dir, f"{chunk_id}{_FILE_EXTENSIONS[compression]}")
+            if os.path.exists(chunk_path):
+                continue
+            tmp_path = f"{chunk_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as file:
+                file.write(stored_data)
+            os.replace(tmp_path, chunk_path)
+
+
+# Shared by every ResearchState in the process
+FINDINGS_STORE = FindingsStore()
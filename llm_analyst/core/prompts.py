@@ -15,8 +15,10 @@ class Prompts:
     _instance = None
     _prompts = None
 
-    def __new__(cls, config=Config()):
+    def __new__(cls, config=None):
         if cls._instance is None:
+            if config is None:
+                config = Config()
             cls._instance = super(Prompts, cls).__new__(cls)
             cls._prompts = cls._load_prompts(config)
         return cls._instance
@@ -0,0 +1,102 @@
+"""
+This module defines the `ReportAssembler` class, which builds a detailed report one section at
+a time and keeps the headings of the report as each section is added. The table of contents
+is therefore ready as soon as the last subtopic is written.
+
+Headings are found with a line based scanner instead of rendering the markdown to HTML.
+"""
+import re
+
+ATX_HEADING = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+|(?=[^#\s]))(.*?)(?:[ \t]+#+)?[ \t]*$")
+SETEXT_UNDERLINE = re.compile(r"^ {0,3}(=+|-+)[ \t]*$")
+FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+SECTION_SEPARATOR = "\n\n\n"
+
+
+def scan_markdown_headers(markdown_text):
+    """Return [{"level": int, "text": str}] for the ATX (# Heading) and
+    setext (Heading / =====) headings in markdown_text, skipping fenced code blocks.
+    """
+    headers = []
+    fence = None
+    previous_line = ""
+
+    for line in markdown_text.split("\n"):
+        fence_match = FENCE.match(line)
+        if fence:
+            # A fence is closed by the same character, at least as many times
+            if fence_match and fence_match.group(1).startswith(fence):
+                fence = None
+            previous_line = ""
+            continue
+        if fence_match:
+            fence = fence_match.group(1)
+            previous_line = ""
+            continue
+
+        atx_match = ATX_HEADING.match(line)
+        if atx_match and atx_match.group(2):
+            headers.append({"level": len(atx_match.group(1)), "text": atx_match.group(2).strip()})
+            previous_line = ""
+            continue
+
+        setext_match = SETEXT_UNDERLINE.match(line)
+        if setext_match and previous_line.strip() and not previous_line.startswith(("    ", "\t")):
+            level = 1 if setext_match.group(1)[0] == "=" else 2
+            headers.append({"level": level, "text": previous_line.strip()})
+            previous_line = ""
+            continue
+
+        previous_line = line
+
+    return headers
+
+
+def build_header_tree(headers):
+    """Nest a flat list of headers, each header holds the deeper headers that follow it as children"""
+    header_tree = []
+    stack = []
+    for header in headers:
+        header = dict(header)
+        # Pop headers from the stack with higher or equal level
+        while stack and stack[-1]["level"] >= header["level"]:
+            stack.pop()
+        if stack:
+            stack[-1].setdefault("children", []).append(header)
+        else:
+            header_tree.append(header)
+        stack.append(header)
+    return header_tree
+
+
+def generate_table_of_contents(header_tree, indent_level=0):
+    toc = ""
+    for header in header_tree:
+        toc += " " * (indent_level * 4) + "- " + header["text"] + "\n"
+        if "children" in header:
+            toc += generate_table_of_contents(header["children"], indent_level + 1)
+    return toc
+
+
+class ReportAssembler:
+    """Collects report sections in order and scans each one for headings as it is added"""
+
+    def __init__(self, report_md=""):
+        self.report_parts = [report_md]
+        self.headers = scan_markdown_headers(report_md)
+
+    def add_section(self, section_md):
+        self.report_parts.append(SECTION_SEPARATOR + section_md)
+        self.headers.extend(scan_markdown_headers(section_md))
+
+    @property
+    def report_md(self):
+        return "".join(self.report_parts)
+
+    def header_texts(self):
+        return [header["text"] for header in self.headers]
+
+    def table_of_contents(self):
+        return "## Table of Contents\n\n" + generate_table_of_contents(
+            build_header_tree(self.headers)
+        )
@@ -3,87 +3,118 @@ The `LLMAnalyst` class is responsible for conducting research using a Language M
 managing prompts, and generating reports based on the research findings.
 """
 import asyncio
+import time
 from datetime import datetime
-import json
-from llm_analyst.core.config import Config, ReportType, DataSource
+from llm_analyst.core.checkpoint import COMPLETE, STARTED, RunCheckpoint
+from llm_analyst.core.config import ReportType, DataSource
 from llm_analyst.core.prompts import Prompts
+from llm_analyst.core.runtime_context import RuntimeContext
+from llm_analyst.core.scrape_planner import ScrapePlanner
 from llm_analyst.core.exceptions import LLMAnalystsException
-from llm_analyst.embedding_methods.compressor import ContextCompressor
+from llm_analyst.core.structured_output import is_list_of_strings, parse_json_response
+from llm_analyst.embedding_methods.compressor import ContextCompressor, SnippetFilter
+from llm_analyst.scrapers.scraper_methods import get_provided_pages
+from llm_analyst.utils import metrics
 from llm_analyst.utils.app_logging import logging
+from llm_analyst.utils.tracing import current_span, span, traced
 from llm_analyst.core.research_state import ResearchState
-from llm_analyst.documents.vector_store import VectorStore
-from llm_analyst.scrapers.scraper_methods import scrape_urls
 
 
 class LLMAnalyst(ResearchState):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-        self.cfg = kwargs.get("config", Config())
-
-        self.llm_provider = self.cfg.llm_provider(
-            model=self.cfg.llm_model,
-            temperature=self.cfg.llm_temperature,
-            max_tokens=self.cfg.llm_token_limit,
+        self.context = kwargs.get("context", None) or RuntimeContext.for_config(
+            kwargs.get("config", None)
         )
-
+        self.cfg = self.context.cfg
         self.prompts = Prompts(self.cfg)
 
+    @property
+    def llm_provider(self):
+        """The chat model client is borrowed from the shared RuntimeContext on first use"""
+        return self.context.get_llm_client()
+
+    def get_llm_provider(self, prompt_nm):
+        """The chat model client for a prompt, routed by the Config llm_prompt_routes"""
+        return self.context.get_llm_client(prompt_nm=prompt_nm)
+
+    @property
+    def checkpoint(self):
+        """The RunCheckpoint of the research run, None when checkpoints are disabled"""
+        return RunCheckpoint.for_state(self, self.cfg)
+
+    def _get_checkpoint_scope(self):
+        """Stages of a subtopic are saved apart from the same stage of the main topic"""
+        return [self.report_type, self.main_research_topic, self.active_research_topic]
+
+    def get_stage_status(self, stage):
+        """The RunCheckpoint status of the research method stage of this state, None when
+        it was not started in the run or checkpoints are disabled"""
+        checkpoint = self.checkpoint
+        if not checkpoint:
+            return None
+        return checkpoint.get_stage_status(stage, *self._get_checkpoint_scope())
+
+    @traced("conduct_research")
     async def conduct_research(self):
         """The Analysts main task is to conduct research
         """
-        if not (self.agent_type):
-            await self.choose_agent()
-
-        match self.data_source:
-            case DataSource.WEB:
-                self.research_findings = await self._research_by_internet_search()
-            case DataSource.LOCAL_STORE:
-                self.research_findings = await self._research_by_local_store_search()
-            case DataSource.SELECT_URLS:
-                self.research_findings = await self._research_by_custom_urls()
-            case _:
-                err_msg = "ERROR: Unknown DataSource {self.data_source} in LLMAnalyst.conduct_research()"
-                logging.error(err_msg)
-                raise LLMAnalystsException(err_msg)
-
-        if not self.initial_findings:
-            self.initial_findings = self.research_findings
-
-        return self.copy_state()
-
+        current_span().set_attributes(
+            topic=self.active_research_topic, data_source=self.data_source.value
+        )
+        if not RunCheckpoint.is_in_run(self):
+            RunCheckpoint.start_run(self, self.cfg, "conduct_research")
+        with metrics.use_run_metrics(self.run_id):
+            # In speculative mode the web search chooses the agent while the topic is researched
+            speculative = self.data_source == DataSource.WEB and self._is_speculative()
+            if not (self.agent_type) and not speculative:
+                await self.choose_agent()
+
+            match self.data_source:
+                case DataSource.WEB:
+                    self.research_findings = await self._research_by_internet_search()
+                case DataSource.LOCAL_STORE:
+                    self.research_findings = await self._research_by_local_store_search()
+                case DataSource.SELECT_URLS:
+                    self.research_findings = await self._research_by_custom_urls()
+                case _:
+                    err_msg = "ERROR: Unknown DataSource {self.data_source} in LLMAnalyst.conduct_research()"
+                    logging.error(err_msg)
+                    raise LLMAnalystsException(err_msg)
+
+            if not self.initial_findings:
+                self.initial_findings = self.research_findings
+
+            return self.copy_state()
+
+    @traced("choose_agent")
     async def choose_agent(self, research_topic=None):
         """Given an active_research_topic
         1. Find an appropriate type of Researcher (Agent) to do the work
         2. Note: The prompt that is returned is used to guide the LLM
         """
-        default_response = {
-            "agent_type": "Default Agent",
-            "agents_role_prompt": self.prompts.get_prompt("agents_role_prompt"),
-            "active_research_topic": self.active_research_topic,
-        }
-        try:
-            choose_agent_topic = self.active_research_topic
-            if research_topic:
-                choose_agent_topic = research_topic
-
-            llm_system_prompt = self.prompts.get_prompt("choose_agent_prompt")
-            llm_user_prompt = (
-                f"{self.main_research_topic} - {choose_agent_topic}"
-                if self.main_research_topic
-                else choose_agent_topic
-            )
-            chat_response = await self.llm_provider.get_chat_response(
-                llm_system_prompt, llm_user_prompt
-            )
-            logging.debug("PROMPT choose_agent response = %s", chat_response)
-
-            chat_response_json = json.loads(chat_response)
-        except Exception as e:
-            logging.error("Error in choose_agent WILL ATTEMPT to recover %s", e)
-            chat_response_json = await self._extract_json_from_string(
-                chat_response, default_response
+        choose_agent_topic = self.active_research_topic
+        if research_topic:
+            choose_agent_topic = research_topic
+
+        checkpoint = self.checkpoint
+        chat_response_json = None
+        if checkpoint:
+            chat_response_json = checkpoint.load(
+                "agent", self.main_research_topic, choose_agent_topic
             )
+        if chat_response_json is None:
+            chat_response_json = await self._request_agent(choose_agent_topic)
+            if chat_response_json is None:
+                chat_response_json = {
+                    "agentType": "Default Agent",
+                    "agentRole": self.prompts.get_prompt("agents_role_prompt"),
+                }
+            elif checkpoint:
+                checkpoint.save(
+                    "agent", chat_response_json, self.main_research_topic, choose_agent_topic
+                )
 
         self.agent_type = chat_response_json["agentType"]
         self.agents_role_prompt = chat_response_json["agentRole"]
@@ -96,27 +127,239 @@ class LLMAnalyst(ResearchState):
         )
         return research_state
 
+    async def _request_agent(self, choose_agent_topic):
+        """Ask the LLM for the agent, None when no agent could be parsed"""
+        chat_response = None
+        try:
+            llm_system_prompt = self.prompts.get_prompt("choose_agent_prompt")
+            llm_user_prompt = (
+                f"{self.main_research_topic} - {choose_agent_topic}"
+                if self.main_research_topic
+                else choose_agent_topic
+            )
+            chat_response = await self.get_llm_provider("choose_agent_prompt").get_chat_response(
+                llm_system_prompt, llm_user_prompt, prompt_nm="choose_agent_prompt"
+            )
+            logging.debug("PROMPT choose_agent response = %s", chat_response)
+        except Exception as e:
+            logging.error("Error in choose_agent WILL USE the default agent %s", e)
+
+        chat_response_json = await parse_json_response(
+            chat_response,
+            dict,
+            None,
+            llm_provider=self.get_llm_provider("choose_agent_prompt"),
+            validate=lambda value: "agentType" in value and "agentRole" in value,
+        )
+        return chat_response_json
+
     async def _research_by_internet_search(self):
         """Given an active_research_topic
         1. Find a list of related subtopic to search. (LLM)
         2. For each subtopic find a list of URLs. (Search Engine)
         3. For each URL scrape the web site for content.
         """
+        scrape_planner = self._get_scrape_planner()
+        if scrape_planner:
+            return await self._research_by_planned_scrapes(scrape_planner)
+        if self._is_speculative():
+            return await self._research_by_internet_search_speculative()
+
         context = []
         # Generate Sub-Queries including original query
         sub_queries = await self._get_sub_queries() + [self.active_research_topic]
 
+        # All the sub-queries are searched in one search_many request
+        search_results_by_query = await self._search_unresearched_queries(sub_queries)
+
         # Using asyncio.gather to process the sub_queries asynchronously
         context = await asyncio.gather(
-            *[self._process_internet_query(sub_query) for sub_query in sub_queries]
+            *[
+                self._process_internet_query(
+                    sub_query, search_results=search_results_by_query.get(sub_query, None)
+                )
+                for sub_query in sub_queries
+            ]
         )
         return context
 
-    async def _process_internet_query(self, sub_query: str):
+    async def _research_by_internet_search_speculative(self):
+        """Same as _research_by_internet_search, but searching, scraping and compressing
+        the active_research_topic starts at once as it needs neither the agent nor the sub-queries.
+        choose_agent and _get_sub_queries run while the topic is being researched.
+        """
+        topic_task = asyncio.create_task(
+            self._process_internet_query(self.active_research_topic)
+        )
+        try:
+            if not (self.agent_type):
+                await self.choose_agent()
+            sub_queries = await self._get_sub_queries()
+        except BaseException:
+            topic_task.cancel()
+            raise
+
+        # The topic is already being researched so it is not repeated as a sub-query
+        sub_queries = [
+            sub_query for sub_query in sub_queries if sub_query != self.active_research_topic
+        ]
+        search_results_by_query = await self._search_unresearched_queries(sub_queries)
+        context = await asyncio.gather(
+            *[
+                self._process_internet_query(
+                    sub_query, search_results=search_results_by_query.get(sub_query, None)
+                )
+                for sub_query in sub_queries
+            ],
+            topic_task,
+        )
+        return context
+
+    async def _research_by_planned_scrapes(self, scrape_planner):
+        """Same as _research_by_internet_search, but every sub-query is searched before
+        anything is scraped. The URLs of all the sub-queries are ranked together by the
+        ScrapePlanner, only the best ones within the scrape budget are scraped, and each
+        page is compressed for the sub-queries that found it.
+        """
+        sub_queries = await self._get_sub_queries() + [self.active_research_topic]
+
+        checkpoint = self.checkpoint
+        content_by_query = {}
+        if checkpoint:
+            for sub_query in sub_queries:
+                findings = checkpoint.load("findings", *self._get_checkpoint_scope(), sub_query)
+                if findings is not None:
+                    await self._keep_unique_urls(findings["visited_urls"])
+                    content_by_query[sub_query] = findings["content"]
+        new_sub_queries = [
+            sub_query for sub_query in dict.fromkeys(sub_queries) if sub_query not in content_by_query
+        ]
+
+        search_results = await self._search_by_queries(new_sub_queries)
+        search_results, unscraped_pages_by_query = await self._get_unscraped_pages(
+            new_sub_queries, search_results
+        )
+        with span("plan_scrapes") as plan_span:
+            planned_urls = scrape_planner.plan(
+                zip(new_sub_queries, search_results), self.visited_urls
+            )
+            sites_by_query, scraped_urls = await asyncio.to_thread(
+                scrape_planner.scrape, planned_urls, self.context.scrape_urls
+            )
+            # URLs left out by the budget stay unvisited, a later subtopic may still scrape them
+            await self._keep_unique_urls(scraped_urls)
+            plan_span.set_attributes(
+                candidate_count=sum(len(results) for results in search_results),
+                planned_count=len(planned_urls),
+                scraped_count=len(scraped_urls),
+            )
+
+        # Marked visited after the plan, so a URL another sub-query scrapes is not left out
+        for sub_query, unscraped_pages in unscraped_pages_by_query.items():
+            sites_by_query.setdefault(sub_query, []).extend(unscraped_pages)
+            await self._keep_unique_urls([page["url"] for page in unscraped_pages])
+
+        contents = await asyncio.gather(
+            *[
+                self._get_similar_content_by_query(sub_query, sites_by_query.get(sub_query, []))
+                for sub_query in new_sub_queries
+            ]
+        )
+        for sub_query, content in zip(new_sub_queries, contents):
+            content_by_query[sub_query] = content
+            if checkpoint:
+                findings = {
+                    "content": content,
+                    "visited_urls": [site["url"] for site in sites_by_query.get(sub_query, [])],
+                }
+                checkpoint.save("findings", findings, *self._get_checkpoint_scope(), sub_query)
+        return [content_by_query[sub_query] for sub_query in sub_queries]
+
+    async def _get_unscraped_pages(self, sub_queries, search_results):
+        """Split the search results of each sub-query into the results still to scrape and the
+        pages that need no scrape: the content the search provider supplied, and with a
+        snippet_threshold the snippets of the results not worth scraping.
+        Returns ([search results to scrape] per sub-query, {sub_query: [page]})"""
+        split_results = await asyncio.gather(
+            *[
+                self._split_search_results(sub_query, results)
+                for sub_query, results in zip(sub_queries, search_results)
+            ]
+        )
+        unscraped_pages_by_query = {
+            sub_query: [page for page in unscraped_pages if page["url"] not in self.visited_urls]
+            for sub_query, (_, unscraped_pages) in zip(sub_queries, split_results)
+        }
+        return [results_to_scrape for results_to_scrape, _ in split_results], unscraped_pages_by_query
+
+    async def _split_search_results(self, sub_query, search_results):
+        """(search results to scrape, pages that need no scrape) for the search_results of sub_query"""
+        unscraped_pages, search_results = get_provided_pages(search_results)
+        snippet_filter = self._get_snippet_filter()
+        if snippet_filter:
+            search_results, snippet_pages = await asyncio.to_thread(
+                snippet_filter.split, sub_query, search_results
+            )
+            unscraped_pages += snippet_pages
+        return search_results, unscraped_pages
+
+    def _get_scrape_planner(self):
+        """The ScrapePlanner of the configured scrape budget, None when there is no budget"""
+        max_pages = int(getattr(self.cfg, "scrape_budget_pages", None) or 0)
+        max_bytes = int(getattr(self.cfg, "scrape_budget_bytes", None) or 0)
+        if not (max_pages or max_bytes):
+            return None
+        return ScrapePlanner(max_pages, max_bytes)
+
+    def _get_snippet_filter(self):
+        """The SnippetFilter of the configured snippet_threshold, None when every search
+        result is scraped"""
+        snippet_threshold = getattr(self.cfg, "snippet_threshold", None)
+        if snippet_threshold in (None, ""):
+            return None
+        return SnippetFilter(self.context.embedding_provider, float(snippet_threshold))
+
+    def _is_speculative(self):
+        # Planned scrapes need the search results of every sub-query, they cannot start early
+        if self._get_scrape_planner():
+            return False
+        return bool(getattr(self.cfg, "speculative_research", False))
+
+    async def _search_unresearched_queries(self, sub_queries):
+        """{sub_query: search results} of the sub_queries that have no saved findings,
+        searched with one search_many request"""
+        checkpoint = self.checkpoint
+        if checkpoint:
+            sub_queries = [
+                sub_query
+                for sub_query in sub_queries
+                if checkpoint.load("findings", *self._get_checkpoint_scope(), sub_query) is None
+            ]
+        sub_queries = list(dict.fromkeys(sub_queries))
+        return dict(zip(sub_queries, await self._search_by_queries(sub_queries)))
+
+    @traced("research_query")
+    async def _process_internet_query(self, sub_query: str, search_results=None):
         """Takes in a sub query and scrapes urls based on it and gathers context.
+        The sub query is searched unless its search_results are given.
         """
-        scraped_sites = await self._scrape_sites_by_query(sub_query)
+        current_span().set_attribute("query", sub_query)
+        checkpoint = self.checkpoint
+        if checkpoint:
+            findings = checkpoint.load("findings", *self._get_checkpoint_scope(), sub_query)
+            if findings is not None:
+                await self._keep_unique_urls(findings["visited_urls"])
+                return findings["content"]
+
+        scraped_sites = await self._scrape_sites_by_query(sub_query, search_results)
         content = await self._get_similar_content_by_query(sub_query, scraped_sites)
+
+        if checkpoint:
+            findings = {
+                "content": content,
+                "visited_urls": [site["url"] for site in scraped_sites],
+            }
+            checkpoint.save("findings", findings, *self._get_checkpoint_scope(), sub_query)
         return content
 
     async def _research_by_local_store_search(self):
@@ -124,9 +367,13 @@ class LLMAnalyst(ResearchState):
         1. Find a list of related subtopic to search. (LLM)
         2. For each topic extract similar data from local store
         """
+        # Imported here as the vector store pulls in Chroma and sentence-transformers
+        from llm_analyst.documents.vector_store import VectorStore
 
         vector_store = await VectorStore.create(
-            self.cfg.cache_dir, self.cfg.local_store_dir
+            self.cfg.cache_dir,
+            self.cfg.local_store_dir,
+            embedding_function=self.cfg.local_store_embedding_provider,
         )
         context = []
         # Generate Sub-Queries including original query
@@ -148,7 +395,7 @@ class LLMAnalyst(ResearchState):
         # document_data = await self._get_docs_by_query(sub_query)
         pages = await vector_store.retrieve_pages_for_query(sub_query)
         context_compressor = ContextCompressor(
-            documents=pages, embeddings=self.cfg.embedding_provider
+            documents=pages, embeddings=self.context.embedding_provider
         )
         content = context_compressor.get_context(sub_query, max_results=8)
         await self._keep_unique_urls(context_compressor.unique_documents_visited)
@@ -158,19 +405,40 @@ class LLMAnalyst(ResearchState):
         """
         Scrapes and compresses the context from the given urls
         """
+        checkpoint = self.checkpoint
+        if checkpoint:
+            findings = checkpoint.load(
+                "findings", *self._get_checkpoint_scope(), self.custom_search_urls
+            )
+            if findings is not None:
+                await self._keep_unique_urls(self.custom_search_urls)
+                return findings
+
         new_search_urls = await self._keep_unique_urls(self.custom_search_urls)
-        scraped_sites = scrape_urls(new_search_urls)
-        return await self._get_similar_content_by_query(
+        scraped_sites = await asyncio.to_thread(self.context.scrape_urls, new_search_urls)
+        findings = await self._get_similar_content_by_query(
             self.active_research_topic, scraped_sites
         )
+        if checkpoint:
+            checkpoint.save(
+                "findings", findings, *self._get_checkpoint_scope(), self.custom_search_urls
+            )
+        return findings
 
+    @traced("get_sub_queries")
     async def _get_sub_queries(self):
         """
         Given an active_research_topic
         Request a list of sub queries that could appropriately answer the active_research_topic
         """
+        checkpoint = self.checkpoint
+        if checkpoint:
+            sub_queries = checkpoint.load("sub_queries", *self._get_checkpoint_scope())
+            if sub_queries is not None:
+                return sub_queries
+
         default_response = []
-        sub_queries = None
+        chat_response = None
         try:
             if (
                 self.report_type == ReportType.DETAILED_REPORT
@@ -187,71 +455,48 @@ class LLMAnalyst(ResearchState):
                 datetime_now=datetime.now().strftime("%B %d, %Y"),
             )
 
-            chat_response = await self.llm_provider.get_chat_response(
-                self.agents_role_prompt, search_queries_prompt
+            chat_response = await self.get_llm_provider("search_queries_prompt").get_chat_response(
+                self.agents_role_prompt, search_queries_prompt, prompt_nm="search_queries_prompt"
             )
             logging.debug("PROMPT get_sub_queries response = %s", chat_response)
 
-            sub_queries = json.loads(chat_response)
-
         except Exception as e:
-            logging.error("Error in get_sub_queries WILL ATTEMPT to recover %s", e)
-            sub_queries = await self._extract_json_from_string(
-                chat_response, default_response
-            )
+            logging.error("Error in get_sub_queries %s", e)
+
+        sub_queries = await parse_json_response(
+            chat_response,
+            list,
+            default_response,
+            llm_provider=self.get_llm_provider("search_queries_prompt"),
+            validate=is_list_of_strings,
+        )
+        # A failed request is not saved, resuming the run will try it again
+        save_checkpoint = checkpoint and sub_queries is not default_response
 
         if self.report_type != ReportType.SUBTOPIC_REPORT:
             sub_queries.append(self.active_research_topic)
 
+        if save_checkpoint:
+            checkpoint.save("sub_queries", sub_queries, *self._get_checkpoint_scope())
+        current_span().set_attribute("sub_query_count", len(sub_queries))
         return sub_queries
 
     async def _keep_unique_urls(self, url_set_input):
-        """Parse the URLS and remove any duplicates
+        """Parse the URLS and remove any duplicates, the URLs of a page already visited
+        under another URL included. The URLs kept are marked visited.
         """
-        new_urls = []
-
-        for url in url_set_input:
-            if url not in self.visited_urls:
-                self.visited_urls.append(url)
-                new_urls.append(url)
-
-        return new_urls
-
-    async def _extract_json_from_string(self, chat_response, default_response):
-        """Helper method
-        In some case the requested JSON response from the LLM is wrapped in explanatory text
-        this method attempts to extract JSON from the LLM response
-        """
-        result_json = default_response
-        stack = []
-        json_str = ""
-        in_json = False
-
-        for char in chat_response:
-            if char == "{":
-                stack.append(char)
-                in_json = True
-            if in_json:
-                json_str += char
-            if char == "}":
-                stack.pop()
-                if not stack:
-                    in_json = False
-                    break
-
-        if json_str:
-            try:
-                # Attempt to parse the extracted string as JSON
-                json_data = json.loads(json_str)
-                result_json = json_data
-            except json.JSONDecodeError:
-                pass
-
-        return result_json
+        return self.visited_urls.add_many(url_set_input)
 
+    @traced("select_subtopics")
     async def select_subtopics(self, subtopics: list = []) -> list:
+        checkpoint = self.checkpoint
+        if checkpoint:
+            sub_queries = checkpoint.load("subtopics", *self._get_checkpoint_scope(), subtopics)
+            if sub_queries is not None:
+                return sub_queries
+
         default_response = []
-        sub_queries = None
+        chat_response = None
         try:
             format_instructions = 'You MUST respond with a list of strings in the following format: ["subtopic 1", "subtopic 2", "subtopic 3"]. The response should contain ONLY the list.'
 
@@ -264,53 +509,114 @@ class LLMAnalyst(ResearchState):
                 format_instructions=format_instructions,
             )
 
-            chat_response = await self.llm_provider.get_chat_response(
-                self.agents_role_prompt, subtopics_prompt
+            chat_response = await self.get_llm_provider("subtopics_prompt").get_chat_response(
+                self.agents_role_prompt, subtopics_prompt, prompt_nm="subtopics_prompt"
             )
-            logging.debug("PROMPT get_sub_queries response = %s", chat_response)
-
-            sub_queries = json.loads(chat_response)
+            logging.debug("PROMPT select_subtopics response = %s", chat_response)
 
         except Exception as e:
-            logging.error("Error in get_sub_queries WILL ATTEMPT to recover %s", e)
-            sub_queries = await self._extract_json_from_string(
-                chat_response, default_response
-            )
+            logging.error("Error in select_subtopics %s", e)
+
+        sub_queries = await parse_json_response(
+            chat_response,
+            list,
+            default_response,
+            llm_provider=self.get_llm_provider("subtopics_prompt"),
+            validate=is_list_of_strings,
+        )
+        save_checkpoint = checkpoint and sub_queries is not default_response
 
         if self.report_type != ReportType.SUBTOPIC_REPORT:
             sub_queries.append(self.active_research_topic)
 
+        if save_checkpoint:
+            checkpoint.save("subtopics", sub_queries, *self._get_checkpoint_scope(), subtopics)
         return sub_queries
 
-    async def _scrape_sites_by_query(self, sub_query):
+    async def _scrape_sites_by_query(self, sub_query, search_results=None):
         """Given a sub_query
-        1. Call the configured internet search provider and retrieve a list of URLs
+        1. Call the configured internet search provider and retrieve a list of URLs,
+           unless the search_results are given
         2. Keep only the Unique URLs
-        3. Scrape the proved site for content
+        3. Use the page content the search provider supplied as it is
+        4. With a snippet_threshold, keep only the URLs whose snippet is relevant to the sub_query
+        5. Scrape the proved site for content, the other URLs contribute their snippet
         """
-        search_results = self.cfg.internet_search(
-            sub_query, max_results=self.cfg.max_search_results_per_query
-        )
+        if search_results is None:
+            search_results = await self._search_by_query(sub_query)
         new_search_urls = await self._keep_unique_urls(
             [url.get("href") for url in search_results]
         )
-        scraped_content_results = scrape_urls(new_search_urls)
-        return scraped_content_results
+
+        new_search_results = list(
+            {
+                result.get("href"): result
+                for result in search_results
+                if result.get("href") in new_search_urls
+            }.values()
+        )
+        search_results_to_scrape, unscraped_pages = await self._split_search_results(
+            sub_query, new_search_results
+        )
+
+        scraped_content_results = await asyncio.to_thread(
+            self.context.scrape_urls, [result.get("href") for result in search_results_to_scrape]
+        )
+        return scraped_content_results + unscraped_pages
+
+    async def _search_by_query(self, sub_query):
+        """The results of the configured internet search provider for sub_query"""
+        # Search and scrape are blocking, run them in threads so the sub-queries overlap
+        provider_nm = self.cfg.internet_search.__name__
+        with span("search", query=sub_query, provider=provider_nm) as search_span:
+            start_time = time.perf_counter()
+            search_results = await asyncio.to_thread(
+                self.context.internet_search,
+                sub_query,
+                max_results=self.cfg.max_search_results_per_query,
+            )
+            metrics.record_search(
+                provider_nm, len(search_results), time.perf_counter() - start_time
+            )
+            search_span.set_attribute("result_count", len(search_results))
+        return search_results
+
+    async def _search_by_queries(self, sub_queries):
+        """The results of the configured internet search provider for each of sub_queries,
+        in one search_many request where the provider supports it"""
+        if not sub_queries:
+            return []
+        provider_nm = self.cfg.internet_search.__name__
+        with span("search", query_count=len(sub_queries), provider=provider_nm) as search_span:
+            start_time = time.perf_counter()
+            search_results = await asyncio.to_thread(
+                self.context.search_many,
+                sub_queries,
+                max_results=self.cfg.max_search_results_per_query,
+            )
+            latency = time.perf_counter() - start_time
+            for query_results in search_results:
+                metrics.record_search(provider_nm, len(query_results), latency)
+            search_span.set_attribute(
+                "result_count", sum(len(query_results) for query_results in search_results)
+            )
+        return search_results
 
     async def _get_similar_content_by_query(self, query, pages):
         """Instead of immediately returning retrieved documents as-is,
         they are compressed using the context of the given query,
         then only the relevant information is returned."""
         context_compressor = ContextCompressor(
-            documents=pages, embeddings=self.cfg.embedding_provider
+            documents=pages, embeddings=self.context.embedding_provider
         )
-        return context_compressor.get_context(query, max_results=8)
+        # The embedding calls block, run them in a thread so other queries keep moving
+        return await asyncio.to_thread(context_compressor.get_context, query, max_results=8)
 
     # ##########################################################################################
 
-    async def write_report(self):
-        """
-        Generate a report based on the report_type specified
+    def _get_report_prompt(self):
+        """Build the report prompt for the report_type specified
+        Returns (report_prompt_nm, report_prompt)
         """
         report_prompt_nm = f"{self.report_type.value}_prompt"
         report_format = "APA"
@@ -340,15 +646,55 @@ class LLMAnalyst(ResearchState):
                 report_format=report_format,
                 datetime_now=datetime_now,
             )
+        return report_prompt_nm, report_prompt
 
+    @traced("write_report")
+    async def write_report(self):
+        """
+        Generate a report based on the report_type specified
+        """
+        current_span().set_attributes(
+            topic=self.active_research_topic, report_type=self.report_type.value
+        )
+        with metrics.use_run_metrics(self.run_id):
+            checkpoint = self.checkpoint
+            if checkpoint:
+                report_md = checkpoint.load("report", *self._get_checkpoint_scope())
+                if report_md is not None:
+                    self.report_md = report_md
+                    return self.copy_state()
+                checkpoint.set_stage_status("write_report", STARTED, *self._get_checkpoint_scope())
+
+            report_prompt_nm, report_prompt = self._get_report_prompt()
+            try:
+                chat_response = await self.get_llm_provider(report_prompt_nm).get_chat_response(
+                    self.agents_role_prompt, report_prompt, prompt_nm=report_prompt_nm
+                )
+                logging.debug("PROMPT write_report response = %s", chat_response)
+                self.report_md = chat_response
+                current_span().set_attribute("bytes", len(chat_response or ""))
+                if checkpoint and chat_response:
+                    checkpoint.save("report", chat_response, *self._get_checkpoint_scope())
+                    checkpoint.set_stage_status(
+                        "write_report", COMPLETE, *self._get_checkpoint_scope()
+                    )
+
+            except Exception as e:
+                logging.error("Error in write_report: %s", e)
+
+            return self.copy_state()
+
+    async def astream_report(self):
+        """Generate the report and yield the markdown as it arrives from the LLM.
+        Once the stream is exhausted report_md holds the complete report.
+        """
+        report_prompt_nm, report_prompt = self._get_report_prompt()
+        report_chunks = []
         try:
-            chat_response = await self.llm_provider.get_chat_response(
-                self.agents_role_prompt, report_prompt
-            )
-            logging.debug("PROMPT write_report response = %s", chat_response)
-            self.report_md = chat_response
-
-        except Exception as e:
-            print(f"Error in generate_report: {e}")
-
-        return self.copy_state()
+            async for content in self.get_llm_provider(report_prompt_nm).astream_chat_response(
+                self.agents_role_prompt, report_prompt, prompt_nm=report_prompt_nm
+            ):
+                report_chunks.append(content)
+                yield content
+        finally:
+            self.report_md = "".join(report_chunks)
@@ -3,64 +3,117 @@ This module defines the `LLMEditor` class, which extends the `ResearchState` cla
 class is responsible for editing and organizing research findings generated by the `LLMAnalyst` 
 class, creating a detailed report with subtopics, and finalizing the report for publication.
 """
-from llm_analyst.core.config import Config, ReportType
+import asyncio
+
+from llm_analyst.core.checkpoint import RunCheckpoint
+from llm_analyst.core.config import ReportType
 from llm_analyst.core.prompts import Prompts
+from llm_analyst.core.report_assembler import ReportAssembler
+from llm_analyst.core.runtime_context import RuntimeContext
 from llm_analyst.core.research_state import ResearchState
 from llm_analyst.core.research_analyst import LLMAnalyst
 from llm_analyst.core.research_writer import LLMWriter
+from llm_analyst.utils import metrics
 from llm_analyst.utils.app_logging import logging
+from llm_analyst.utils.tracing import current_span, span, traced
 
 
 class LLMEditor(ResearchState):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-        self.cfg = kwargs.get("config", Config())
-
-        self.llm_provider = self.cfg.llm_provider(
-            model=self.cfg.llm_model,
-            temperature=self.cfg.llm_temperature,
-            max_tokens=self.cfg.llm_token_limit,
+        self.context = kwargs.get("context", None) or RuntimeContext.for_config(
+            kwargs.get("config", None)
         )
-
+        self.cfg = self.context.cfg
         self.prompts = Prompts(self.cfg)
 
+    @property
+    def llm_provider(self):
+        """The chat model client is borrowed from the shared RuntimeContext on first use"""
+        return self.context.get_llm_client()
+
+    @property
+    def checkpoint(self):
+        """The RunCheckpoint of the research run, None when checkpoints are disabled"""
+        return RunCheckpoint.for_state(self, self.cfg)
+
+    @traced("create_detailed_report")
     async def create_detailed_report(self):
-        llm_analyst = LLMAnalyst(config=self.cfg, **self.dump())
-        primary_research = await llm_analyst.conduct_research()
-        logging.debug("=" * 40)
-        logging.debug(primary_research)
-        subtopics = await llm_analyst.select_subtopics()
+        current_span().set_attribute("topic", self.active_research_topic)
+        if not RunCheckpoint.is_in_run(self):
+            RunCheckpoint.start_run(self, self.cfg, "create_detailed_report")
+        with metrics.use_run_metrics(self.run_id):
+            checkpoint = self.checkpoint
 
-        for subtopic in subtopics:
-            print(f"Researching {subtopic}")
-            subtopic_assistant = LLMAnalyst(config=self.cfg, **primary_research.dump())
-            subtopic_assistant.active_research_topic = subtopic
-            subtopic_assistant.report_type = ReportType.SUBTOPIC_REPORT
-            subtopic_assistant.main_research_topic = (
-                primary_research.active_research_topic
-            )
+            llm_analyst = LLMAnalyst(context=self.context, **self.dump_refs())
+            RunCheckpoint.join_run(llm_analyst, self.run_id)
+            primary_research = await llm_analyst.conduct_research()
+            logging.debug("=" * 40)
+            logging.debug(primary_research)
 
-            subtopic_research = await subtopic_assistant.conduct_research()
-            subtopic_report = await subtopic_assistant.write_report()
+            # The introduction only depends on the initial_findings,
+            # write it while the subtopics are researched
+            intro_writer = LLMWriter(context=self.context, **primary_research.dump_refs())
+            RunCheckpoint.join_run(intro_writer, self.run_id)
+            introduction_task = asyncio.create_task(intro_writer.write_introduction())
+            try:
+                subtopics = await llm_analyst.select_subtopics()
+                report_assembler = ReportAssembler(primary_research.report_md)
 
-            primary_research.research_findings = subtopic_assistant.research_findings
-            primary_research.visited_urls = list(
-                set(primary_research.visited_urls).union(
-                    subtopic_assistant.visited_urls
-                )
-            )
-            primary_research.report_md += "\n\n\n" + subtopic_report.report_md
-            logging.debug(
-                f"Writing {subtopic} research_findings=len({len(primary_research.research_findings)})"
-            )
+                for subtopic in subtopics:
+                    print(f"Researching {subtopic}")
+                    subtopic_assistant = LLMAnalyst(
+                        context=self.context, **primary_research.dump_refs()
+                    )
+                    RunCheckpoint.join_run(subtopic_assistant, self.run_id)
+                    subtopic_assistant.active_research_topic = subtopic
+                    subtopic_assistant.report_type = ReportType.SUBTOPIC_REPORT
+                    subtopic_assistant.main_research_topic = (
+                        primary_research.active_research_topic
+                    )
+                    # Headings already written are passed on so they are not repeated
+                    subtopic_assistant.report_headings = report_assembler.header_texts()
 
-        llm_writer = LLMWriter(config=self.cfg, **primary_research.dump())
+                    subtopic_report = None
+                    if checkpoint:
+                        subtopic_report = checkpoint.load_state(
+                            "subtopic_report", primary_research.active_research_topic, subtopic
+                        )
+                    if subtopic_report is None:
+                        with span("subtopic", subtopic=subtopic):
+                            await subtopic_assistant.conduct_research()
+                            subtopic_report = await subtopic_assistant.write_report()
+                        if checkpoint and subtopic_report.report_md:
+                            checkpoint.save_state(
+                                "subtopic_report",
+                                subtopic_report,
+                                primary_research.active_research_topic,
+                                subtopic,
+                            )
 
-        introduction = await llm_writer.write_introduction()
-        toc = await llm_writer.write_table_of_contents()
-        references = await llm_writer.write_references()
-        primary_research.final_report_md = (
-            f"{introduction}\n\n{toc}\n\n{primary_research.report_md}\n\n{references}"
-        )
-        return primary_research.copy_state()
+                    primary_research.research_findings = subtopic_report.get_findings_refs(
+                        "research_findings"
+                    )
+                    primary_research.visited_urls.add_many(subtopic_report.visited_urls)
+                    report_assembler.add_section(subtopic_report.report_md)
+                    logging.debug(
+                        "Writing %s research_findings=len(%s)",
+                        subtopic,
+                        len(primary_research.get_findings_refs("research_findings")),
+                    )
+
+                introduction = await introduction_task
+            finally:
+                introduction_task.cancel()
+
+            primary_research.report_md = report_assembler.report_md
+            primary_research.report_headings = report_assembler.header_texts()
+            llm_writer = LLMWriter(context=self.context, **primary_research.dump_refs())
+
+            toc = report_assembler.table_of_contents()
+            references = await llm_writer.write_references()
+            primary_research.final_report_md = (
+                f"{introduction}\n\n{toc}\n\n{primary_research.report_md}\n\n{references}"
+            )
+            return primary_research.copy_state()
@@ -3,47 +3,133 @@ This module defines the `LLMPublisher` class, which extends the `ResearchState`
 The `LLMPublisher` class is responsible for publishing research reports generated by the 
 `LLMEditor` class to various file formats, including Markdown, PDF, and DOCX.
 """
+import asyncio
+import hashlib
+import multiprocessing
 import os
+import shutil
 import urllib
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 
 import aiofiles
-import mistune
-from docx import Document
-from htmldocx import HtmlToDocx
-from md2pdf.core import md2pdf
 
-from llm_analyst.core.config import Config
+from llm_analyst.core.exceptions import LLMAnalystsException
 from llm_analyst.core.prompts import Prompts
+from llm_analyst.core.runtime_context import RuntimeContext
 from llm_analyst.core.research_state import ResearchState
 from llm_analyst.utils.app_logging import logging
+from llm_analyst.utils.tracing import current_span, span, traced
 from llm_analyst.utils.utilities import get_resource_path
 
+PUBLISH_FORMATS = ("md", "pdf", "docx")
+PUBLISH_MAX_WORKERS = 2
+
+_publish_pool = None
+
+
+def _get_publish_pool():
+    """The process pool shared by every publisher, started on first use.
+    Workers are spawned rather than forked as the parent runs an event loop and threads.
+    """
+    global _publish_pool
+    if _publish_pool is None:
+        _publish_pool = ProcessPoolExecutor(
+            max_workers=PUBLISH_MAX_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _publish_pool
+
+
+def _reset_publish_pool():
+    global _publish_pool
+    if _publish_pool is not None:
+        _publish_pool.shutdown(wait=False, cancel_futures=True)
+    _publish_pool = None
+
+
+def _get_file_sha(file_path):
+    with open(file_path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def _store_in_render_cache(file_path, cache_path):
+    """Copy a rendered file into the render cache, atomically so a concurrent reader
+    never sees a partly written file"""
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+    shutil.copyfile(file_path, tmp_path)
+    os.replace(tmp_path, cache_path)
+
+
+def _render_html(report_md):
+    import mistune
+
+    return mistune.html(report_md)
+
+
+def _write_pdf_file(html, pdf_file_path):
+    """Runs in the publish process pool, WeasyPrint is slow to import and render"""
+    from weasyprint import CSS, HTML
+
+    pdf_styles_path = os.path.join(get_resource_path(), "pdf_styles.css")
+    HTML(string=html, base_url=os.getcwd()).write_pdf(
+        pdf_file_path, stylesheets=[CSS(filename=pdf_styles_path)]
+    )
+    return pdf_file_path
+
+
+def _write_docx_file(html, docx_file_path):
+    """Runs in the publish process pool"""
+    from docx import Document
+    from htmldocx import HtmlToDocx
+
+    doc = Document()
+    HtmlToDocx().add_html_to_document(html, doc)
+    doc.save(docx_file_path)
+    return docx_file_path
+
 
 class LLMPublisher(ResearchState):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-        self.cfg = kwargs.get("config", Config())
-
-        self.llm_provider = self.cfg.llm_provider(
-            model=self.cfg.llm_model,
-            temperature=self.cfg.llm_temperature,
-            max_tokens=self.cfg.llm_token_limit,
+        self.context = kwargs.get("context", None) or RuntimeContext.for_config(
+            kwargs.get("config", None)
         )
-
+        self.cfg = self.context.cfg
         self.prompts = Prompts(self.cfg)
 
     def _get_file_path(self):
-        # file_nm = uuid.uuid4().hex
         now = datetime.now()
         formatted_date_time = now.strftime("%Y-%m-%d-%H%M%S%f")[:-2]
-        file_nm = f"Research-{formatted_date_time}"
+        # The timestamp alone collides when several reports are published concurrently
+        file_nm = f"Research-{formatted_date_time}-{uuid.uuid4().hex[:8]}"
         file_path = os.path.join(self.cfg.report_out_dir, f"{file_nm}")
         if file_path[0] == "~":
             file_path = os.path.expanduser(file_path)
         return file_path
 
+    def _get_render_cache_path(self, report_md, publish_format):
+        """Cached renders are keyed by the markdown, the PDF stylesheet and the format.
+        Returns None when no cache_dir is configured.
+        """
+        if not self.cfg.cache_dir:
+            return None
+        report_sha = hashlib.sha256(report_md.encode("utf-8")).hexdigest()
+        css_sha = _get_file_sha(os.path.join(get_resource_path(), "pdf_styles.css"))
+        cache_dir = os.path.join(os.path.expanduser(self.cfg.cache_dir), "renders")
+        return os.path.join(cache_dir, f"{report_sha}-{css_sha[:16]}.{publish_format}")
+
+    def _get_report_to_publish(self):
+        if self.final_report_md:
+            report_to_publish = self.final_report_md
+        else:
+            report_to_publish = self.report_md
+        # Convert text to UTF-8, replacing any problematic characters
+        return report_to_publish.encode("utf-8", errors="replace").decode("utf-8")
+
     async def publish_to_md_file(self) -> None:
         """Asynchronously write md to a file in UTF-8 encoding.
 
@@ -56,44 +142,53 @@ class LLMPublisher(ResearchState):
 
         directory = os.path.dirname(filename)
         if not os.path.exists(directory):
-            os.makedirs(directory)
+            os.makedirs(directory, exist_ok=True)
 
-        # Convert text to UTF-8, replacing any problematic characters
-        if self.final_report_md:
-            report_to_publish = self.final_report_md
-        else:
-            report_to_publish = self.report_md
-
-        text_utf8 = report_to_publish.encode("utf-8", errors="replace").decode("utf-8")
+        text_utf8 = self._get_report_to_publish()
         async with aiofiles.open(filename, "w", encoding="utf-8") as file:
             await file.write(text_utf8)
 
         return file_path
 
+    async def publish_stream_to_md_file(self, report_stream, on_content=None) -> str:
+        """Write markdown to a file as it is generated, for example from LLMAnalyst.astream_report().
+
+        Args:
+            report_stream: Async iterator of markdown strings.
+            on_content: Optional async callback given each piece of markdown once it is
+                written, used to push the report to clients incrementally.
+        Returns:
+            str: The file path without the .md extension, as with publish_to_md_file.
+        """
+        file_path = self._get_file_path()
+        filename = f"{file_path}.md"
+
+        directory = os.path.dirname(filename)
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        report_chunks = []
+        async with aiofiles.open(filename, "w", encoding="utf-8") as file:
+            async for content in report_stream:
+                text_utf8 = content.encode("utf-8", errors="replace").decode("utf-8")
+                report_chunks.append(text_utf8)
+                await file.write(text_utf8)
+                await file.flush()
+                if on_content:
+                    await on_content(text_utf8)
+
+        self.report_md = "".join(report_chunks)
+        return file_path
+
     async def publish_to_pdf_file(self) -> str:
         """Converts Markdown text to a PDF file and returns the file path.
         Returns:
             str: The encoded file path of the generated PDF.
         """
-        file_path = await self.publish_to_md_file()
-        pdf_styles_path = os.path.join(get_resource_path(), "pdf_styles.css")
-        logging.debug("pdf_styles_path %s", pdf_styles_path)
-        try:
-            md2pdf(
-                f"{file_path}.pdf",
-                md_content=None,
-                md_file_path=f"{file_path}.md",
-                css_file_path=pdf_styles_path,
-                base_url=None,
-            )
-            print(f"Report written to {file_path}.pdf")
-        except Exception as e:
-            print(f"Error in converting Markdown to PDF: {e}")
-            logging.error("Error in converting Markdown to PDF: %s", e)
+        file_paths = await self.publish_all(formats=["md", "pdf"])
+        if not file_paths["pdf"]:
             return ""
-
-        encoded_file_path = urllib.parse.quote(f"{file_path}.pdf")
-        return encoded_file_path
+        return urllib.parse.quote(file_paths["pdf"])
 
     async def publish_to_word_file(self) -> str:
         """Converts Markdown text to a DOCX file and returns the file path.
@@ -101,28 +196,134 @@ class LLMPublisher(ResearchState):
         Returns:
             str: The encoded file path of the generated DOCX.
         """
-        file_path = await self.publish_to_md_file()
+        file_paths = await self.publish_all(formats=["md", "docx"])
+        if not file_paths["docx"]:
+            return ""
+        return urllib.parse.quote(file_paths["docx"])
+
+    @traced("publish_all")
+    async def publish_all(self, formats=PUBLISH_FORMATS) -> dict:
+        """Publish the report to every requested format under one shared base name.
+
+        The markdown is rendered to HTML once and the PDF and DOCX files are built from
+        that HTML in a process pool, so the event loop is free while they are written.
+
+        Args:
+            formats (list): Any of "md", "pdf" and "docx".
+        Returns:
+            dict: The file path written for each format, "" for a format that failed.
+        """
+        unknown_formats = [
+            publish_format for publish_format in formats if publish_format not in PUBLISH_FORMATS
+        ]
+        if unknown_formats:
+            raise LLMAnalystsException(
+                f"Unsupported publish format(s) {unknown_formats}, expected {PUBLISH_FORMATS}"
+            )
+
+        file_path = self._get_file_path()
+        directory = os.path.dirname(file_path)
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        report_to_publish = self._get_report_to_publish()
+        current_span().set_attributes(formats=list(formats), bytes=len(report_to_publish))
+        file_paths = {}
+
+        if "md" in formats:
+            filename = f"{file_path}.md"
+            async with aiofiles.open(filename, "w", encoding="utf-8") as file:
+                await file.write(report_to_publish)
+            file_paths["md"] = filename
 
-        try:
-            # Convert report markdown to HTML
-            if self.final_report_md:
-                report_to_publish = self.final_report_md
+        converters = {"pdf": _write_pdf_file, "docx": _write_docx_file}
+        formats_to_convert = []
+        cache_paths = {}
+        for publish_format in converters:
+            if publish_format not in formats:
+                continue
+            output_path = f"{file_path}.{publish_format}"
+            cache_path = self._get_render_cache_path(report_to_publish, publish_format)
+            if cache_path and os.path.exists(cache_path):
+                logging.debug("Render cache hit %s", cache_path)
+                await asyncio.to_thread(shutil.copyfile, cache_path, output_path)
+                print(f"Report written to {output_path}")
+                file_paths[publish_format] = output_path
             else:
-                report_to_publish = self.report_md
+                cache_paths[publish_format] = cache_path
+                formats_to_convert.append(publish_format)
 
-            html = mistune.html(report_to_publish)
-            # Create a document object
-            doc = Document()
-            HtmlToDocx().add_html_to_document(html, doc)
+        if formats_to_convert:
+            with span("render_html"):
+                html = await asyncio.to_thread(_render_html, report_to_publish)
+            loop = asyncio.get_running_loop()
+            pool = _get_publish_pool()
 
-            # Saving the docx document to file_path
-            doc.save(f"{file_path}.docx")
+            async def convert(publish_format):
+                with span("convert", format=publish_format):
+                    return await loop.run_in_executor(
+                        pool, converters[publish_format], html, f"{file_path}.{publish_format}"
+                    )
 
-            print(f"Report written to {file_path}.docx")
+            conversions = [convert(publish_format) for publish_format in formats_to_convert]
+            results = await asyncio.gather(*conversions, return_exceptions=True)
 
-            encoded_file_path = urllib.parse.quote(f"{file_path}.docx")
-            return encoded_file_path
+            for publish_format, result in zip(formats_to_convert, results):
+                if isinstance(result, BrokenProcessPool):
+                    _reset_publish_pool()
+                if isinstance(result, BaseException):
+                    print(f"Error in converting Markdown to {publish_format.upper()}: {result}")
+                    logging.error(
+                        "Error in converting Markdown to %s: %s", publish_format.upper(), result
+                    )
+                    file_paths[publish_format] = ""
+                    continue
 
-        except Exception as e:
-            print(f"Error in converting Markdown to DOCX: {e}")
-            return ""
+                print(f"Report written to {result}")
+                file_paths[publish_format] = result
+                if cache_paths[publish_format]:
+                    try:
+                        await asyncio.to_thread(
+                            _store_in_render_cache, result, cache_paths[publish_format]
+                        )
+                    except OSError as e:
+                        logging.warning("Could not store %s in the render cache: %s", result, e)
+
+        return file_paths
+
+    @classmethod
+    async def publish_batch(
+        cls, research_state_file_nms, formats=PUBLISH_FORMATS, config=None, max_concurrency=4
+    ) -> list:
+        """Publish many saved ResearchState files concurrently.
+
+        Args:
+            research_state_file_nms (list): Paths of ResearchState json files.
+            formats (list): Any of "md", "pdf" and "docx".
+            config (Config): Shared by every publisher.
+            max_concurrency (int): Number of reports published at the same time.
+        Returns:
+            list: The publish_all result for each file in order, {} for a file that failed.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def publish_one(research_state_file_nm):
+            async with semaphore:
+                research_state = await asyncio.to_thread(
+                    ResearchState.load, research_state_file_nm
+                )
+                llm_publisher = cls(config=config, **research_state.dump_refs())
+                return await llm_publisher.publish_all(formats=formats)
+
+        results = await asyncio.gather(
+            *[publish_one(file_nm) for file_nm in research_state_file_nms],
+            return_exceptions=True,
+        )
+
+        batch_file_paths = []
+        for research_state_file_nm, result in zip(research_state_file_nms, results):
+            if isinstance(result, BaseException):
+                logging.error("Error in publishing %s: %s", research_state_file_nm, result)
+                result = {}
+            batch_file_paths.append(result)
+        return batch_file_paths
@@ -5,9 +5,17 @@ visited URLs, research findings, report headings, and report content.
 
 import json
 import copy
+import os
 from enum import Enum
 from llm_analyst.core.config import ReportType, DataSource
 from llm_analyst.core.exceptions import LLMAnalystsException
+from llm_analyst.core.findings_store import CHUNKS_DIR_NM, FINDINGS_STORE, ChunkRefs
+from llm_analyst.core.visited_urls import VisitedUrls
+
+# Findings are held as ChunkRefs in these attributes, see findings_store.py
+FINDINGS_ATTRS = {"_initial_findings": "initial_findings", "_research_findings": "research_findings"}
+# Attributes held behind a property, dumped under their public names
+PROPERTY_ATTRS = {**FINDINGS_ATTRS, "_visited_urls": "visited_urls"}
 
 
 class ResearchState:
@@ -29,6 +37,53 @@ class ResearchState:
         self.report_headings = kwargs.get("report_headings", [])
         self.report_md = kwargs.get("report_md", "")
         self.final_report_md = kwargs.get("final_report_md", "")
+        # Identifies the run directory the checkpoints of a research run are saved to
+        self.run_id = kwargs.get("run_id", None)
+
+    @staticmethod
+    def _to_findings_refs(findings):
+        chunk_refs = FINDINGS_STORE.put_refs(findings)
+        # Anything that is not text is kept as it is
+        return chunk_refs if chunk_refs is not None else findings
+
+    @staticmethod
+    def _from_findings_refs(findings):
+        if isinstance(findings, ChunkRefs):
+            return FINDINGS_STORE.get_value(findings)
+        return findings
+
+    @property
+    def initial_findings(self):
+        """The findings text, read from the FINDINGS_STORE on every access"""
+        return self._from_findings_refs(self._initial_findings)
+
+    @initial_findings.setter
+    def initial_findings(self, findings):
+        self._initial_findings = self._to_findings_refs(findings)
+
+    @property
+    def research_findings(self):
+        """The findings text, read from the FINDINGS_STORE on every access"""
+        return self._from_findings_refs(self._research_findings)
+
+    @research_findings.setter
+    def research_findings(self, findings):
+        self._research_findings = self._to_findings_refs(findings)
+
+    @property
+    def visited_urls(self):
+        """The VisitedUrls of the research, in the order they were visited"""
+        return self._visited_urls
+
+    @visited_urls.setter
+    def visited_urls(self, urls):
+        # A VisitedUrls is kept as it is, the states created from a dump_refs() share the visited URLs
+        self._visited_urls = urls if isinstance(urls, VisitedUrls) else VisitedUrls(urls)
+
+    def get_findings_refs(self, findings_nm):
+        """The ChunkRefs of initial_findings or research_findings, to pass the findings
+        on to another ResearchState without reading the text"""
+        return getattr(self, f"_{findings_nm}")
 
     def __str__(self):
         ret_val = ""
@@ -37,12 +92,13 @@ class ResearchState:
         ret_val += f"report_type             = {self.report_type}\n"
         ret_val += f"data_source             = {self.data_source}\n"
         ret_val += f"Visited URLs length     = {len(self.visited_urls)}\n"
-        ret_val += f"Research finding length = {len(self.research_findings)}\n"
+        ret_val += f"Research finding length = {len(self._research_findings)}\n"
         ret_val += f"Report headings length  = {len(self.report_headings)}\n"
         ret_val += f"Markdown report length  = {len(self.report_md)}\n"
         ret_val += f"Final report    length  = {len(self.final_report_md)}\n"
         ret_val += f"agent_type              = {self.agent_type}\n"
         ret_val += f"agents_role_prompt      = {self.agents_role_prompt}\n"
+        ret_val += f"run_id                  = {self.run_id}\n"
         return ret_val
 
     @classmethod
@@ -54,12 +110,25 @@ class ResearchState:
                 return getattr(globals()[name], member)
             return deserialize_obj
 
+        def as_enum_or_chunks(deserialize_obj):
+            if "__chunks__" in deserialize_obj:
+                return ChunkRefs.from_json(deserialize_obj)
+            return as_enum(deserialize_obj)
+
         research_state = None
         try:
             with open(research_state_file_nm, "r", encoding="utf-8") as file:
-                research_state_json = json.load(file, object_hook=as_enum)
+                research_state_json = json.load(file, object_hook=as_enum_or_chunks)
                 research_state = ResearchState()
-                research_state.__dict__.update(research_state_json)
+                for key, value in research_state_json.items():
+                    # setattr so that findings and visited_urls go through the property setters
+                    setattr(research_state, key, value)
+
+            chunk_dir = os.path.join(
+                os.path.dirname(os.path.abspath(research_state_file_nm)), CHUNKS_DIR_NM
+            )
+            if os.path.isdir(chunk_dir):
+                FINDINGS_STORE.add_chunk_dir(chunk_dir)
 
         except Exception as e:
             raise LLMAnalystsException(
@@ -68,33 +137,75 @@ class ResearchState:
 
         return research_state
 
+    def dump_refs(self):
+        """The attributes of the state under their public names, to create the next state of a
+        run from. Unlike dump() the findings are kept as their ChunkRefs, so the text is not
+        read from the FINDINGS_STORE and stored again by the next state, and visited_urls is
+        the VisitedUrls itself, so the next state shares it."""
+        base_class_attrs = vars(ResearchState())
+        return {
+            PROPERTY_ATTRS.get(key, key): value
+            for key, value in vars(self).items()
+            if key in base_class_attrs
+        }
+
     def dump(self, research_state_file_nm=None):
+        """The attributes of the state as plain JSON data, also written to research_state_file_nm.
+        The file holds the findings as compact ChunkRefs, their chunks are saved next to it."""
 
         class EnumEncoder(json.JSONEncoder):
             def default(self, obj):
                 if isinstance(obj, Enum):
                     return {"__enum__": str(obj)}
+                if isinstance(obj, ChunkRefs):
+                    return obj.to_json()
+                if isinstance(obj, VisitedUrls):
+                    return list(obj)
                 return json.JSONEncoder.default(self, obj)
 
-        base_class_attrs = vars(ResearchState())
-        current_attrs = vars(self)
-        research_state_json = {
-            key: value
-            for key, value in current_attrs.items()
-            if key in base_class_attrs
-        }
+        research_state_refs = self.dump_refs()
 
         try:
             if research_state_file_nm:
+                chunk_ids = [
+                    chunk_id
+                    for value in research_state_refs.values()
+                    if isinstance(value, ChunkRefs)
+                    for chunk_id in value.chunk_ids
+                ]
+                if chunk_ids:
+                    chunk_dir = os.path.join(
+                        os.path.dirname(os.path.abspath(research_state_file_nm)), CHUNKS_DIR_NM
+                    )
+                    FINDINGS_STORE.save_chunks(chunk_ids, chunk_dir)
+
                 with open(research_state_file_nm, "w", encoding="utf-8") as file:
-                    json.dump(research_state_json, file, indent=4, cls=EnumEncoder)
+                    json.dump(research_state_refs, file, indent=4, cls=EnumEncoder)
 
         except Exception as e:
             raise LLMAnalystsException(
                 f"Failed to dump ResearchState to json file {research_state_file_nm}") from e
 
+        # The findings text and the list of visited URLs are returned in place of the objects
+        research_state_json = dict(research_state_refs)
+        for findings_nm in FINDINGS_ATTRS.values():
+            research_state_json[findings_nm] = getattr(self, findings_nm)
+        research_state_json["visited_urls"] = list(self.visited_urls)
         return research_state_json
 
     def copy_state(self):
-        """Copy of the current state"""
-        return copy.copy(self)
+        """Copy of the current state, the copy does not share the visited URLs, findings or
+        lists of the original"""
+        state_copy = copy.copy(self)
+        state_copy.visited_urls = VisitedUrls(self.visited_urls)
+        for findings_attr in FINDINGS_ATTRS:
+            findings = getattr(self, findings_attr)
+            if isinstance(findings, ChunkRefs):
+                # The copy refers to the same stored chunks, which never change
+                findings = FINDINGS_STORE.put_refs(ChunkRefs(findings.chunk_ids, findings.is_text))
+            else:
+                findings = copy.copy(findings)
+            setattr(state_copy, findings_attr, findings)
+        state_copy.custom_search_urls = copy.copy(self.custom_search_urls)
+        state_copy.report_headings = copy.copy(self.report_headings)
+        return state_copy
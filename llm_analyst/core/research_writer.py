@@ -3,10 +3,16 @@ This module defines the `LLMWriter` class, which is responsible for writing the
 table of contents, and references of a research report using a Language Model (LLM).
 """
 from datetime import datetime
-import markdown
-from llm_analyst.core.config import Config
+from llm_analyst.core.checkpoint import RunCheckpoint
 from llm_analyst.core.prompts import Prompts
+from llm_analyst.core.report_assembler import (
+    build_header_tree,
+    generate_table_of_contents,
+    scan_markdown_headers,
+)
+from llm_analyst.core.runtime_context import RuntimeContext
 from llm_analyst.utils.app_logging import logging
+from llm_analyst.utils.tracing import traced
 from llm_analyst.core.research_state import ResearchState
 
 
@@ -14,55 +20,38 @@ class LLMWriter(ResearchState):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-        self.cfg = kwargs.get("config", Config())
-
-        self.llm_provider = self.cfg.llm_provider(
-            model=self.cfg.llm_model,
-            temperature=self.cfg.llm_temperature,
-            max_tokens=self.cfg.llm_token_limit,
+        self.context = kwargs.get("context", None) or RuntimeContext.for_config(
+            kwargs.get("config", None)
         )
-
+        self.cfg = self.context.cfg
         self.prompts = Prompts(self.cfg)
 
+    @property
+    def llm_provider(self):
+        """The chat model client is borrowed from the shared RuntimeContext on first use"""
+        return self.context.get_llm_client()
+
+    def get_llm_provider(self, prompt_nm):
+        """The chat model client for a prompt, routed by the Config llm_prompt_routes"""
+        return self.context.get_llm_client(prompt_nm=prompt_nm)
+
+    @property
+    def checkpoint(self):
+        """The RunCheckpoint of the research run, None when checkpoints are disabled"""
+        return RunCheckpoint.for_state(self, self.cfg)
+
     def _extract_headers(self):
-        # Function to extract headers from markdown text
-
-        headers = []
-        parsed_md = markdown.markdown(self.report_md)  # Parse markdown text
-        lines = parsed_md.split("\n")  # Split text into lines
-
-        stack = []  # Initialize stack to keep track of nested headers
-        for line in lines:
-            if (
-                line.startswith("<h") and len(line) > 1
-            ):  # Check if the line starts with an HTML header tag
-                # level = int(line[2])  # Extract header level
-                level = int(line[2]) if line[2].isdigit() else 0
-                header_text = line[
-                    line.index(">") + 1 : line.rindex("<")
-                ]  # Extract header text
-
-                # Pop headers from the stack with higher or equal level
-                while stack and stack[-1]["level"] >= level:
-                    stack.pop()
-
-                header = {
-                    "level": level,
-                    "text": header_text,
-                }  # Create header dictionary
-                if stack:
-                    stack[-1].setdefault("children", []).append(
-                        header
-                    )  # Append as child if parent exists
-                else:
-                    # Append as top-level header if no parent exists
-                    headers.append(header)
-
-                stack.append(header)  # Push header onto the stack
-
-        return headers  # Return the list of headers
+        """Extract the nested headers of report_md with a line based scan"""
+        return build_header_tree(scan_markdown_headers(self.report_md))
 
+    @traced("write_introduction")
     async def write_introduction(self):
+        checkpoint = self.checkpoint
+        if checkpoint:
+            report_intro = checkpoint.load("introduction", self.active_research_topic)
+            if report_intro is not None:
+                return report_intro
+
         report_intro = ""
         try:
             report_introduction_prompt = self.prompts.get_prompt(
@@ -71,10 +60,14 @@ class LLMWriter(ResearchState):
                 research_summary=self.initial_findings,
                 datetime_now=datetime.now().strftime("%B %d, %Y"),
             )
-            report_intro = await self.llm_provider.get_chat_response(
-                self.agents_role_prompt, report_introduction_prompt
+            report_intro = await self.get_llm_provider("report_introduction").get_chat_response(
+                self.agents_role_prompt,
+                report_introduction_prompt,
+                prompt_nm="report_introduction",
             )
             logging.debug("PROMPT write_introduction response = %s", report_intro)
+            if checkpoint and report_intro:
+                checkpoint.save("introduction", report_intro, self.active_research_topic)
 
         except Exception as e:
             logging.error("Error in generating report introduction: %s", e)
@@ -83,20 +76,6 @@ class LLMWriter(ResearchState):
 
     async def write_table_of_contents(self):
         try:
-            # Function to generate table of contents recursively
-            def generate_table_of_contents(headers, indent_level=0):
-                toc = ""  # Initialize table of contents string
-                for header in headers:
-                    toc += (
-                        " " * (indent_level * 4) + "- " + header["text"] + "\n"
-                    )  # Add header text with indentation
-                    if "children" in header:  # If header has children
-                        toc += generate_table_of_contents(
-                            header["children"], indent_level + 1
-                        )  # Generate TOC for children
-                return toc  # Return the generated table of contents
-
-            # Extract headers from markdown text
             headers = self._extract_headers()
             toc = "## Table of Contents\n\n"
             toc += generate_table_of_contents(headers)  # Generate table of contents
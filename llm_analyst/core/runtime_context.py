@@ -0,0 +1,147 @@
+"""
+This module defines the `RuntimeContext` class, which owns the objects that are shared by
+the research roles (`LLMAnalyst`, `LLMWriter`, `LLMEditor` and `LLMPublisher`) during a run:
+the parsed `Config`, one pooled chat model client per provider/model, the embeddings instance
+and the `Cassette` that records or replays the searches, scrapes and chat responses.
+
+Everything held by the context is created on first use and reused afterwards, so creating
+another role (for example one `LLMAnalyst` per subtopic) does not re-read the config
+or open a new HTTP connection pool.
+"""
+import os
+import weakref
+
+from llm_analyst.chat_models.scheduler import ChatScheduler
+from llm_analyst.core.cassette import Cassette, CassetteChatModel
+from llm_analyst.core.config import Config
+from llm_analyst.scrapers.scraper_methods import scrape_urls
+from llm_analyst.search_methods.internet_search import search_many
+from llm_analyst.utils.metrics import serve_metrics
+from llm_analyst.utils.tracing import TRACER
+
+
+class RuntimeContext:
+    """Shared Config, chat model clients and embeddings for the research roles."""
+
+    _default_context = None
+    _config_contexts = weakref.WeakKeyDictionary()
+
+    def __init__(self, config=None):
+        self.cfg = config if config is not None else Config()
+        self._llm_clients = {}
+        self.cassette = Cassette.for_config(self.cfg)
+
+    def start_exporters(self):
+        """Write the tracing spans to the trace_file and serve the metrics on the metrics_port
+        of the Config, when they are set. Called by the program that runs the research, a
+        context does not open files or ports when it is created.
+        Returns the metrics server, None when there is no metrics_port."""
+        trace_file = getattr(self.cfg, "trace_file", None)
+        if trace_file and os.path.expanduser(trace_file) != TRACER.trace_file:
+            TRACER.set_trace_file(trace_file)
+
+        metrics_port = getattr(self.cfg, "metrics_port", None)
+        if metrics_port:
+            return serve_metrics(metrics_port)
+        return None
+
+    @classmethod
+    def for_config(cls, config=None):
+        """Return the context that owns the given Config, creating it if required.
+        When no Config is given a process wide default context is used.
+        """
+        if config is None:
+            if cls._default_context is None:
+                cls._default_context = cls()
+            return cls._default_context
+
+        context = cls._config_contexts.get(config, None)
+        if context is None:
+            context = cls(config)
+            cls._config_contexts[config] = context
+        return context
+
+    @classmethod
+    def reset_instance(cls):
+        cls._default_context = None
+        cls._config_contexts = weakref.WeakKeyDictionary()
+
+    @property
+    def embedding_provider(self):
+        return self.cfg.embedding_provider
+
+    def internet_search(self, query, max_results=None):
+        """The configured internet_search, through the cassette when there is one"""
+        if self.cassette:
+            return self.cassette.search(self.cfg.internet_search, query, max_results)
+        return self.cfg.internet_search(query, max_results=max_results)
+
+    def search_many(self, queries, max_results=None):
+        """search_many of the configured internet_search, through the cassette when there is one"""
+        if self.cassette:
+            return self.cassette.search_many(self.cfg.internet_search, queries, max_results)
+        return search_many(self.cfg.internet_search, queries, max_results=max_results)
+
+    def scrape_urls(self, urls):
+        """scrape_urls, through the cassette when there is one"""
+        if self.cassette:
+            return self.cassette.scrape_urls(scrape_urls, urls)
+        return scrape_urls(urls)
+
+    def get_llm_client(
+        self,
+        llm_provider=None,
+        llm_model=None,
+        llm_temperature=None,
+        llm_token_limit=None,
+        prompt_nm=None,
+    ):
+        """Return the pooled chat model client for the given settings.
+        Any setting that is not given is taken from the Config, using the
+        llm_prompt_routes override for prompt_nm when there is one.
+        """
+        llm_settings = self.cfg.get_llm_settings(prompt_nm)
+        llm_provider = llm_provider if llm_provider is not None else llm_settings["llm_provider"]
+        llm_model = llm_model if llm_model is not None else llm_settings["llm_model"]
+        llm_temperature = (
+            llm_temperature if llm_temperature is not None else llm_settings["llm_temperature"]
+        )
+        llm_token_limit = (
+            llm_token_limit if llm_token_limit is not None else llm_settings["llm_token_limit"]
+        )
+
+        client_key = (llm_provider, llm_model, llm_temperature, llm_token_limit)
+        llm_client = self._llm_clients.get(client_key, None)
+        if llm_client is None:
+            # A replayed run never calls the provider, so it needs no client or API key
+            if not (self.cassette and self.cassette.is_replay):
+                llm_client = llm_provider(
+                    model=llm_model,
+                    temperature=llm_temperature,
+                    max_tokens=llm_token_limit,
+                    scheduler=self.get_scheduler(llm_provider),
+                )
+            if self.cassette:
+                llm_client = CassetteChatModel(self.cassette, llm_client, llm_model)
+            self._llm_clients[client_key] = llm_client
+        return llm_client
+
+    def get_scheduler(self, llm_provider=None):
+        """Return the ChatScheduler for a chat model class, with the limits from the Config,
+        overridden by the llm_provider_limits of the provider.
+        The provider name is recovered from the UPPERCASE_MODEL_NM+"_Model" naming convention.
+        """
+        llm_provider = llm_provider if llm_provider is not None else self.cfg.llm_provider
+        provider_nm = llm_provider.__name__.removesuffix("_Model").lower()
+
+        limits = {
+            "requests_per_minute": getattr(self.cfg, "llm_requests_per_minute", None),
+            "tokens_per_minute": getattr(self.cfg, "llm_tokens_per_minute", None),
+            "max_in_flight": getattr(self.cfg, "llm_max_in_flight", None),
+            "max_retries": getattr(self.cfg, "llm_max_retries", None),
+        }
+        llm_provider_limits = getattr(self.cfg, "llm_provider_limits", None) or {}
+        limits.update(llm_provider_limits.get(provider_nm, {}))
+        # Values set through environment variables arrive as strings
+        limits = {key: int(value) for key, value in limits.items() if value is not None}
+        return ChatScheduler.for_provider(provider_nm, **limits)
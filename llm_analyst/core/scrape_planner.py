@@ -0,0 +1,112 @@
+"""
+This module defines the `ScrapePlanner` class, which decides which pages of a research run
+are scraped once the search results of all its sub-queries are in.
+
+Without a plan every sub-query scrapes its own search results, so the low ranked URLs of one
+sub-query are scraped while the high ranked URLs of another are still waiting, and the cost
+of a run grows with the number of sub-queries. The planner instead:
+    1. collects the search results of every sub-query
+    2. canonicalizes the URLs and drops the duplicates and the URLs already visited
+    3. scores each URL by its rank in, and the number of, the sub-queries that found it
+    4. scrapes the best URLs first, until scrape_budget_pages or scrape_budget_bytes is used
+
+Each scraped page is then compressed for every sub-query that found it.
+"""
+import math
+
+from llm_analyst.core.visited_urls import VisitedUrls, canonicalize_url
+
+# The pages are scraped in batches of at most this size, the byte budget is checked between
+# batches and the batches shrink as it is used up
+SCRAPE_BATCH_SIZE = 10
+
+
+class ScrapePlanner:
+    """Ranks the search results of all the sub-queries and scrapes the best ones within a budget.
+    A budget of 0 is no limit."""
+
+    def __init__(self, max_pages=0, max_bytes=0):
+        self.max_pages = int(max_pages or 0)
+        self.max_bytes = int(max_bytes or 0)
+
+    def plan(self, search_results_by_query, visited_urls=()):
+        """[{"url", "score", "sub_queries"}] best first, for the (sub_query, search_results)
+        pairs of search_results_by_query. A URL found by several sub-queries scores the sum
+        of 1 / rank over them, ties keep the order the URLs were found in."""
+        if not isinstance(visited_urls, VisitedUrls):
+            visited_urls = VisitedUrls(visited_urls)
+        candidates = {}
+        for sub_query, search_results in search_results_by_query:
+            for rank, search_result in enumerate(search_results, start=1):
+                url = search_result.get("href", None)
+                if not url:
+                    continue
+                if url in visited_urls:
+                    continue
+                url_key = canonicalize_url(url)
+                candidate = candidates.setdefault(
+                    url_key, {"url": url, "score": 0.0, "sub_queries": []}
+                )
+                if sub_query in candidate["sub_queries"]:
+                    continue
+                candidate["score"] += 1.0 / rank
+                candidate["sub_queries"].append(sub_query)
+
+        planned_urls = sorted(candidates.values(), key=lambda candidate: -candidate["score"])
+        if self.max_pages:
+            planned_urls = planned_urls[: self.max_pages]
+        return planned_urls
+
+    def scrape(self, planned_urls, scrape_urls):
+        """Scrape the planned_urls best first with scrape_urls(urls) until the byte budget is used.
+        Returns ({sub_query: [scraped site]}, [URL of every scraped site that was kept]).
+        The page that reaches the byte budget is cut at the budget, the pages scraped after it
+        are dropped and their URLs are not returned, so they can still be scraped later."""
+        sites_by_query = {}
+        scraped_urls = []
+        sub_queries_by_url = {
+            planned_url["url"]: planned_url["sub_queries"] for planned_url in planned_urls
+        }
+        byte_count = 0
+        page_count = 0
+        start = 0
+
+        while start < len(planned_urls):
+            if self.max_bytes and byte_count >= self.max_bytes:
+                break
+            batch_size = self._get_batch_size(byte_count, page_count)
+            batch_urls = [
+                planned_url["url"] for planned_url in planned_urls[start : start + batch_size]
+            ]
+            start += batch_size
+            for scraped_site in scrape_urls(batch_urls):
+                raw_content = scraped_site["raw_content"]
+                page_bytes = len(raw_content.encode("utf-8"))
+                if self.max_bytes:
+                    if byte_count >= self.max_bytes:
+                        break
+                    if byte_count + page_bytes > self.max_bytes:
+                        raw_content = _cut_to_bytes(raw_content, self.max_bytes - byte_count)
+                        page_bytes = len(raw_content.encode("utf-8"))
+                        scraped_site = {**scraped_site, "raw_content": raw_content}
+                byte_count += page_bytes
+                page_count += 1
+                scraped_urls.append(scraped_site["url"])
+                for sub_query in sub_queries_by_url.get(scraped_site["url"], []):
+                    sites_by_query.setdefault(sub_query, []).append(scraped_site)
+
+        return sites_by_query, scraped_urls
+
+    def _get_batch_size(self, byte_count, page_count):
+        """SCRAPE_BATCH_SIZE, or fewer pages once the pages scraped so far show that fewer
+        will use the rest of the byte budget"""
+        if not self.max_bytes or not page_count:
+            return SCRAPE_BATCH_SIZE
+        average_page_bytes = max(byte_count // page_count, 1)
+        pages_left = math.ceil((self.max_bytes - byte_count) / average_page_bytes)
+        return max(1, min(SCRAPE_BATCH_SIZE, pages_left))
+
+
+def _cut_to_bytes(text, max_bytes):
+    """The start of text that is at most max_bytes long in UTF-8"""
+    return text.encode("utf-8")[:max_bytes].decode("utf-8", errors="ignore")
@@ -0,0 +1,183 @@
+"""
+This module extracts JSON objects and arrays from LLM responses.
+
+The LLM is asked for JSON but often wraps it in explanatory text or markdown fences,
+uses Python style quoting, leaves trailing commas or is cut off by the token limit.
+`extract_json` scans the response once, tries each balanced JSON candidate it finds
+and applies a few cheap repairs before giving up.
+`parse_json_response` adds one short repair round trip to the LLM when extraction fails,
+which is much cheaper than re-running the research that produced the prompt.
+"""
+import ast
+import json
+import re
+
+from llm_analyst.utils.app_logging import logging
+
+JSON_REPAIR_SYSTEM_PROMPT = (
+    "You convert text into valid JSON. Respond with ONLY the JSON, "
+    "no markdown fences and no explanation."
+)
+JSON_REPAIR_USER_PROMPT = (
+    "The following response should have been a JSON {json_type} but could not be parsed. "
+    "Return the same content as a single valid JSON {json_type}.\n\nResponse:\n{response}"
+)
+
+_FENCE_PATTERN = re.compile(r"```[a-zA-Z0-9_-]*[ \t]*\n?(.*?)```", re.DOTALL)
+_TRAILING_COMMA_PATTERN = re.compile(r",\s*([\]}])")
+_CLOSING = {"[": "]", "{": "}"}
+
+
+def strip_markdown_fences(text):
+    """Return the content of the first fenced block, or the text when there is none"""
+    match = _FENCE_PATTERN.search(text)
+    if match:
+        return match.group(1).strip()
+    # An opening fence without a close, usually a response cut off by the token limit
+    if text.lstrip().startswith("```"):
+        return text.lstrip()[3:].split("\n", 1)[-1]
+    return text
+
+
+def _loads(candidate):
+    """json.loads with fall backs for trailing commas and Python literals"""
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(_TRAILING_COMMA_PATTERN.sub(r"\1", candidate))
+    except json.JSONDecodeError:
+        pass
+    try:
+        value = ast.literal_eval(candidate)
+        if isinstance(value, (list, dict)):
+            return value
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        pass
+    raise ValueError("Not valid JSON")
+
+
+def _matches(value, expected_type):
+    if expected_type is None:
+        return isinstance(value, (list, dict))
+    return isinstance(value, expected_type)
+
+
+def _coerce(value, expected_type):
+    """An object wrapping a single array, e.g. {"queries": [...]}, is accepted as that array"""
+    if _matches(value, expected_type):
+        return value
+    if expected_type is list and isinstance(value, dict):
+        lists = [item for item in value.values() if isinstance(item, list)]
+        if len(lists) == 1:
+            return lists[0]
+    return None
+
+
+def _iter_candidates(text):
+    """Yield (candidate, is_complete) for every balanced top level JSON span in a single pass.
+    A span that is still open at the end of the text is yielded last, closed off.
+    """
+    stack = []
+    start = None
+    in_string = None
+    escaped = False
+    previous_char = ""
+
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == in_string:
+                in_string = None
+                previous_char = char
+            continue
+
+        if char in "[{":
+            if not stack:
+                start = index
+            stack.append(char)
+        elif char in "]}" and stack:
+            if _CLOSING[stack[-1]] != char:
+                # Mismatched bracket, drop this candidate and keep scanning
+                stack = []
+                start = None
+                continue
+            stack.pop()
+            if not stack:
+                yield text[start : index + 1], True
+                start = None
+        elif char == '"' and stack:
+            in_string = char
+        elif char == "'" and stack and previous_char in "[{,:":
+            # Python style quoting, an apostrophe anywhere else is just text
+            in_string = char
+
+        if not char.isspace():
+            previous_char = char
+
+    if stack and start is not None:
+        # Truncated response, close the open string and brackets
+        closing = (in_string or "") + "".join(_CLOSING[char] for char in reversed(stack))
+        yield text[start:].rstrip().rstrip(",") + closing, False
+
+
+def extract_json(text, expected_type=None, default_response=None, validate=None):
+    """Return the first JSON value of expected_type (list, dict or None for either) found in text.
+
+    Args:
+        text (str): The raw LLM response.
+        expected_type (type): list, dict or None.
+        default_response: Returned when nothing can be extracted.
+        validate (callable): Optional check a candidate must pass, so that something
+            like a citation "[1]" in the text is not mistaken for the answer.
+    """
+    if not isinstance(text, str):
+        return default_response
+
+    text = strip_markdown_fences(text)
+    for candidate, _ in _iter_candidates(text):
+        try:
+            value = _coerce(_loads(candidate), expected_type)
+        except ValueError:
+            continue
+        if value is not None and (validate is None or validate(value)):
+            return value
+
+    return default_response
+
+
+def is_list_of_strings(value):
+    return bool(value) and all(isinstance(item, str) for item in value)
+
+
+async def parse_json_response(
+    chat_response, expected_type, default_response, llm_provider=None, validate=None
+):
+    """Extract JSON from chat_response. If that fails and an llm_provider is given,
+    ask the LLM once to repair its own response before returning default_response.
+    """
+    result = extract_json(chat_response, expected_type, validate=validate)
+    if result is not None:
+        return result
+
+    if llm_provider is not None and chat_response:
+        json_type = "array" if expected_type is list else "object"
+        logging.warning("JSON extraction failed, requesting a %s repair", json_type)
+        try:
+            repaired_response = await llm_provider.get_chat_response(
+                JSON_REPAIR_SYSTEM_PROMPT,
+                JSON_REPAIR_USER_PROMPT.format(json_type=json_type, response=chat_response),
+                prompt_nm="json_repair",
+            )
+            result = extract_json(repaired_response, expected_type, validate=validate)
+        except Exception as e:
+            logging.error("Error in parse_json_response repair %s", e)
+
+    if result is None:
+        logging.error("Could not extract JSON from response = %s", chat_response)
+        result = default_response
+    return result
@@ -0,0 +1,101 @@
+"""
+This module defines the `VisitedUrls` class, the visited URLs of a `ResearchState`.
+
+A search provider returns the same page under many URLs: `http` and `https`, with and
+without `www.`, a trailing slash, a fragment or `utm_*` tracking parameters. Each URL is
+therefore keyed by `canonicalize_url`, and a page is scraped and referenced once whichever
+URL it is found under.
+
+`VisitedUrls` keeps the URL each page was first visited under, in the order they were
+visited, so the references of a report keep the order the research found them in.
+Membership is O(1), and `add_many` checks and adds a list of URLs under one lock, so the
+concurrent sub-queries of a run never both scrape a URL.
+A `VisitedUrls` is dumped by `ResearchState.dump` as the plain list of its URLs.
+"""
+import threading
+import urllib.parse
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url):
+    """The URL with the scheme and host in lower case, without the default port, fragment,
+    utm_* tracking parameters and trailing slash, so that equal pages compare equal"""
+    parts = urllib.parse.urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme, None):
+        netloc = f"{netloc}:{parts.port}"
+    query = urllib.parse.urlencode(
+        [
+            (key, value)
+            for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith("utm_")
+        ]
+    )
+    path = parts.path.rstrip("/") if parts.path != "/" else ""
+    return urllib.parse.urlunsplit((scheme, netloc, path, query, ""))
+
+
+def canonicalize_url(url):
+    """The key of a URL in VisitedUrls, normalize_url that also takes http as https and
+    drops the www. of the host. Only used to compare URLs, it is not always a working URL."""
+    parts = urllib.parse.urlsplit(normalize_url(url))
+    scheme = "https" if parts.scheme == "http" else parts.scheme
+    netloc = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    return urllib.parse.urlunsplit((scheme, netloc, parts.path, parts.query, ""))
+
+
+class VisitedUrls:
+    """Insertion ordered set of URLs, two URLs with the same canonicalize_url are the same page"""
+
+    def __init__(self, urls=()):
+        self._lock = threading.Lock()
+        # {canonicalize_url(url): url as first visited}, dicts keep the insertion order
+        self._urls = {}
+        self.add_many(urls)
+
+    def add(self, url):
+        """True when url is a new page and was added"""
+        return bool(self.add_many([url]))
+
+    def add_many(self, urls):
+        """Add the urls that are new pages, returns them in order.
+        Missing URLs, such as a search result without an href, are skipped."""
+        url_keys = [(canonicalize_url(url), url) for url in urls if url]
+        new_urls = []
+        with self._lock:
+            for url_key, url in url_keys:
+                if url_key not in self._urls:
+                    self._urls[url_key] = url
+                    new_urls.append(url)
+        return new_urls
+
+    def __contains__(self, url):
+        if not url:
+            return False
+        return canonicalize_url(url) in self._urls
+
+    def __iter__(self):
+        with self._lock:
+            urls = list(self._urls.values())
+        return iter(urls)
+
+    def __len__(self):
+        return len(self._urls)
+
+    def __eq__(self, other):
+        if isinstance(other, (VisitedUrls, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"VisitedUrls({list(self)})"
+
+    def __getstate__(self):
+        return {"urls": list(self)}
+
+    def __setstate__(self, state):
+        self.__init__(state["urls"])
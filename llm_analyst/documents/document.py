@@ -6,11 +6,6 @@ import asyncio
 import os
 import re
 
-from langchain_community.document_loaders import (
-    PyMuPDFLoader, TextLoader, UnstructuredCSVLoader, UnstructuredExcelLoader,
-    UnstructuredMarkdownLoader, UnstructuredPowerPointLoader,
-    UnstructuredWordDocumentLoader)
-
 from llm_analyst.scrapers.scraper_methods import scrape_urls
 
 
@@ -72,22 +67,35 @@ class DocumentLoader:
             ret_list = scrape_urls(self.urls)
         return ret_list
 
+    def _get_loader(self, file_path: str, file_extension: str):
+        """Only the loader for the given file extension is imported and constructed.
+        The Unstructured loaders are slow to import and are often not needed at all.
+        """
+        from langchain_community import document_loaders
+
+        match file_extension:
+            case "pdf":
+                loader = document_loaders.PyMuPDFLoader(file_path)
+            case "txt":
+                loader = document_loaders.TextLoader(file_path)
+            case "doc" | "docx":
+                loader = document_loaders.UnstructuredWordDocumentLoader(file_path)
+            case "pptx":
+                loader = document_loaders.UnstructuredPowerPointLoader(file_path)
+            case "csv":
+                loader = document_loaders.UnstructuredCSVLoader(file_path, mode="elements")
+            case "xls" | "xlsx":
+                loader = document_loaders.UnstructuredExcelLoader(file_path, mode="elements")
+            case "md":
+                loader = document_loaders.UnstructuredMarkdownLoader(file_path)
+            case _:
+                loader = None
+        return loader
+
     async def _load_document(self, file_path: str, file_extension: str) -> list:
         ret_data = []
         try:
-            loader_dict = {
-                "pdf": PyMuPDFLoader(file_path),
-                "txt": TextLoader(file_path),
-                "doc": UnstructuredWordDocumentLoader(file_path),
-                "docx": UnstructuredWordDocumentLoader(file_path),
-                "pptx": UnstructuredPowerPointLoader(file_path),
-                "csv": UnstructuredCSVLoader(file_path, mode="elements"),
-                "xls": UnstructuredExcelLoader(file_path, mode="elements"),
-                "xlsx": UnstructuredExcelLoader(file_path, mode="elements"),
-                "md": UnstructuredMarkdownLoader(file_path),
-            }
-
-            loader = loader_dict.get(file_extension, None)
+            loader = self._get_loader(file_path, file_extension)
             if loader:
                 ret_data = loader.load()
 
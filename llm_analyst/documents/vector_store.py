@@ -1,18 +1,14 @@
 """
 This module provides the `VectorStore` class for managing a vector database 
 with document embedding capabilities.
+
+NOTE: Chroma and sentence-transformers are imported when a VectorStore is created
+so that they are only loaded for LOCAL_STORE research.
 """
 import hashlib
 import os
 import re
 
-
-
-from langchain_chroma import Chroma
-from langchain_community.embeddings.sentence_transformer import SentenceTransformerEmbeddings
-from langchain_text_splitters import CharacterTextSplitter
-
-
 from llm_analyst.documents.document import DocumentLoader
 from llm_analyst.core.exceptions import LLMAnalystsException
 from llm_analyst.utils.app_logging import logging
@@ -20,14 +16,20 @@ from llm_analyst.utils.app_logging import logging
 
 class VectorStore:
 
-    def __init__(self, cache_directory, local_data_directory=None):
+    def __init__(self, cache_directory, local_data_directory=None, embedding_function=None):
         self.cache_directory = cache_directory
         self.persist_directory = f"{cache_directory}/chroma_db"
         self.local_data_directory = local_data_directory
         self.collection_name = os.path.basename(self.local_data_directory)
         self.local_db_hash = self._stored_db_hash()
 
-        self.embedding_function = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
+        from langchain_chroma import Chroma
+
+        if embedding_function is None:
+            from langchain_community.embeddings.sentence_transformer import SentenceTransformerEmbeddings
+
+            embedding_function = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
+        self.embedding_function = embedding_function
         
         if not os.path.exists(self.persist_directory):
             os.makedirs(self.persist_directory)
@@ -52,6 +54,9 @@ class VectorStore:
                     raise LLMAnalystsException(
                         f"ERROR: No Documents loaded! Check the config local_data_directory {self.local_data_directory}"
                     )
+                from langchain_chroma import Chroma
+                from langchain_text_splitters import CharacterTextSplitter
+
                 text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
                 chunked_documents = text_splitter.split_documents(documents)
                 
@@ -69,8 +74,8 @@ class VectorStore:
             
 
     @classmethod
-    async def create(cls, cache_directory, local_data_directory=None):
-        instance = cls(cache_directory, local_data_directory)
+    async def create(cls, cache_directory, local_data_directory=None, embedding_function=None):
+        instance = cls(cache_directory, local_data_directory, embedding_function)
         await instance.async_init()
         return instance
     
@@ -8,6 +8,8 @@ https://medium.com/@SrGrace_/contextual-compression-langchain-llamaindex-7675c8d
 
 from typing import Dict, List
 
+import numpy as np
+from langchain_core.embeddings import Embeddings
 from langchain.callbacks.manager import CallbackManagerForRetrieverRun
 from langchain.schema import Document
 from langchain.schema.retriever import BaseRetriever
@@ -18,6 +20,8 @@ from langchain.retrievers.document_compressors import (
     EmbeddingsFilter,
 )
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from llm_analyst.utils import metrics
+from llm_analyst.utils.tracing import span
 
 
 class SearchAPIRetriever(BaseRetriever):
@@ -43,19 +47,89 @@ class SearchAPIRetriever(BaseRetriever):
         return docs
 
 
+class MeteredEmbeddings(Embeddings):
+    """Counts the embedding calls and chunks of the wrapped Embeddings"""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.provider_nm = type(embeddings).__name__
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        metrics.record_embedding_call(self.provider_nm, len(texts))
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        metrics.record_embedding_call(self.provider_nm, 1)
+        return self.embeddings.embed_query(text)
+
+
+class SnippetFilter:
+    """Scores the snippet ("body") of each search result against the query before anything
+    is scraped. Results whose snippet clears the similarity_threshold are worth scraping,
+    the others contribute only their snippet, as a page of its own.
+    A result without a snippet can not be judged and is scraped."""
+
+    def __init__(self, embeddings, similarity_threshold):
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+
+    def get_scores(self, query, snippets):
+        """The cosine similarity of each snippet to the query"""
+        metered_embeddings = MeteredEmbeddings(self.embeddings)
+        query_embedding = np.array(metered_embeddings.embed_query(query), dtype=float)
+        snippet_embeddings = np.array(metered_embeddings.embed_documents(snippets), dtype=float)
+        norms = np.linalg.norm(snippet_embeddings, axis=1) * np.linalg.norm(query_embedding)
+        norms[norms == 0] = 1.0
+        return (snippet_embeddings @ query_embedding / norms).tolist()
+
+    def split(self, query, search_results):
+        """(search results to scrape, snippet pages) for the search_results of query"""
+        judged_results = [result for result in search_results if result.get("body")]
+        if not judged_results:
+            return search_results, []
+
+        with span("snippet_filter", query=query, result_count=len(search_results)) as filter_span:
+            scores = self.get_scores(query, [result["body"] for result in judged_results])
+            weak_urls = {
+                result.get("href")
+                for result, score in zip(judged_results, scores)
+                if score < self.similarity_threshold
+            }
+            results_to_scrape = [
+                result for result in search_results if result.get("href") not in weak_urls
+            ]
+            snippet_pages = [
+                {"url": result.get("href"), "title": result.get("title", ""), "raw_content": result["body"]}
+                for result in judged_results
+                if result.get("href") in weak_urls
+            ]
+            metrics.inc("snippet_filter_results_total", len(results_to_scrape), decision="scrape")
+            metrics.inc("snippet_filter_results_total", len(snippet_pages), decision="snippet")
+            filter_span.set_attributes(
+                scrape_count=len(results_to_scrape), snippet_count=len(snippet_pages)
+            )
+        return results_to_scrape, snippet_pages
+
+
 class ContextCompressor:
-    def __init__(self, documents, embeddings, max_results=5, **kwargs):
+    def __init__(
+        self, documents, embeddings, max_results=5, chunk_size=1000, chunk_overlap=100, **kwargs
+    ):
         self.max_results = max_results
         self.documents = documents
         self.kwargs = kwargs
         self.embeddings = embeddings
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
         self.similarity_threshold = 0.38
         self.unique_documents_visited = set()
 
     def _get_contextual_retriever(self):
-        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
+        )
         relevance_filter = EmbeddingsFilter(
-            embeddings=self.embeddings, similarity_threshold=self.similarity_threshold
+            embeddings=MeteredEmbeddings(self.embeddings), similarity_threshold=self.similarity_threshold
         )
         pipeline_compressor = DocumentCompressorPipeline(
             transformers=[splitter, relevance_filter]
@@ -76,12 +150,15 @@ class ContextCompressor:
         )
 
     def get_context(self, query, max_results=5):
-        compressed_docs = self._get_contextual_retriever()
-        # relevant_docs = compressed_docs.get_relevant_documents(query)
-        relevant_docs = compressed_docs.invoke(query)
-        self.unique_documents_visited.update(
-            doc.metadata.get("source")
-            for i, doc in enumerate(relevant_docs)
-            if i < max_results
-        )
-        return self._pretty_print_docs(relevant_docs, max_results)
+        with span("compress", query=query, document_count=len(self.documents)) as compress_span:
+            compressed_docs = self._get_contextual_retriever()
+            # relevant_docs = compressed_docs.get_relevant_documents(query)
+            relevant_docs = compressed_docs.invoke(query)
+            self.unique_documents_visited.update(
+                doc.metadata.get("source")
+                for i, doc in enumerate(relevant_docs)
+                if i < max_results
+            )
+            context = self._pretty_print_docs(relevant_docs, max_results)
+            compress_span.set_attributes(relevant_count=len(relevant_docs), bytes=len(context))
+            return context
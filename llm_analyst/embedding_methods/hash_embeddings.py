@@ -0,0 +1,40 @@
+"""
+This module provides `HashEmbeddings`, an offline embeddings provider for benchmarks and tests.
+"embedding_provider" :"hash" maps to this class.
+
+Each word is hashed to one of `size` dimensions, so texts that share words have a high cosine
+similarity. No model is loaded and no request leaves the process, while the
+`ContextCompressor` and the vector store still do the same splitting and filtering work.
+"""
+import hashlib
+import math
+import re
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class HashEmbeddings(Embeddings):
+    """Hashed bag of words embeddings"""
+
+    def __init__(self, size=256):
+        self.size = size
+
+    def _embed(self, text):
+        vector = [0.0] * self.size
+        for word in WORD_PATTERN.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.size
+            vector[index] += 1.0
+        norm = math.sqrt(sum(value * value for value in vector))
+        if norm:
+            vector = [value / norm for value in vector]
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
@@ -3,28 +3,33 @@ This module provides various scraping functions to extract content from differen
 It includes specialized scrapers for arXiv links, PDF files, generic web pages, and pages requiring
 Selenium for dynamic content loading. The main function `scrape_urls` determines the appropriate 
 scraper based on the URL and aggregates the content into a list of strings.
+
+NOTE: The scraper backends (LangChain loaders, arXiv, Selenium, pyvirtualdisplay) are imported
+inside each scraper so they are only loaded when a URL actually requires them.
 """
 
+import contextvars
 import importlib
 import os
 import re
+import time
+import urllib.parse
 import uuid
 from concurrent.futures.thread import ThreadPoolExecutor
 
-import requests
-from bs4 import BeautifulSoup
-from langchain_community.document_loaders.html_bs import BSHTMLLoader
-from langchain_community.document_loaders.pdf import PyMuPDFLoader
-from langchain_community.document_loaders.web_base import WebBaseLoader
-from langchain_community.retrievers.arxiv import ArxivRetriever
-from pyvirtualdisplay import Display
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
+from llm_analyst.utils import metrics
+from llm_analyst.utils.app_logging import logging
+from llm_analyst.utils.circuit_breaker import get_circuit_breaker
+from llm_analyst.utils.single_flight import single_flight
+from llm_analyst.utils.tracing import current_span, span, traced
+
+# Pages with less text than this are treated as failed scrapes
+MIN_CONTENT_LENGTH = 100
 
 
 def arxiv_scraper(link):
+    from langchain_community.retrievers.arxiv import ArxivRetriever
+
     query = link.split("/")[-1]
     retriever = ArxivRetriever(load_max_docs=2, doc_content_chars_max=None)
     docs = retriever.invoke(query)
@@ -33,6 +38,8 @@ def arxiv_scraper(link):
 
 
 def pdf_scraper(link):
+    from langchain_community.document_loaders.pdf import PyMuPDFLoader
+
     loader = PyMuPDFLoader(link)
     docs = loader.load()
     content = ""
@@ -46,6 +53,9 @@ def bs_scraper(link):
     This is a Beautiful Soup Scraper however web_scraper also uses Beautiful Soup
     and does so more seamlessly.
     """
+    import requests
+    from langchain_community.document_loaders.html_bs import BSHTMLLoader
+
     response = requests.get(link, timeout=10)
     temp_file = f"temp_{uuid.uuid4()}.html"
     with open(temp_file, "w", encoding="utf-8") as f:
@@ -65,6 +75,13 @@ def cell_selenium_scraper(link):
     Works as a general site scraper however this was implemented specifically 
     to scrape cell.com sites.
     """
+    from bs4 import BeautifulSoup
+    from pyvirtualdisplay import Display
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
     display = Display(visible=0, size=(800, 600))
     display.start()
 
@@ -102,64 +119,129 @@ def cell_selenium_scraper(link):
 
 
 def web_scraper(link):
-    try:
-        loader = WebBaseLoader(link)
-        loader.requests_kwargs = {"verify": False}
-        docs = loader.load()
-        content = ""
-        for doc in docs:
-            content += doc.page_content
+    from langchain_community.document_loaders.web_base import WebBaseLoader
 
-        pattern = r"\s{3,}"
-        content = re.sub(pattern, "  ", content)
-        return content
+    # HTTP errors are raised, scrape_url counts them against the circuit of the host
+    loader = WebBaseLoader(link, raise_for_status=True)
+    loader.requests_kwargs = {"verify": False}
+    docs = loader.load()
+    content = ""
+    for doc in docs:
+        content += doc.page_content
 
-    except Exception as e:
-        print("Error! : " + str(e))
-        return ""
+    pattern = r"\s{3,}"
+    content = re.sub(pattern, "  ", content)
+    return content
 
 #################################################################################
 
-def scrape_urls(urls):
+@single_flight
+def scrape_url(link):
     """
-    Given a list of URLs
-    1. Determine an appropriate scraper based on URL content
-    2. For each URL Scrape the website and aggregate the content into a list of strings
-        one for each site
+    Determine an appropriate scraper based on URL content and scrape the site.
+    Concurrent scrapes of the same URL share one request, and the URLs of a host whose
+    circuit breaker is open are not scraped.
     """
+    if link.endswith(".pdf"):
+        scraper_nm = "pdf_scraper"
+    elif "arxiv.org" in link:
+        scraper_nm = "arxiv_scraper"
+    elif "cell.com" in link:
+        scraper_nm = "cell_selenium_scraper"
+    else:
+        #scraper_nm = "bs_scraper"
+        scraper_nm = "web_scraper"
+
+    # A host that keeps failing is skipped until its circuit breaker probes it again
+    breaker = get_circuit_breaker("scrape", urllib.parse.urlparse(link).hostname or link)
+    if not breaker.allow_request():
+        logging.info("Skipping %s, the circuit of its host is open", link)
+        return {"url": link, "raw_content": None}
 
-    def extract_data_from_link(link):
-        if link.endswith(".pdf"):
-            scraper_nm = "pdf_scraper"
-        elif "arxiv.org" in link:
-            scraper_nm = "arxiv_scraper"
-        elif "cell.com" in link:
-            scraper_nm = "cell_selenium_scraper"
-        else:
-            #scraper_nm = "bs_scraper"
-            scraper_nm = "web_scraper"
-
-        content = ""
+    content = ""
+    error = None
+    start_time = time.perf_counter()
+    with span("scrape_url", url=link, scraper=scraper_nm) as scrape_span:
         try:
             module_nm = "llm_analyst.scrapers.scraper_methods"
             module = importlib.import_module(module_nm)
             scrape_content = getattr(module, scraper_nm)
-            content = scrape_content(link)
+            content = scrape_content(link) or ""
+            scrape_span.set_attribute("bytes", len(content))
 
-            if len(content) < 100:
+            if len(content) < MIN_CONTENT_LENGTH:
                 return {"url": link, "raw_content": None}
             return {"url": link, "raw_content": content}
-        except Exception:
+        except Exception as e:
+            logging.warning("Error scraping %s : %s", link, e)
+            content = ""
+            error = e
             return {"url": link, "raw_content": None}
+        finally:
+            latency = time.perf_counter() - start_time
+            success = len(content) >= MIN_CONTENT_LENGTH
+            metrics.record_scrape(scraper_nm, len(content), latency, success)
+            if isinstance(error, ImportError):
+                # A scraper backend that is not installed says nothing about the host
+                breaker.release()
+            elif error is not None:
+                breaker.record_failure(latency)
+            else:
+                # A page with little text is no usable content, but the host did answer
+                breaker.record_success(latency)
+
+
+def get_provided_pages(search_results):
+    """Split search_results into the pages whose content the search provider supplied as
+    raw_content, and the results that still have to be scraped"""
+    provided_pages = []
+    results_to_scrape = []
+    for search_result in search_results:
+        raw_content = search_result.get("raw_content", None)
+        if raw_content and len(raw_content) >= MIN_CONTENT_LENGTH:
+            provided_pages.append(
+                {
+                    "url": search_result.get("href"),
+                    "title": search_result.get("title", ""),
+                    "raw_content": raw_content,
+                }
+            )
+        else:
+            results_to_scrape.append(search_result)
+    if provided_pages:
+        metrics.inc("search_provided_pages_total", len(provided_pages))
+        metrics.inc(
+            "search_provided_bytes_total",
+            sum(len(page["raw_content"]) for page in provided_pages),
+        )
+    return provided_pages, results_to_scrape
 
+
+@traced("scrape_urls")
+def scrape_urls(urls):
+    """
+    Given a list of URLs
+    1. Determine an appropriate scraper based on URL content
+    2. For each URL Scrape the website and aggregate the content into a list of strings
+        one for each site
+    """
     content_list = []
     try:
+        # Each worker runs in a copy of the caller's context so its span nests under scrape_urls
+        contexts = [contextvars.copy_context() for _ in urls]
         with ThreadPoolExecutor(max_workers=20) as executor:
-            contents = executor.map(extract_data_from_link, urls)
+            contents = executor.map(
+                lambda context, url: context.run(scrape_url, url), contexts, urls
+            )
         content_list = [
             content for content in contents if content["raw_content"] is not None
         ]
 
     except Exception as e:
         print(f"Error in scrape_urls: {e}")
+    current_span().set_attributes(
+        url_count=len(urls),
+        scraped_count=len(content_list),
+        bytes=sum(len(content["raw_content"]) for content in content_list),
+    )
     return content_list
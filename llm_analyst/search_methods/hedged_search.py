@@ -0,0 +1,122 @@
+"""
+This module defines the `HedgedSearch` class, a composite search provider built from an
+ordered list of the search functions in internet_search.py.
+
+    internet_search = "tavily_search,serper_search,ddg_search"
+
+The primary provider is called first. When it has not answered within its p95 latency a
+hedge request goes to the next provider, and when a provider fails or returns no results
+the next one is called at once. The first non-empty response is returned and the requests
+that have not started are cancelled, the ones already running finish in the background and
+their results are dropped. A slow or rate limited provider therefore costs at most its p95
+latency on each sub-query, instead of its full timeout followed by a serial fallback.
+
+The p95 is taken over the last LATENCY_WINDOW successful calls of each provider, until
+there are MIN_LATENCY_SAMPLES of them the initial_delay is used.
+"""
+import contextvars
+import inspect
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from llm_analyst.core.exceptions import LLMAnalystsException
+from llm_analyst.utils import metrics
+from llm_analyst.utils.app_logging import logging
+from llm_analyst.utils.tracing import span
+
+INITIAL_HEDGE_DELAY = 2.0
+LATENCY_WINDOW = 100
+MIN_LATENCY_SAMPLES = 10
+
+# Shared by every HedgedSearch, the sub-queries of a run search at the same time
+_EXECUTOR = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedged_search")
+
+
+class HedgedSearch:
+    """Search with the first provider of search_methods, hedged by the ones after it."""
+
+    def __init__(self, search_methods, initial_delay=INITIAL_HEDGE_DELAY):
+        if not search_methods:
+            raise LLMAnalystsException("HedgedSearch needs at least one search method")
+        self.search_methods = list(search_methods)
+        self.initial_delay = initial_delay
+        self.__name__ = "+".join(method.__name__ for method in self.search_methods)
+        self._lock = threading.Lock()
+        self._latencies = {
+            method.__name__: deque(maxlen=LATENCY_WINDOW) for method in self.search_methods
+        }
+
+    def get_hedge_delay(self, search_method):
+        """Seconds to wait for search_method before the next provider is called"""
+        with self._lock:
+            latencies = sorted(self._latencies[search_method.__name__])
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return self.initial_delay
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def _search(self, search_method, role, query, max_results):
+        provider_nm = search_method.__name__
+        kwargs = {"max_results": max_results}
+        # The providers fall back to ddg_search on their own, here the next provider does
+        if "fallback" in inspect.signature(search_method).parameters:
+            kwargs["fallback"] = False
+
+        with span("search_provider", provider=provider_nm, role=role) as provider_span:
+            start_time = time.perf_counter()
+            try:
+                search_results = search_method(query, **kwargs)
+            except Exception:
+                metrics.inc("search_provider_errors_total", provider=provider_nm)
+                raise
+            with self._lock:
+                self._latencies[provider_nm].append(time.perf_counter() - start_time)
+            provider_span.set_attribute("result_count", len(search_results or []))
+        return search_results
+
+    def __call__(self, query, max_results=7):
+        pending = {}
+        next_index = 0
+
+        def launch(role):
+            nonlocal next_index
+            search_method = self.search_methods[next_index]
+            next_index += 1
+            metrics.inc("search_hedge_total", provider=search_method.__name__, role=role)
+            # Copied so the provider span is a child of the search span of the caller
+            context = contextvars.copy_context()
+            future = _EXECUTOR.submit(
+                context.run, self._search, search_method, role, query, max_results
+            )
+            pending[future] = search_method
+
+        launch("primary")
+        try:
+            while pending:
+                hedge_delay = None
+                if next_index < len(self.search_methods):
+                    hedge_delay = self.get_hedge_delay(self.search_methods[next_index - 1])
+                done, _ = wait(pending, timeout=hedge_delay, return_when=FIRST_COMPLETED)
+                if not done:
+                    launch("hedge")
+                    continue
+
+                for future in done:
+                    search_method = pending.pop(future)
+                    try:
+                        search_results = future.result()
+                    except Exception as e:
+                        logging.warning("HedgedSearch %s failed: %s", search_method.__name__, e)
+                        continue
+                    if search_results:
+                        return search_results
+
+                if next_index < len(self.search_methods):
+                    launch("fallback")
+        finally:
+            for future in pending:
+                future.cancel()
+
+        logging.warning("HedgedSearch every provider of %s failed for [%s]", self.__name__, query)
+        return []
@@ -9,22 +9,144 @@ Functions:
     ddg_search(query, max_results=5): Searches using DuckDuckGo.
     google_search(query, max_results=7): Searches using Google Custom Search API.
     bing_search(query, max_results=7): Searches using Bing Search API.
+    fake_search(query, max_results=7): Offline search over a local corpus, for benchmarks.
+    search_many(search_method, queries, max_results=7): Searches a list of queries at once,
+        in one request where the provider supports it.
+
+Every search function returns a list of {"href", "body"} results, "body" is the snippet.
+A provider that extracts the page content in the same call adds it as "raw_content",
+the page is then used as it is instead of being scraped again (tavily_search does this).
+
+Each search function runs behind the circuit breaker of its provider, see circuit_breaker.py.
+The Tavily, Serper, SerpAPI and Google functions fall back to ddg_search when their request
+fails or their circuit is open, ddg_search falls back to no results. Called with
+fallback=False they raise instead. Several providers can be configured as an ordered list,
+"tavily_search,serper_search,ddg_search", they are then hedged by HedgedSearch in
+hedged_search.py.
+
+NOTE: Each search function is wrapped with @single_flight so that concurrent identical
+searches (for example the same sub-query from two subtopics) share one request.
 """ 
 
+import contextvars
+import functools
+import inspect
 import os
 import json
+import hashlib
+import threading
+import time
 import urllib.parse
-from tavily import TavilyClient
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-from duckduckgo_search import DDGS
 from llm_analyst.core.exceptions import LLMAnalystsException
+from llm_analyst.utils.app_logging import logging
+from llm_analyst.utils.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from llm_analyst.utils.single_flight import single_flight
+
+
+# A missing API key or package is not a failure of the provider, it is raised as is
+_CONFIGURATION_ERRORS = (LLMAnalystsException, ImportError)
+SERPER_URL = "https://google.serper.dev/search"
+# The queries of a search_many without a native batch are searched at most this many at a time
+MAX_CONCURRENT_SEARCHES = 8
+
+_sessions = threading.local()
+
+
+def _get_session():
+    """A keep-alive requests.Session per thread, so searches reuse the provider connections"""
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = requests.Session()
+        _sessions.session = session
+    return session
+
+
+def _no_results(query, max_results=7):
+    return []
 
 
+def search_provider(fallback_method=None):
+    """Decorator that runs a search function behind the circuit breaker of its provider.
+    When the search fails, or the circuit is open, fallback_method is called instead.
+    Callers that handle the failure themselves, like HedgedSearch, pass fallback=False
+    and get the exception.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, fallback=True, **kwargs):
+            use_fallback = fallback and fallback_method is not None
+            breaker = get_circuit_breaker("search", func.__name__)
+            try:
+                with breaker.track(ignore=_CONFIGURATION_ERRORS):
+                    return func(*args, **kwargs)
+            except CircuitOpenError as e:
+                if not use_fallback:
+                    raise
+                logging.info("%s, falling back to %s", e, fallback_method.__name__)
+            except _CONFIGURATION_ERRORS:
+                raise
+            except Exception:
+                if not use_fallback:
+                    raise
+            return fallback_method(*args, **kwargs)
+
+        signature = inspect.signature(func)
+        wrapper.__signature__ = signature.replace(
+            parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter("fallback", inspect.Parameter.KEYWORD_ONLY, default=True),
+            ]
+        )
+        return wrapper
+
+    return decorator
+
+
+@single_flight
+@search_provider(fallback_method=_no_results)
+def ddg_search(query, max_results=5):
+    """DuckDuckGo is a free private search engine.
+    As of May 2024 DuckDuckGo is Free not search limits
+    https://duckduckgo.com/
+    
+    NOTE: The results have been very good and I have been 
+    using this as the default for much of the work
+    """
+    from duckduckgo_search import DDGS
+
+    search_response = []
+    try:
+        ddg = DDGS()
+        search_response = ddg.text(
+            query,
+            region="wt-wt",
+            safesearch="off",
+            timelimit="y",
+            max_results=max_results,
+        )
+    except Exception as e:
+        print(f"ddgs_search Error: {e}")
+        raise
+
+    return search_response
+
+
+@single_flight
+@search_provider(fallback_method=ddg_search)
 def tavily_search(query, max_results=7):
     """Tavily is a search engine built specifically for AI agents (LLMs).
     As of May 2024 Tavily has Free tier allows 1,000 Free searches per month
     https://tavily.com/
+
+    The extracted page content is requested in the same call and returned as raw_content,
+    so these URLs are not scraped again.
     """
+    from tavily import TavilyClient
+
     try:
         api_key = os.environ["TAVILY_API_KEY"]
         client = TavilyClient(api_key)
@@ -36,15 +158,19 @@ def tavily_search(query, max_results=7):
 
     try:
         # Search the query
-        results = client.search(query, search_depth="advanced", max_results=max_results)
+        results = client.search(
+            query, search_depth="advanced", max_results=max_results, include_raw_content=True
+        )
         # Return the results
-        search_response = [
-            {"href": obj["url"], "body": obj["content"]}
-            for obj in results.get("results", [])
-        ]
-    except Exception as e:  # Fallback in case overload on Tavily Search API
+        search_response = []
+        for obj in results.get("results", []):
+            search_result = {"href": obj["url"], "body": obj["content"]}
+            if obj.get("raw_content"):
+                search_result["raw_content"] = obj["raw_content"]
+            search_response.append(search_result)
+    except Exception as e:  # Overload on Tavily Search API, search_provider falls back
         print(f"tavily_search Error: {e}")
-        search_response = ddg_search(query, max_results)
+        raise
 
     search_response = [
         obj for obj in search_response if "youtube.com" not in obj["href"]
@@ -52,48 +178,74 @@ def tavily_search(query, max_results=7):
     return search_response
 
 
+@single_flight
+@search_provider(fallback_method=ddg_search)
 def serper_search(query, max_results=7):
     """Fast and Cheap Google Search API
     As of May 2024 Serper has no Free tier
     but does allow 2,500 Free searches before you must pay
     """
     search_response = []
-    try:
-        api_key = os.environ["SERPER_API_KEY"]
-    except:
-        raise LLMAnalystsException(
-            "SERPER_API_KEY key not found. Please set the SERPER_API_KEY environment variable."
-        )
+    headers = _get_serper_headers()
 
     try:
-        url = "https://google.serper.dev/search"
-
-        headers = {"X-API-KEY": api_key, "Content-Type": "application/json"}
         data = json.dumps({"q": query, "num": max_results})
 
-        resp = requests.request("POST", url, timeout=10, headers=headers, data=data)
+        resp = _get_session().post(SERPER_URL, timeout=10, headers=headers, data=data)
 
         if resp:
             search_results = json.loads(resp.text)
             if search_results:
-                results = search_results["organic"]
-                for result in results:
-                    # skip youtube results
-                    if "youtube.com" in result["link"]:
-                        continue
-                    search_result = {
-                        "title": result["title"],
-                        "href": result["link"],
-                        "body": result["snippet"],
-                    }
-                    search_response.append(search_result)
+                search_response = _get_serper_results(search_results)
     except Exception as e:
         print(f"serper_search Error: {e}")
-        search_response = ddg_search(query, max_results)
+        raise
 
     return search_response
 
 
+def _get_serper_headers():
+    try:
+        api_key = os.environ["SERPER_API_KEY"]
+    except:
+        raise LLMAnalystsException(
+            "SERPER_API_KEY key not found. Please set the SERPER_API_KEY environment variable."
+        )
+    return {"X-API-KEY": api_key, "Content-Type": "application/json"}
+
+
+def _get_serper_results(search_results):
+    search_response = []
+    results = search_results["organic"]
+    for result in results:
+        # skip youtube results
+        if "youtube.com" in result["link"]:
+            continue
+        search_result = {
+            "title": result["title"],
+            "href": result["link"],
+            "body": result["snippet"],
+        }
+        search_response.append(search_result)
+    return search_response
+
+
+def _serper_search_many(queries, max_results=7):
+    """Serper accepts a list of searches in one POST and answers with a list of results"""
+    headers = _get_serper_headers()
+    breaker = get_circuit_breaker("search", "serper_search")
+    with breaker.track(ignore=_CONFIGURATION_ERRORS):
+        data = json.dumps([{"q": query, "num": max_results} for query in queries])
+        resp = _get_session().post(SERPER_URL, timeout=10, headers=headers, data=data)
+        resp.raise_for_status()
+        return [_get_serper_results(search_results) for search_results in json.loads(resp.text)]
+
+
+serper_search.search_many = _serper_search_many
+
+
+@single_flight
+@search_provider(fallback_method=ddg_search)
 def serp_api_search(query, max_results=7):
     """Scrape Google and other search engines from our fast, easy, and complete API.
     As of May 2024 SerpAPI Free tier allows 100 searches / month
@@ -113,7 +265,7 @@ def serp_api_search(query, max_results=7):
     encoded_url = url + "?" + urllib.parse.urlencode(params)
 
     try:
-        response = requests.get(encoded_url, timeout=10)
+        response = _get_session().get(encoded_url, timeout=10)
         if response.status_code == 200:
             search_results = response.json()
             if search_results:
@@ -133,35 +285,13 @@ def serp_api_search(query, max_results=7):
                     results_processed += 1
     except Exception as e:
         print(f"serp_api_search Error: {e}")
-        search_response = ddg_search(query, max_results)
-
-    return search_response
-
-
-def ddg_search(query, max_results=5):
-    """DuckDuckGo is a free private search engine.
-    As of May 2024 DuckDuckGo is Free not search limits
-    https://duckduckgo.com/
-    
-    NOTE: The results have been very good and I have been 
-    using this as the default for much of the work
-    """
-    search_response = []
-    try:
-        ddg = DDGS()
-        search_response = ddg.text(
-            query,
-            region="wt-wt",
-            safesearch="off",
-            timelimit="y",
-            max_results=max_results,
-        )
-    except Exception as e:  # Fallback in case overload on Tavily Search API
-        print(f"ddgs_search Error: {e}")
+        raise
 
     return search_response
 
 
+@single_flight
+@search_provider(fallback_method=ddg_search)
 def google_search(query, max_results=7):
     """Google Search no explaination needed
     As of May 2024 Google has Free tier allows 100 Free searches per day
@@ -173,7 +303,7 @@ def google_search(query, max_results=7):
     try:
         api_key = os.environ["GOOGLE_API_KEY"]
     except:
-        raise Exception(
+        raise LLMAnalystsException(
             "Google API key not found. Please set the GOOGLE_API_KEY environment variable. "
             "You can get a key at https://developers.google.com/custom-search/v1/overview"
         )
@@ -181,7 +311,7 @@ def google_search(query, max_results=7):
     try:
         cx_key = os.environ["GOOGLE_CX_KEY"]
     except:
-        raise Exception(
+        raise LLMAnalystsException(
             "Google CX key not found. Please set the GOOGLE_CX_KEY environment variable. "
             "You can get a key at https://developers.google.com/custom-search/v1/overview"
         )
@@ -192,7 +322,7 @@ def google_search(query, max_results=7):
         params = {"key": api_key, "cx": cx_key, "q": query, "start": 1}
         encoded_url = url + "?" + urllib.parse.urlencode(params)
 
-        response = requests.get(encoded_url, timeout=10)
+        response = _get_session().get(encoded_url, timeout=10)
 
         if response is None:
             return search_response
@@ -222,17 +352,19 @@ def google_search(query, max_results=7):
 
     except Exception as e:
         print(f"tavily_search Error: {e}")
-        search_response = ddg_search(query, max_results)
+        raise
 
     return search_response
 
 
+@single_flight
+@search_provider()
 def bing_search(query, max_results=7):
     search_response = []
     try:
         api_key = os.environ["BING_API_KEY"]
     except:
-        raise Exception(
+        raise LLMAnalystsException(
             "Bing API key not found. Please set the BING_API_KEY environment variable."
         )
 
@@ -250,7 +382,7 @@ def bing_search(query, max_results=7):
         "safeSearch": "Strict",
     }
 
-    resp = requests.get(url, headers=headers, params=params, timeout=10)
+    resp = _get_session().get(url, headers=headers, params=params, timeout=10)
 
     # Preprocess the results
     if resp is None:
@@ -277,3 +409,68 @@ def bing_search(query, max_results=7):
         search_response.append(search_result)
 
     return search_response
+
+
+@single_flight
+@search_provider()
+def fake_search(query, max_results=7):
+    """Deterministic offline search for benchmarks, no request leaves the machine.
+    The results point to documents served by a local corpus server, see benchmarks/corpus_server.py
+
+    FAKE_SEARCH_URL          base url of the corpus server (default http://127.0.0.1:8765)
+    FAKE_SEARCH_CORPUS_SIZE  number of documents in the corpus (default 50)
+    FAKE_SEARCH_LATENCY      seconds added to every search (default 0)
+    """
+    base_url = os.getenv("FAKE_SEARCH_URL", "http://127.0.0.1:8765").rstrip("/")
+    corpus_size = int(os.getenv("FAKE_SEARCH_CORPUS_SIZE", "50"))
+    latency = float(os.getenv("FAKE_SEARCH_LATENCY", "0") or 0)
+    if latency:
+        time.sleep(latency)
+
+    # Similar queries share documents, as they do with a real search engine
+    first_doc = int(hashlib.sha256(query.encode("utf-8")).hexdigest()[:8], 16) % corpus_size
+    search_response = []
+    for index in range(min(max_results, corpus_size)):
+        doc_id = (first_doc + index * 3) % corpus_size
+        # Every fifth document of the corpus is a PDF
+        extension = "pdf" if doc_id % 5 == 4 else "html"
+        search_response.append(
+            {
+                "title": f"Document {doc_id}",
+                "href": f"{base_url}/docs/{doc_id}.{extension}",
+                "body": f"Document {doc_id} about {query}",
+            }
+        )
+    return search_response
+
+
+def search_many(search_method, queries, max_results=7):
+    """The results of search_method for each of queries, in the same order.
+    A provider with a batch API has a search_many attribute and answers all the queries in
+    one request (serper_search), the others are searched concurrently. When the batch request
+    fails the queries are searched one by one, with the fallback of the provider."""
+    if not queries:
+        return []
+    native_search_many = getattr(search_method, "search_many", None)
+    if native_search_many is not None:
+        try:
+            return native_search_many(queries, max_results=max_results)
+        except CircuitOpenError:
+            pass
+        except _CONFIGURATION_ERRORS:
+            raise
+        except Exception as e:
+            logging.warning(
+                "%s batch search failed, searching one by one: %s", search_method.__name__, e
+            )
+
+    # Each worker runs in a copy of the caller's context so spans and run metrics follow it
+    contexts = [contextvars.copy_context() for _ in queries]
+    with ThreadPoolExecutor(max_workers=min(len(queries), MAX_CONCURRENT_SEARCHES)) as executor:
+        return list(
+            executor.map(
+                lambda context, query: context.run(search_method, query, max_results=max_results),
+                contexts,
+                queries,
+            )
+        )
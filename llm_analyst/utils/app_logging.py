@@ -3,6 +3,8 @@ This module configures logging settings for various libraries and provides a dec
 function to trace the entry and exit points of other functions.
 """
 
+import functools
+import inspect
 import logging
 
 logging.basicConfig(level=logging.DEBUG)
@@ -26,6 +28,18 @@ logger = logging.getLogger(__name__)
 
 
 def trace_log(func):
+    if inspect.iscoroutinefunction(func):
+        # Exiting is logged once the coroutine has finished, not when it is created
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            logger.debug("TRACE: Entering %s", func.__name__)
+            result = await func(*args, **kwargs)
+            logger.debug("TRACE: Exiting %s", func.__name__)
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         logger.debug("TRACE: Entering %s", func.__name__)
         result = func(*args, **kwargs)
@@ -0,0 +1,212 @@
+"""
+Circuit breakers for the search providers and the scraped hosts.
+
+Each breaker keeps the outcome and latency of the calls made in the last WINDOW_SECONDS,
+at most WINDOW_SIZE of them. It opens after FAILURE_THRESHOLD consecutive failures, or when
+ERROR_RATE_THRESHOLD of at least MIN_CALLS calls in the window failed. While it is open the
+calls are refused at once, so the caller goes straight to its alternative instead of paying
+for the failure again. After RESET_TIMEOUT seconds one probe call is let through (half open),
+its success closes the breaker and its failure opens it again.
+
+    breaker = get_circuit_breaker("search", "tavily_search")
+    with breaker.track():
+        search_results = ...
+
+The state of every breaker is returned by get_circuit_breaker_status(), and served as JSON
+at http://host:port/circuit_breakers by serve_metrics in metrics.py.
+"""
+import contextlib
+import threading
+import time
+from collections import OrderedDict, deque
+
+from llm_analyst.core.exceptions import LLMAnalystsException
+from llm_analyst.utils import metrics
+from llm_analyst.utils.app_logging import logging
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+FAILURE_THRESHOLD = 5
+ERROR_RATE_THRESHOLD = 0.5
+MIN_CALLS = 10
+WINDOW_SECONDS = 60.0
+WINDOW_SIZE = 100
+RESET_TIMEOUT = 30.0
+# Every scraped host has a breaker, the least recently created ones are dropped
+MAX_BREAKERS = 1000
+
+
+class CircuitOpenError(LLMAnalystsException):
+    """The call was refused because the circuit of the provider or host is open"""
+
+
+def _get_percentile(sorted_values, percentile):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percentile))]
+
+
+class CircuitBreaker:
+    """Tracks the error rate and latency of one provider or host and stops calling it while it fails."""
+
+    def __init__(
+        self,
+        kind,
+        name,
+        failure_threshold=FAILURE_THRESHOLD,
+        error_rate_threshold=ERROR_RATE_THRESHOLD,
+        min_calls=MIN_CALLS,
+        window_seconds=WINDOW_SECONDS,
+        reset_timeout=RESET_TIMEOUT,
+    ):
+        self.kind = kind
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._lock = threading.Lock()
+        # (monotonic time, success, latency) of the calls in the window
+        self._calls = deque(maxlen=WINDOW_SIZE)
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def _set_state(self, state):
+        """Called with the lock held"""
+        if state != self.state:
+            logging.warning("Circuit breaker %s [%s] is %s", self.kind, self.name, state)
+            metrics.inc("circuit_breaker_transitions_total", kind=self.kind, state=state)
+        self.state = state
+        self._probe_in_flight = False
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._calls.clear()
+            self._consecutive_failures = 0
+
+    def _trim(self, now):
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def allow_request(self):
+        """True when a call may be made now, a half open breaker allows one probe at a time"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._set_state(HALF_OPEN)
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self, latency):
+        with self._lock:
+            self._calls.append((time.monotonic(), True, latency))
+            self._consecutive_failures = 0
+            if self.state == HALF_OPEN:
+                self._set_state(CLOSED)
+
+    def record_failure(self, latency):
+        with self._lock:
+            now = time.monotonic()
+            self._calls.append((now, False, latency))
+            self._consecutive_failures += 1
+            if self.state == HALF_OPEN:
+                self._set_state(OPEN)
+                return
+            if self.state != CLOSED:
+                return
+
+            self._trim(now)
+            failures = sum(1 for _, success, _ in self._calls if not success)
+            if self._consecutive_failures >= self.failure_threshold or (
+                len(self._calls) >= self.min_calls
+                and failures / len(self._calls) >= self.error_rate_threshold
+            ):
+                self._set_state(OPEN)
+
+    def release(self):
+        """The call allowed by allow_request ended without telling anything about the health,
+        for example on a configuration error, let the next call probe instead"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    @contextlib.contextmanager
+    def track(self, ignore=()):
+        """Run the enclosed call when the circuit allows it and record its outcome.
+        Raises CircuitOpenError when the circuit is open, exceptions of the ignore types
+        are not counted as failures."""
+        if not self.allow_request():
+            raise CircuitOpenError(f"The circuit of {self.kind} [{self.name}] is open")
+        start_time = time.perf_counter()
+        try:
+            yield self
+        except ignore:
+            self.release()
+            raise
+        except Exception:
+            self.record_failure(time.perf_counter() - start_time)
+            raise
+        self.record_success(time.perf_counter() - start_time)
+
+    def status(self):
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            latencies = sorted(latency for _, _, latency in self._calls)
+            failures = sum(1 for _, success, _ in self._calls if not success)
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0.0, self.reset_timeout - (now - self._opened_at))
+            return {
+                "kind": self.kind,
+                "name": self.name,
+                "state": self.state,
+                "calls": len(self._calls),
+                "failures": failures,
+                "error_rate": failures / len(self._calls) if self._calls else 0.0,
+                "consecutive_failures": self._consecutive_failures,
+                "p50_latency": _get_percentile(latencies, 0.5),
+                "p95_latency": _get_percentile(latencies, 0.95),
+                "retry_in": retry_in,
+            }
+
+
+_BREAKERS = OrderedDict()
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_circuit_breaker(kind, name):
+    """The process wide breaker of a search provider (kind "search") or scraped host (kind "scrape")"""
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get((kind, name), None)
+        if breaker is None:
+            breaker = CircuitBreaker(kind, name)
+            _BREAKERS[(kind, name)] = breaker
+            while len(_BREAKERS) > MAX_BREAKERS:
+                _BREAKERS.popitem(last=False)
+        return breaker
+
+
+def get_circuit_breaker_status(kind=None):
+    """{kind: {name: status}} of every breaker, or of the breakers of one kind"""
+    with _BREAKERS_LOCK:
+        breakers = list(_BREAKERS.values())
+    status = {}
+    for breaker in breakers:
+        if kind is None or breaker.kind == kind:
+            status.setdefault(breaker.kind, {})[breaker.name] = breaker.status()
+    return status
+
+
+def reset_circuit_breakers():
+    with _BREAKERS_LOCK:
+        _BREAKERS.clear()
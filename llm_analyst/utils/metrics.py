@@ -0,0 +1,266 @@
+"""
+Counters and histograms for LLM tokens, embeddings, searches and scrapes.
+
+Every value is recorded twice: in the process wide registry and in the registry of the
+research run it belongs to. The run is found through a `ContextVar` set by
+`with use_run_metrics(run_id)` around `conduct_research`, `write_report` and
+`create_detailed_report`, so it follows the asyncio tasks and threads of the run.
+
+    get_metrics()              # process wide
+    get_metrics(run_id)        # one research run
+    get_prometheus_metrics()   # process wide, Prometheus text exposition format
+    serve_metrics(port)        # optional http endpoint for a Prometheus scraper,
+                               # it also serves the circuit breaker status at /circuit_breakers
+"""
+import bisect
+import contextlib
+import contextvars
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000)
+
+# The metrics of this many research runs are kept
+MAX_RUNS = 100
+
+_run_metrics = contextvars.ContextVar("llm_analyst_run_metrics", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_json(self):
+        cumulative_count = 0
+        buckets = {}
+        for upper_bound, bucket_count in zip(self.buckets + ("+Inf",), self.bucket_counts):
+            cumulative_count += bucket_count
+            buckets[str(upper_bound)] = cumulative_count
+        return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+
+class MetricsRegistry:
+    """Counters and histograms by metric name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    @staticmethod
+    def _labels_key(labels):
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        labels_key = self._labels_key(labels)
+        with self._lock:
+            counter = self._counters.setdefault(name, {})
+            counter[labels_key] = counter.get(labels_key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        labels_key = self._labels_key(labels)
+        with self._lock:
+            histogram = self._histograms.setdefault(name, {})
+            if labels_key not in histogram:
+                histogram[labels_key] = Histogram(buckets)
+            histogram[labels_key].observe(value)
+
+    def get_counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get(name, {}).get(self._labels_key(labels), 0)
+
+    def snapshot(self):
+        """{"counters": {name: [{"labels", "value"}]},
+        "histograms": {name: [{"labels", "count", "sum", "buckets"}]}}"""
+        with self._lock:
+            counters = {
+                name: [
+                    {"labels": dict(labels_key), "value": value}
+                    for labels_key, value in counter.items()
+                ]
+                for name, counter in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {"labels": dict(labels_key), **histogram.to_json()}
+                    for labels_key, histogram in histogram_by_labels.items()
+                ]
+                for name, histogram_by_labels in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def to_prometheus(self, prefix="llm_analyst_"):
+        """The Prometheus text exposition format"""
+
+        def format_labels(labels):
+            if not labels:
+                return ""
+            escaped_labels = (
+                '{}="{}"'.format(
+                    key,
+                    str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+                )
+                for key, value in labels.items()
+            )
+            return "{" + ",".join(escaped_labels) + "}"
+
+        metrics_snapshot = self.snapshot()
+        lines = []
+        for name, samples in sorted(metrics_snapshot["counters"].items()):
+            lines.append(f"# TYPE {prefix}{name} counter")
+            for sample in samples:
+                lines.append(f"{prefix}{name}{format_labels(sample['labels'])} {sample['value']}")
+        for name, samples in sorted(metrics_snapshot["histograms"].items()):
+            lines.append(f"# TYPE {prefix}{name} histogram")
+            for sample in samples:
+                labels = format_labels(sample["labels"])
+                for upper_bound, bucket_count in sample["buckets"].items():
+                    bucket_labels = format_labels({**sample["labels"], "le": upper_bound})
+                    lines.append(f"{prefix}{name}_bucket{bucket_labels} {bucket_count}")
+                lines.append(f"{prefix}{name}_sum{labels} {sample['sum']}")
+                lines.append(f"{prefix}{name}_count{labels} {sample['count']}")
+        return "\n".join(lines) + "\n"
+
+
+PROCESS_METRICS = MetricsRegistry()
+_RUN_METRICS = OrderedDict()
+_RUN_METRICS_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def use_run_metrics(run_id):
+    """Record the metrics of the with block, and the tasks it starts, for run_id.
+    The registry of the caller is restored when the block exits, a run_id of None keeps it."""
+    if run_id is None:
+        yield _run_metrics.get()
+        return
+    with _RUN_METRICS_LOCK:
+        registry = _RUN_METRICS.get(run_id, None)
+        if registry is None:
+            registry = MetricsRegistry()
+            _RUN_METRICS[run_id] = registry
+            while len(_RUN_METRICS) > MAX_RUNS:
+                _RUN_METRICS.popitem(last=False)
+    token = _run_metrics.set(registry)
+    try:
+        yield registry
+    finally:
+        _run_metrics.reset(token)
+
+
+def inc(name, value=1, **labels):
+    PROCESS_METRICS.inc(name, value, **labels)
+    run_registry = _run_metrics.get()
+    if run_registry is not None:
+        run_registry.inc(name, value, **labels)
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    PROCESS_METRICS.observe(name, value, buckets, **labels)
+    run_registry = _run_metrics.get()
+    if run_registry is not None:
+        run_registry.observe(name, value, buckets, **labels)
+
+
+def record_llm_call(provider, model, prompt_nm, input_tokens, output_tokens, latency):
+    """Token counts and latency are None when the provider does not report them"""
+    labels = {"provider": provider, "model": model, "prompt": prompt_nm or "unknown"}
+    inc("llm_requests_total", **labels)
+    if input_tokens is not None:
+        inc("llm_input_tokens_total", input_tokens, **labels)
+        observe("llm_input_tokens", input_tokens, TOKEN_BUCKETS, provider=provider, model=model)
+    if output_tokens is not None:
+        inc("llm_output_tokens_total", output_tokens, **labels)
+        observe("llm_output_tokens", output_tokens, TOKEN_BUCKETS, provider=provider, model=model)
+    if latency is not None:
+        observe("llm_latency_seconds", latency, provider=provider, model=model)
+
+
+def record_embedding_call(provider, chunk_count):
+    inc("embedding_calls_total", provider=provider)
+    inc("embedding_chunks_total", chunk_count, provider=provider)
+
+
+def record_search(provider, result_count, latency):
+    inc("search_queries_total", provider=provider)
+    inc("search_results_total", result_count, provider=provider)
+    observe("search_latency_seconds", latency, provider=provider)
+
+
+def record_scrape(scraper, byte_count, latency, success):
+    inc("scrape_requests_total", scraper=scraper, status="ok" if success else "failed")
+    inc("scrape_bytes_total", byte_count, scraper=scraper)
+    observe("scrape_bytes", byte_count, SIZE_BUCKETS, scraper=scraper)
+    observe("scrape_latency_seconds", latency, scraper=scraper)
+
+
+def get_metrics(run_id=None):
+    """A snapshot of the process wide metrics, or of one research run when run_id is given"""
+    if run_id is None:
+        return PROCESS_METRICS.snapshot()
+    with _RUN_METRICS_LOCK:
+        registry = _RUN_METRICS.get(run_id, None)
+    return registry.snapshot() if registry else {"counters": {}, "histograms": {}}
+
+
+def get_prometheus_metrics():
+    return PROCESS_METRICS.to_prometheus()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            body = get_prometheus_metrics().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/circuit_breakers":
+            # Imported here, circuit_breaker records its transitions in these metrics
+            from llm_analyst.utils.circuit_breaker import get_circuit_breaker_status
+
+            body = json.dumps(get_circuit_breaker_status()).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server = None
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    """Serve get_prometheus_metrics() at http://host:port/metrics, and the circuit breaker
+    status at /circuit_breakers, from a daemon thread.
+    Only one server is started per process, port 0 picks a free port."""
+    global _metrics_server
+    if _metrics_server is None:
+        _metrics_server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+        threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+    return _metrics_server
+
+
+def stop_metrics_server():
+    global _metrics_server
+    if _metrics_server is not None:
+        _metrics_server.shutdown()
+        _metrics_server.server_close()
+        _metrics_server = None
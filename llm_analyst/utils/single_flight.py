@@ -0,0 +1,111 @@
+"""
+Request coalescing (single-flight) for LLM, search and scrape calls.
+
+When identical calls are in flight at the same time, only the first one (the leader) does
+the work and every other caller waits for, and shares, its result or exception.
+Nothing is cached: once the leader finishes the next call goes to the network again.
+
+The same `SingleFlight` works for coroutines and for threads, as the search and scrape
+functions are synchronous and run in worker threads.
+
+A cancelled coroutine does not cancel the others: when the leader is cancelled one of the
+waiting callers becomes the leader and makes the call again.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future
+
+
+class _LeaderCancelled(Exception):
+    """The leader was cancelled, a waiting caller becomes the leader and makes the call"""
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one underlying call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def _join(self, key):
+        """Return (future, is_leader) for the call identified by key"""
+        with self._lock:
+            future = self._calls.get(key, None)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def _finish(self, key, future):
+        with self._lock:
+            # The key may already belong to the next leader
+            if self._calls.get(key, None) is future:
+                del self._calls[key]
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key, func, *args, **kwargs):
+        """Call func(*args, **kwargs) unless the same key is already in flight on another thread"""
+        future, is_leader = self._join(key)
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._finish(key, future)
+
+    async def ado(self, key, make_call):
+        """Await make_call() unless the same key is already in flight"""
+        while True:
+            future, is_leader = self._join(key)
+            if is_leader:
+                break
+            try:
+                # Shielded, a cancelled follower must not cancel the call the others share
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _LeaderCancelled:
+                continue
+
+        try:
+            result = await make_call()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            # The cancellation is not shared, the next waiting caller makes the call again
+            self._finish(key, future)
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._finish(key, future)
+
+
+# Shared by the chat models, the search functions and scrape_urls
+SINGLE_FLIGHT = SingleFlight()
+
+
+def single_flight(func):
+    """Decorator that coalesces concurrent calls of a sync function with equal arguments"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return func(*args, **kwargs)
+        return SINGLE_FLIGHT.do(key, func, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,267 @@
+"""
+Lightweight tracing spans for the research pipeline.
+
+A span records the wall time of a block of code, its parent span and a few attributes
+(query, URL count, bytes, tokens). Spans nest through a `ContextVar`, so nesting follows
+asyncio tasks and `asyncio.to_thread` calls, which both copy the current context.
+
+    with span("search", query=sub_query) as search_span:
+        ...
+        search_span.set_attribute("result_count", len(results))
+
+    @traced("choose_agent")
+    async def choose_agent(self): ...
+
+Finished spans are written as one json object per line to the trace file set with
+`TRACER.set_trace_file` (the `trace_file` config value). `to_chrome_trace` converts a
+trace file to the Chrome trace event format, which Perfetto (https://ui.perfetto.dev)
+and chrome://tracing show as a waterfall. When no trace file or exporter is set, spans
+cost next to nothing.
+"""
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+
+_current_span = contextvars.ContextVar("llm_analyst_current_span", default=None)
+
+
+class Span:
+    """A timed block of code with attributes"""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "start_time",
+        "end_time",
+        "status",
+        "error",
+        "_start_counter",
+    )
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes) if attributes else {}
+        self.start_time = time.time()
+        self.end_time = None
+        self.status = "ok"
+        self.error = None
+        self._start_counter = time.perf_counter()
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add_to_attribute(self, key, value):
+        """Add to a counter attribute, for example bytes or tokens"""
+        self.attributes[key] = self.attributes.get(key, 0) + value
+
+    @property
+    def duration_ms(self):
+        if self.end_time is None:
+            return None
+        return (self.end_time - self.start_time) * 1000
+
+    def end(self, error=None):
+        self.end_time = self.start_time + (time.perf_counter() - self._start_counter)
+        if error is not None:
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_json(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "thread_id": threading.get_ident(),
+        }
+
+
+class _NoopSpan:
+    """Returned when tracing is disabled"""
+
+    name = None
+    span_id = None
+    attributes = {}
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def add_to_attribute(self, key, value):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Hands finished spans to the exporters, a JSONL trace file and any callables added"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._exporters = []
+        self.trace_file = None
+
+    @property
+    def enabled(self):
+        return bool(self._exporters)
+
+    def add_exporter(self, exporter):
+        """exporter is called with each finished Span"""
+        with self._lock:
+            self._exporters = self._exporters + [exporter]
+
+    def remove_exporter(self, exporter):
+        with self._lock:
+            self._exporters = [item for item in self._exporters if item != exporter]
+
+    def set_trace_file(self, trace_file):
+        """Append finished spans to trace_file as JSONL, None or "" stops writing"""
+        if self.trace_file:
+            self.remove_exporter(self._write_span)
+        self.trace_file = os.path.expanduser(trace_file) if trace_file else None
+        if self.trace_file:
+            directory = os.path.dirname(self.trace_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.add_exporter(self._write_span)
+
+    def _write_span(self, finished_span):
+        line = json.dumps(finished_span.to_json(), default=str)
+        with self._lock:
+            with open(self.trace_file, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+
+    def export(self, finished_span):
+        for exporter in self._exporters:
+            try:
+                exporter(finished_span)
+            except Exception:
+                # A broken exporter must never fail the research run
+                pass
+
+
+TRACER = Tracer()
+
+
+def current_span():
+    """The innermost active span, or a no-op span when there is none"""
+    return _current_span.get() or NOOP_SPAN
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """Time the enclosed block as a child of the current span"""
+    if not TRACER.enabled:
+        yield NOOP_SPAN
+        return
+
+    new_span = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(new_span)
+    error = None
+    try:
+        yield new_span
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        new_span.end(error)
+        TRACER.export(new_span)
+
+
+def traced(name=None, **attributes):
+    """Decorator that runs a sync or async function inside a span named after the function"""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, **attributes):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, **attributes):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _get_track(span_json, spans_by_id):
+    """Concurrent spans of one trace, such as the sub-queries, each get their own track:
+    the track is the ancestor just below the root span"""
+    track_span = span_json
+    while track_span["parent_id"] in spans_by_id:
+        parent_span = spans_by_id[track_span["parent_id"]]
+        if parent_span["parent_id"] not in spans_by_id:
+            break
+        track_span = parent_span
+    if track_span["parent_id"] is None:
+        return track_span["name"]
+    return f"{track_span['name']} {track_span['span_id'][:6]}"
+
+
+def to_chrome_trace(trace_file, chrome_trace_file):
+    """Convert a JSONL trace file to the Chrome trace event format for a waterfall view.
+    Each trace is shown as a process and each concurrent branch of it as a track.
+    """
+    spans = []
+    with open(trace_file, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                spans.append(json.loads(line))
+    spans_by_id = {span_json["span_id"]: span_json for span_json in spans}
+
+    trace_events = []
+    for span_json in spans:
+        trace_events.append(
+            {
+                "name": span_json["name"],
+                "ph": "X",
+                "ts": span_json["start_time"] * 1_000_000,
+                "dur": (span_json["duration_ms"] or 0) * 1000,
+                "pid": span_json["trace_id"][:8],
+                "tid": _get_track(span_json, spans_by_id),
+                "args": {
+                    **span_json["attributes"],
+                    "span_id": span_json["span_id"],
+                    "parent_id": span_json["parent_id"],
+                    "status": span_json["status"],
+                    "error": span_json["error"],
+                },
+            }
+        )
+
+    with open(chrome_trace_file, "w", encoding="utf-8") as file:
+        json.dump({"traceEvents": trace_events}, file, default=str)
+    return chrome_trace_file
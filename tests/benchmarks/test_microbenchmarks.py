@@ -0,0 +1,48 @@
+""" Test Cases for the microbenchmarks and the regression comparison """
+
+import pytest
+
+from benchmarks.compare_results import compare_results
+from benchmarks.microbenchmarks import run_microbenchmarks
+
+
+def test_microbenchmarks_context_compressor():
+    results = run_microbenchmarks(("context_compressor",), repeats=1, quick=True)
+
+    compressor_results = results["results"]["context_compressor"]
+    assert len(compressor_results) == 4
+    assert all(result["median_ms"] > 0 for result in compressor_results)
+    assert {result["params"]["sub_queries"] for result in compressor_results} == {1, 4}
+
+
+def test_compare_results():
+    baseline = {
+        "results": {
+            "document_loader": [
+                {"params": {"files": 10, "format": "txt"}, "median_ms": 10.0},
+                {"params": {"files": 50, "format": "txt"}, "median_ms": 40.0},
+                {"params": {"files": 10, "format": "pdf"}, "skipped": "no backend"},
+            ]
+        },
+        "scenarios": {"research_report": {"mean_seconds": 1.0}},
+    }
+    current = {
+        "results": {
+            "document_loader": [
+                {"params": {"files": 10, "format": "txt"}, "median_ms": 12.0},
+                {"params": {"files": 50, "format": "txt"}, "median_ms": 30.0},
+            ]
+        },
+        "scenarios": {"research_report": {"mean_seconds": 1.05}},
+    }
+
+    statuses = {row[0]: row[4] for row in compare_results(baseline, current, threshold=0.10)}
+    assert statuses == {
+        "document_loader[files=10,format=txt]": "REGRESSION",
+        "document_loader[files=50,format=txt]": "improved",
+        "research_report": "ok",
+    }
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,39 @@
+""" Test Cases for the offline benchmarks """
+
+import os
+import urllib.request
+
+import pytest
+
+from benchmarks.corpus_server import CorpusServer, build_corpus
+from benchmarks.run_benchmarks import run_benchmarks
+from tests.utils_for_pytest import OUTPUT_PATH
+
+
+def test_corpus_server():
+    corpus_dir = build_corpus(os.path.join(OUTPUT_PATH, "benchmark_corpus"), doc_count=5)
+
+    with CorpusServer(corpus_dir) as corpus_server:
+        with urllib.request.urlopen(f"{corpus_server.url}/docs/0.html", timeout=5) as response:
+            assert b"<h1>Document 0</h1>" in response.read()
+        with urllib.request.urlopen(f"{corpus_server.url}/docs/4.pdf", timeout=5) as response:
+            assert response.read().startswith(b"%PDF-1.4")
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(
+        scenarios=("research_report", "select_urls"), runs=1, warmup=0, corpus_size=10
+    )
+
+    for scenario in ("research_report", "select_urls"):
+        result = results["scenarios"][scenario]
+        assert len(result["seconds"]) == 1
+        assert result["totals"]["llm_requests"] > 0
+        assert result["totals"]["scrape_bytes"] > 0
+        assert "conduct_research" in result["stages"]
+        assert result["peak_rss_mb"] > 0
+    assert results["scenarios"]["research_report"]["totals"]["searches"] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
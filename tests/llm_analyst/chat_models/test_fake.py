@@ -0,0 +1,70 @@
+""" Test Cases for FAKE_Model """
+
+import asyncio
+import inspect
+import json
+
+import pytest
+
+from llm_analyst.chat_models.fake import FAKE_Model
+from llm_analyst.core.config import Config
+from tests.utils_for_pytest import dump_test_results
+
+AGENT_ROLE_PROMPT = "You are a research assistant."
+
+
+@pytest.mark.asyncio
+async def test_chat_model_fake():
+    function_name = inspect.currentframe().f_code.co_name
+    fake_model = FAKE_Model(model="fake-model", temperature=0, max_tokens=1000)
+
+    sub_queries = await fake_model.get_chat_response(
+        AGENT_ROLE_PROMPT, "Research topic", prompt_nm="search_queries_prompt"
+    )
+    assert len(json.loads(sub_queries)) == 3
+    assert sub_queries == await fake_model.get_chat_response(
+        AGENT_ROLE_PROMPT, "Research topic", prompt_nm="search_queries_prompt"
+    )
+
+    agent = json.loads(
+        await fake_model.get_chat_response(
+            AGENT_ROLE_PROMPT, "Research topic", prompt_nm="choose_agent_prompt"
+        )
+    )
+    assert {"agentType", "agentRole"} <= set(agent)
+
+    report = await fake_model.get_chat_response(
+        AGENT_ROLE_PROMPT, "Research topic", stream=True, prompt_nm="research_report_prompt"
+    )
+    assert report.startswith("# Report")
+    assert report.count("\n## ") == 5
+    dump_test_results(function_name, report, to_json=False)
+
+
+@pytest.mark.asyncio
+async def test_chat_model_fake_concurrent_prompt_nms():
+    fake_model = FAKE_Model(model="fake-model", temperature=0, max_tokens=1000)
+    fake_model.latency = 0.05
+
+    # Concurrent requests with the same prompts but another prompt_nm are not coalesced
+    agent, sub_queries = await asyncio.gather(
+        fake_model.get_chat_response(
+            AGENT_ROLE_PROMPT, "Research topic", prompt_nm="choose_agent_prompt"
+        ),
+        fake_model.get_chat_response(
+            AGENT_ROLE_PROMPT, "Research topic", prompt_nm="search_queries_prompt"
+        ),
+    )
+    assert "agentType" in json.loads(agent)
+    assert len(json.loads(sub_queries)) == 3
+
+
+def test_chat_model_fake_config():
+    config = Config()
+    config.set_values_for_config({"llm_provider": "fake"})
+
+    assert config.llm_provider == FAKE_Model
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
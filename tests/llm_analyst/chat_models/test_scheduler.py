@@ -0,0 +1,185 @@
+""" Test Cases for ChatScheduler """
+
+import asyncio
+import time
+
+import pytest
+
+from llm_analyst.chat_models.scheduler import (EXPECTED_OUTPUT_TOKENS, ChatScheduler,
+                                               TokenBucket, estimate_tokens)
+
+
+class RateLimitError(Exception):
+    """Looks like the openai / groq SDK error for a 429"""
+
+    def __init__(self, headers):
+        super().__init__("Rate limit reached")
+        self.status_code = 429
+        self.response = type("Response", (), {"headers": headers})()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_token_bucket_limits_rate():
+    # 600 per minute is 10 per second, the first 600 are free
+    token_bucket = TokenBucket(600)
+    token_bucket.tokens = 0
+    start_time = time.monotonic()
+    await token_bucket.acquire(2)
+    assert time.monotonic() - start_time >= 0.15
+
+
+@pytest.mark.asyncio
+async def test_scheduler_retry_honors_retry_after():
+    scheduler = ChatScheduler(max_retries=2, base_delay=0.01)
+    calls = []
+
+    async def make_call():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise RateLimitError({"retry-after-ms": "200"})
+        return "ok"
+
+    actual_result = await scheduler.run(make_call)
+    assert actual_result == "ok"
+    assert calls[1] - calls[0] >= 0.2
+
+
+@pytest.mark.asyncio
+async def test_scheduler_does_not_retry_client_errors():
+    scheduler = ChatScheduler(max_retries=3)
+    calls = []
+
+    async def make_call():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        await scheduler.run(make_call)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_max_in_flight():
+    scheduler = ChatScheduler(max_in_flight=2)
+    in_flight = []
+    max_seen = []
+
+    async def make_call():
+        in_flight.append(1)
+        max_seen.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+
+    await asyncio.gather(*[scheduler.run(make_call) for _ in range(6)])
+    assert max(max_seen) == 2
+
+
+@pytest.mark.asyncio
+async def test_scheduler_stream_retries_before_first_item():
+    scheduler = ChatScheduler(max_retries=2, base_delay=0.01)
+    attempts = []
+
+    async def make_stream():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RateLimitError({"retry-after": "0"})
+        for content in ["Hello", " ", "World"]:
+            yield content
+
+    actual_result = [content async for content in scheduler.stream(make_stream)]
+    assert actual_result == ["Hello", " ", "World"]
+    assert len(attempts) == 2
+
+
+@pytest.mark.asyncio
+async def test_scheduler_stream_no_retry_after_first_item():
+    scheduler = ChatScheduler(max_retries=2, base_delay=0.01)
+
+    async def make_stream():
+        yield "Hello"
+        raise RateLimitError({})
+
+    actual_result = []
+    with pytest.raises(RateLimitError):
+        async for content in scheduler.stream(make_stream):
+            actual_result.append(content)
+    assert actual_result == ["Hello"]
+
+
+def test_scheduler_for_provider():
+    ChatScheduler.reset_instance()
+    scheduler = ChatScheduler.for_provider("openai", requests_per_minute=100)
+    request_bucket = scheduler.request_bucket
+
+    assert ChatScheduler.for_provider("openai", requests_per_minute=100) is scheduler
+    assert scheduler.request_bucket is request_bucket
+    assert ChatScheduler.for_provider("groq") is not scheduler
+
+    # Only the limits that are passed change
+    ChatScheduler.for_provider("openai", max_in_flight=3, max_retries=1)
+    assert scheduler.request_bucket is request_bucket
+    assert scheduler.max_in_flight == 3
+    ChatScheduler.for_provider("openai", requests_per_minute=200)
+    assert scheduler.request_bucket.capacity == 200
+    assert scheduler.max_retries == 1
+    ChatScheduler.reset_instance()
+
+
+def test_scheduler_estimate_tokens():
+    messages = [
+        {"role": "system", "content": None},
+        {"role": "user", "content": "x" * 400},
+    ]
+    # The completion is reserved up to EXPECTED_OUTPUT_TOKENS, not the full max_tokens
+    assert estimate_tokens(messages, "1000") == 100 + EXPECTED_OUTPUT_TOKENS
+    assert estimate_tokens(messages, 50) == 150
+    assert estimate_tokens(messages) == 100
+
+
+def test_scheduler_settle():
+    scheduler = ChatScheduler(tokens_per_minute=10000)
+    scheduler.token_bucket.tokens = 5000
+    scheduler.settle(600, 100)
+    assert scheduler.token_bucket.tokens == pytest.approx(5500, abs=5)
+    # Usage beyond the estimate is taken from the bucket
+    scheduler.settle(600, 2600)
+    assert scheduler.token_bucket.tokens == pytest.approx(3500, abs=5)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_stream_settles():
+    scheduler = ChatScheduler(tokens_per_minute=100000)
+
+    async def make_stream():
+        for content in ["x" * 200, "x" * 200]:
+            yield content
+
+    tokens = scheduler.token_bucket.tokens
+    actual_result = [
+        content async for content in scheduler.stream(make_stream, 1000, prompt_tokens=100)
+    ]
+    assert len(actual_result) == 2
+    # 1000 reserved, 100 prompt and 100 output tokens used
+    assert scheduler.token_bucket.tokens == pytest.approx(tokens - 200, abs=5)
+
+
+
+@pytest.mark.asyncio
+async def test_scheduler_run_releases_failed_attempts():
+    scheduler = ChatScheduler(tokens_per_minute=100000, max_retries=2, base_delay=0.01)
+    calls = []
+
+    async def make_call():
+        calls.append(1)
+        raise RateLimitError({"retry-after-ms": "10"})
+
+    tokens = scheduler.token_bucket.tokens
+    with pytest.raises(RateLimitError):
+        await scheduler.run(make_call, 1000)
+    # Three attempts reserved 1000 tokens each and every one was given back
+    assert len(calls) == 3
+    assert scheduler.token_bucket.tokens == pytest.approx(tokens, abs=5)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
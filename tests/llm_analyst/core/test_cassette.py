@@ -0,0 +1,115 @@
+""" Test Cases for Cassette """
+
+import json
+
+import pytest
+
+from llm_analyst.chat_models.fake import WORDS
+from llm_analyst.core import runtime_context
+from llm_analyst.core.cassette import Cassette
+from llm_analyst.core.config import Config
+from llm_analyst.core.exceptions import LLMAnalystsException
+from llm_analyst.core.research_analyst import LLMAnalyst
+
+RESEARCH_TOPIC = "The impact of microplastics on marine ecosystems"
+
+
+def get_config(cassette_file, cassette_mode, llm_provider):
+    config = Config()
+    config.set_values_for_config(
+        {
+            "llm_provider": llm_provider,
+            "llm_model": "fake-model",
+            "internet_search": "fake_search",
+            "embedding_provider": "hash",
+            "checkpoint_dir": "",
+            "cassette_file": cassette_file,
+            "cassette_mode": cassette_mode,
+            "cassette_replay_latency": "zero",
+        }
+    )
+    return config
+
+
+def fake_scrape_urls(urls):
+    return [
+        {"url": url, "raw_content": f"{RESEARCH_TOPIC}. {' '.join(WORDS)}. " * 20}
+        for url in urls
+        if not url.endswith(".pdf")
+    ]
+
+
+def failing_scrape_urls(urls):
+    raise AssertionError("A replayed run must not scrape")
+
+
+def test_cassette_search_replay(tmp_path):
+    cassette_file = str(tmp_path / "cassette.jsonl")
+    search_calls = []
+
+    def search(query, max_results=None):
+        search_calls.append(query)
+        return [{"href": f"https://example.com/{len(search_calls)}", "body": query}]
+
+    recorder = Cassette(cassette_file, "record")
+    first_results = recorder.search(search, "query", 5)
+    second_results = recorder.search(search, "query", 5)
+
+    player = Cassette(cassette_file, "replay")
+    assert player.search(search, "query", 5) == first_results
+    assert player.search(search, "query", 5) == second_results
+    # Once the recorded responses are used up the last one is served again
+    assert player.search(search, "query", 5) == second_results
+    assert len(search_calls) == 2
+
+    with pytest.raises(LLMAnalystsException):
+        player.search(search, "another query", 5)
+
+
+def test_cassette_search_many_replay(tmp_path):
+    cassette_file = str(tmp_path / "cassette.jsonl")
+
+    def search(query, max_results=None):
+        return [{"href": f"https://example.com/{query}", "body": query}]
+
+    recorder = Cassette(cassette_file, "record")
+    recorded_results = recorder.search_many(search, ["query 1", "query 2"], 5)
+
+    # Each query is recorded on its own, a replay may batch them differently
+    player = Cassette(cassette_file, "replay")
+    assert player.search_many(search, ["query 2", "query 1"], 5) == recorded_results[::-1]
+    assert player.search(search, "query 1", 5) == recorded_results[0]
+
+
+@pytest.mark.asyncio
+async def test_cassette_record_and_replay_run(monkeypatch, tmp_path):
+    cassette_file = str(tmp_path / "cassette.jsonl")
+
+    monkeypatch.setattr(runtime_context, "scrape_urls", fake_scrape_urls)
+    llm_analyst = LLMAnalyst(
+        active_research_topic=RESEARCH_TOPIC, config=get_config(cassette_file, "record", "fake")
+    )
+    await llm_analyst.conduct_research()
+    recorded_state = await llm_analyst.write_report()
+    assert RESEARCH_TOPIC in "".join(llm_analyst.research_findings)
+
+    with open(cassette_file, "r", encoding="utf-8") as file:
+        kinds = {json.loads(line)["kind"] for line in file}
+    assert kinds == {"search", "scrape", "chat"}
+
+    # The replay needs no scraper, search provider, chat model client or API key
+    monkeypatch.setattr(runtime_context, "scrape_urls", failing_scrape_urls)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    llm_analyst = LLMAnalyst(
+        active_research_topic=RESEARCH_TOPIC, config=get_config(cassette_file, "replay", "openai")
+    )
+    await llm_analyst.conduct_research()
+    replayed_state = await llm_analyst.write_report()
+
+    assert replayed_state.report_md == recorded_state.report_md
+    assert replayed_state.research_findings == recorded_state.research_findings
+    assert sorted(replayed_state.visited_urls) == sorted(recorded_state.visited_urls)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
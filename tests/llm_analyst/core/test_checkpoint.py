@@ -0,0 +1,159 @@
+""" Test Cases for RunCheckpoint """
+
+import json
+import os
+
+import pytest
+
+from llm_analyst.core.checkpoint import RunCheckpoint, resume
+from llm_analyst.core.config import Config, ReportType
+from llm_analyst.core.research_analyst import LLMAnalyst
+from llm_analyst.core.research_state import ResearchState
+from tests.utils_for_pytest import OUTPUT_PATH
+
+CONFIG_PARAMS = {
+    "llm_provider": "openai",
+    "llm_model": "gpt-3.5-turbo",
+    "speculative_research": False,
+    "checkpoint_dir": os.path.join(OUTPUT_PATH, "runs"),
+}
+
+CHAT_RESPONSES = {
+    "choose_agent_prompt": json.dumps({"agentType": "Test Agent", "agentRole": "Test role"}),
+    "search_queries_prompt": json.dumps(["sub query 1", "sub query 2"]),
+    "research_report_prompt": "# Test Report",
+}
+
+
+class FakeLLM:
+    def __init__(self, calls, prompt_nm, failing_prompts):
+        self.calls = calls
+        self.prompt_nm = prompt_nm
+        self.failing_prompts = failing_prompts
+
+    async def get_chat_response(self, system_prompt, user_prompt, prompt_nm=None):
+        self.calls.append(self.prompt_nm)
+        if self.prompt_nm in self.failing_prompts:
+            raise RuntimeError("Service unavailable")
+        return CHAT_RESPONSES[self.prompt_nm]
+
+
+def setup_fake_research(monkeypatch, failing_prompts):
+    calls = []
+
+    def get_llm_provider(self, prompt_nm):
+        return FakeLLM(calls, prompt_nm, failing_prompts)
+
+    async def search_by_queries(self, sub_queries):
+        return [[] for _ in sub_queries]
+
+    async def scrape_sites_by_query(self, sub_query, search_results=None):
+        calls.append(f"scrape {sub_query}")
+        new_urls = await self._keep_unique_urls([f"https://example.com/{sub_query}"])
+        return [{"url": url, "raw_content": sub_query} for url in new_urls]
+
+    async def get_similar_content_by_query(self, query, pages):
+        return f"Findings for {query}"
+
+    monkeypatch.setattr(LLMAnalyst, "get_llm_provider", get_llm_provider)
+    monkeypatch.setattr(LLMAnalyst, "_search_by_queries", search_by_queries)
+    monkeypatch.setattr(LLMAnalyst, "_scrape_sites_by_query", scrape_sites_by_query)
+    monkeypatch.setattr(LLMAnalyst, "_get_similar_content_by_query", get_similar_content_by_query)
+    return calls
+
+
+def test_checkpoint_save_and_load():
+    checkpoint = RunCheckpoint(os.path.join(OUTPUT_PATH, "runs", RunCheckpoint.new_run_id()))
+    checkpoint.save("findings", {"content": "findings 1"}, "topic", "sub query 1")
+
+    assert checkpoint.load("findings", "topic", "sub query 1") == {"content": "findings 1"}
+    assert checkpoint.load("findings", "topic", "sub query 2") is None
+    assert checkpoint.has("findings", "topic", "sub query 1")
+
+    research_state = ResearchState(
+        active_research_topic="topic", report_type=ReportType.SUBTOPIC_REPORT
+    )
+    checkpoint.save_state("subtopic_report", research_state, "topic")
+    loaded_state = checkpoint.load_state("subtopic_report", "topic")
+    assert loaded_state.report_type == ReportType.SUBTOPIC_REPORT
+    assert not [file_nm for file_nm in os.listdir(checkpoint.run_dir) if file_nm.endswith(".tmp")]
+
+
+def test_checkpoint_disabled():
+    # Checkpointing is opt-in
+    os.environ.pop("LLM_ANALYST_CONFIG", None)
+    assert Config().checkpoint_dir == ""
+
+    config = Config()
+    config.set_values_for_config({"checkpoint_dir": ""})
+    research_state = ResearchState(active_research_topic="topic")
+
+    assert RunCheckpoint.start_run(research_state, config, "conduct_research") is None
+    assert research_state.run_id is not None
+    assert RunCheckpoint.for_state(research_state, config) is None
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_resume_skips_completed_stages(monkeypatch):
+    calls = setup_fake_research(monkeypatch, failing_prompts={"research_report_prompt"})
+    config = Config()
+    config.set_values_for_config(CONFIG_PARAMS)
+
+    llm_analyst = LLMAnalyst(active_research_topic="Research topic", config=config)
+    await llm_analyst.conduct_research()
+    research_state = await llm_analyst.write_report()
+    assert research_state.report_md == ""
+    assert llm_analyst.run_id is not None
+
+    # The report failed, resuming only repeats write_report
+    resume_calls = setup_fake_research(monkeypatch, failing_prompts=set())
+    research_state = await resume(llm_analyst.run_id, config)
+
+    assert resume_calls == ["research_report_prompt"]
+    assert research_state.report_md == "# Test Report"
+    assert research_state.agent_type == "Test Agent"
+    assert len(llm_analyst.visited_urls) == 3
+    assert sorted(research_state.visited_urls) == sorted(llm_analyst.visited_urls)
+
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_resume_without_report(monkeypatch):
+    setup_fake_research(monkeypatch, failing_prompts=set())
+    config = Config()
+    config.set_values_for_config(CONFIG_PARAMS)
+
+    llm_analyst = LLMAnalyst(active_research_topic="Research topic", config=config)
+    await llm_analyst.conduct_research()
+
+    # write_report was never started, resuming does not write a report
+    resume_calls = setup_fake_research(monkeypatch, failing_prompts=set())
+    research_state = await resume(llm_analyst.run_id, config)
+    assert resume_calls == []
+    assert research_state.report_md == ""
+    assert research_state.research_findings == llm_analyst.research_findings
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_loaded_state_starts_new_run(monkeypatch):
+    setup_fake_research(monkeypatch, failing_prompts=set())
+    config = Config()
+    config.set_values_for_config(CONFIG_PARAMS)
+
+    llm_analyst = LLMAnalyst(active_research_topic="Research topic", config=config)
+    await llm_analyst.conduct_research()
+    state_file_nm = os.path.join(OUTPUT_PATH, "tst_checkpoint_loaded_state.json")
+    llm_analyst.dump(state_file_nm)
+
+    # A state loaded with the run_id researches again in a new run
+    loaded_state = ResearchState.load(state_file_nm)
+    new_calls = setup_fake_research(monkeypatch, failing_prompts=set())
+    new_analyst = LLMAnalyst(config=config, **loaded_state.dump())
+    await new_analyst.conduct_research()
+
+    assert new_analyst.run_id != llm_analyst.run_id
+    assert "search_queries_prompt" in new_calls
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -6,8 +6,10 @@ from langchain_openai import OpenAIEmbeddings
 from langchain_community.embeddings.ollama import OllamaEmbeddings
 
 from tests.utils_for_pytest import get_resource_file_path
+from llm_analyst.chat_models.groq import GROQ_Model
 from llm_analyst.chat_models.openai import OPENAI_Model
 from llm_analyst.core.config import Config
+from llm_analyst.core.exceptions import LLMAnalystsException
 
 
 def test_config_use_local_config():
@@ -63,7 +65,55 @@ def test_config_set_values_for_config():
     config.set_values_for_config(config_params)
     assert config.llm_model == config_params['llm_model']
     assert config.local_store_dir == config_params['local_store_dir']
-    
+
+
+def test_config_llm_prompt_routes():
+    """Per prompt overrides are resolved with the chat_models naming convention"""
+    config_params = {
+        "llm_model": "gpt-4o-2024-05-13",
+        "llm_prompt_routes": {
+            "choose_agent_prompt": {
+                "llm_provider": "groq",
+                "llm_model": "llama3-8b-8192",
+                "llm_token_limit": 500,
+            }
+        },
+    }
+    config = Config()
+    config.set_values_for_config(config_params)
+
+    actual_result = config.get_llm_settings("choose_agent_prompt")
+    assert actual_result["llm_provider"] == GROQ_Model
+    assert actual_result["llm_model"] == "llama3-8b-8192"
+    assert actual_result["llm_token_limit"] == 500
+    assert actual_result["llm_temperature"] == config.llm_temperature
+
+    actual_result = config.get_llm_settings("research_report_prompt")
+    assert actual_result["llm_provider"] == OPENAI_Model
+    assert actual_result["llm_model"] == "gpt-4o-2024-05-13"
+
+
+def test_config_llm_prompt_routes_from_env(monkeypatch):
+    monkeypatch.setenv(
+        "LLM_PROMPT_ROUTES", '{"search_queries_prompt": {"llm_model": "gpt-4o-mini"}}'
+    )
+    config = Config()
+    assert config.get_llm_settings("search_queries_prompt")["llm_model"] == "gpt-4o-mini"
+
+
+
+def test_config_speculative_research(monkeypatch):
+    assert Config().speculative_research is False
+
+    monkeypatch.setenv("SPECULATIVE_RESEARCH", "True")
+    assert Config().speculative_research is True
+
+    config = Config()
+    config.set_values_for_config({"speculative_research": "0"})
+    assert config.speculative_research is False
+    with pytest.raises(LLMAnalystsException):
+        config.set_values_for_config({"speculative_research": "maybe"})
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
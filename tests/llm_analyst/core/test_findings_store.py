@@ -0,0 +1,74 @@
+""" Test Cases for FindingsStore """
+
+import gc
+import os
+
+import pytest
+
+from llm_analyst.core.exceptions import LLMAnalystsException
+from llm_analyst.core.findings_store import ChunkRefs, FindingsStore
+from tests.utils_for_pytest import OUTPUT_PATH
+
+
+@pytest.mark.parametrize("compression", ["zstd", "none"])
+def test_findings_store_put_and_get(compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    findings_store = FindingsStore(compression=compression)
+    text = "Research findings " * 1000
+
+    chunk_id = findings_store.put(text)
+    assert findings_store.put(text) == chunk_id
+    assert findings_store.get(chunk_id) == text
+    stored_size = len(findings_store._chunks[chunk_id][1])
+    if compression == "zstd":
+        assert stored_size < len(text) / 10
+    else:
+        assert stored_size == len(text)
+
+
+def test_findings_store_refs():
+    findings_store = FindingsStore()
+    chunk_refs = findings_store.put_refs(["Finding 1", "Finding 2", "Finding 1"])
+
+    assert len(set(chunk_refs.chunk_ids)) == 2
+    assert findings_store.get_value(chunk_refs) == ["Finding 1", "Finding 2", "Finding 1"]
+    assert findings_store.get_value(findings_store.put_refs("Finding")) == "Finding"
+    assert findings_store.put_refs([{"not": "text"}]) is None
+    assert ChunkRefs.from_json(chunk_refs.to_json()) == chunk_refs
+
+
+def test_findings_store_chunk_dir():
+    """A new process finds the chunks in the chunk directory of the dumped file"""
+    chunk_dir = os.path.join(OUTPUT_PATH, "chunks")
+    findings_store = FindingsStore()
+    chunk_id = findings_store.put("Saved finding")
+    findings_store.save_chunks([chunk_id], chunk_dir)
+
+    new_findings_store = FindingsStore()
+    with pytest.raises(LLMAnalystsException):
+        new_findings_store.get(chunk_id)
+    new_findings_store.add_chunk_dir(chunk_dir)
+    assert new_findings_store.get(chunk_id) == "Saved finding"
+
+
+def test_findings_store_releases_chunks():
+    findings_store = FindingsStore()
+    chunk_refs = findings_store.put_refs(["Finding 1", "Finding 2"])
+    other_refs = findings_store.put_refs(["Finding 2"])
+    chunk_id_1 = chunk_refs.chunk_ids[0]
+
+    # Finding 2 is still referred to by other_refs
+    del chunk_refs
+    gc.collect()
+    assert chunk_id_1 not in findings_store._chunks
+    assert findings_store.get_value(other_refs) == ["Finding 2"]
+
+    del other_refs
+    gc.collect()
+    assert findings_store._chunks == {}
+    assert findings_store._ref_counts == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,76 @@
+""" Test Cases for ReportAssembler """
+
+import inspect
+
+import markdown
+import pytest
+
+from llm_analyst.core.report_assembler import ReportAssembler, scan_markdown_headers
+from llm_analyst.core.research_state import ResearchState
+from tests.utils_for_pytest import dump_test_results, get_resource_file_path
+
+
+def render_headers(markdown_text):
+    """Headers as found by rendering the markdown to HTML"""
+    headers = []
+    for line in markdown.markdown(markdown_text).split("\n"):
+        if line.startswith("<h") and line[2].isdigit():
+            headers.append({"level": int(line[2]), "text": line[line.index(">") + 1 : line.rindex("<")]})
+    return headers
+
+
+def test_report_assembler_scan_matches_render():
+    test_json_file_path = get_resource_file_path("tst_research_state_5.json")
+    research_state = ResearchState.load(test_json_file_path)
+
+    actual_result = scan_markdown_headers(research_state.final_report_md)
+    expected_result = render_headers(research_state.final_report_md)
+    assert actual_result == expected_result
+
+
+def test_report_assembler_scan_markdown_headers():
+    markdown_text = "\n".join(
+        [
+            "#Title",
+            "Setext Heading",
+            "==============",
+            "text",
+            "```python",
+            "# not a heading",
+            "```",
+            "## Closed heading ##",
+            "Sub heading",
+            "---",
+            "    # indented code",
+        ]
+    )
+    actual_result = scan_markdown_headers(markdown_text)
+    assert actual_result == [
+        {"level": 1, "text": "Title"},
+        {"level": 1, "text": "Setext Heading"},
+        {"level": 2, "text": "Closed heading"},
+        {"level": 2, "text": "Sub heading"},
+    ]
+
+
+def test_report_assembler_add_section():
+    function_name = inspect.currentframe().f_code.co_name
+    report_assembler = ReportAssembler()
+    report_assembler.add_section("# Subtopic 1\n\n## Part A\n\ntext")
+    report_assembler.add_section("# Subtopic 2\n\n### Detail\n\ntext")
+
+    assert report_assembler.report_md == (
+        "\n\n\n# Subtopic 1\n\n## Part A\n\ntext\n\n\n# Subtopic 2\n\n### Detail\n\ntext"
+    )
+    assert report_assembler.header_texts() == ["Subtopic 1", "Part A", "Subtopic 2", "Detail"]
+
+    toc = report_assembler.table_of_contents()
+    assert toc == (
+        "## Table of Contents\n\n"
+        "- Subtopic 1\n    - Part A\n- Subtopic 2\n    - Detail\n"
+    )
+    dump_test_results(function_name, toc, to_json=False)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
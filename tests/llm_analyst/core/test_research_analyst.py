@@ -1,5 +1,6 @@
 """ Test Cases for LLMAnalyst """
 
+import asyncio
 import inspect
 import json
 
@@ -106,6 +107,11 @@ async def test_analyst_keep_unique_urls():
     assert len(actual_result) == 1, f"Expected 1 found {len(actual_result)}"
     dump_test_results(function_name, actual_result)
 
+    # The same pages under another URL are not new
+    variant_urls = ["http://apnews.com/article/NEW_ARTICLE/?utm_source=feed", "https://new.com"]
+    assert await llm_analyst._keep_unique_urls(variant_urls) == ["https://new.com"]
+    assert list(llm_analyst.visited_urls)[-2:] == [actual_result[0], "https://new.com"]
+
 
 @pytest.mark.asyncio
 async def test_analyst_get_similar_content_by_query():
@@ -123,6 +129,154 @@ async def test_analyst_get_similar_content_by_query():
     dump_test_results(function_name, actual_result, to_json=False)
 
 
+@pytest.mark.asyncio
+async def test_analyst_speculative_internet_search():
+    """The topic is researched while the agent and sub-queries are chosen"""
+    llm_analyst, research_state = setup_research_state("tst_research_state_1")
+    llm_analyst.cfg.set_values_for_config({"speculative_research": True})
+    llm_analyst.agent_type = None
+    events = []
+
+    async def choose_agent():
+        events.append("choose_agent start")
+        await asyncio.sleep(0.05)
+        llm_analyst.agent_type = "Agent"
+        events.append("choose_agent end")
+
+    async def get_sub_queries():
+        return ["sub query 1", llm_analyst.active_research_topic]
+
+    async def search_by_queries(sub_queries):
+        events.append(f"search {sub_queries}")
+        return [[] for _ in sub_queries]
+
+    async def process_internet_query(sub_query, search_results=None):
+        events.append(f"research {sub_query}")
+        return sub_query
+
+    llm_analyst.choose_agent = choose_agent
+    llm_analyst._get_sub_queries = get_sub_queries
+    llm_analyst._search_by_queries = search_by_queries
+    llm_analyst._process_internet_query = process_internet_query
+
+    actual_result = await llm_analyst.conduct_research()
+    topic_event = f"research {llm_analyst.active_research_topic}"
+    assert events.index(topic_event) < events.index("choose_agent end")
+    # The topic is searched on its own, the other sub-queries in one request
+    assert events.count("search ['sub query 1']") == 1
+    assert actual_result.research_findings == [
+        "sub query 1",
+        llm_analyst.active_research_topic,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_analyst_planned_scrapes():
+    """The URLs of all the sub-queries are ranked together and scraped within the budget"""
+    llm_analyst, research_state = setup_research_state("tst_research_state_1")
+    llm_analyst.cfg.set_values_for_config({"scrape_budget_pages": 3, "checkpoint_dir": ""})
+    llm_analyst.agent_type = "Agent"
+    llm_analyst.visited_urls = ["https://visited.com"]
+    scraped_urls = []
+
+    async def get_sub_queries():
+        return ["sub query 1", "sub query 2"]
+
+    async def search_by_queries(sub_queries):
+        urls_by_query = {
+            "sub query 1": ["https://a.com", "https://shared.com", "https://b.com"],
+            "sub query 2": ["https://shared.com/", "https://visited.com", "https://c.com"],
+        }
+        return [
+            [
+                {"href": url, "body": sub_query}
+                for url in urls_by_query.get(sub_query, ["https://topic.com"])
+            ]
+            for sub_query in sub_queries
+        ]
+
+    def scrape_urls(urls):
+        scraped_urls.extend(urls)
+        return [{"url": url, "raw_content": f"content of {url}"} for url in urls]
+
+    async def get_similar_content_by_query(sub_query, pages):
+        return [page["url"] for page in pages]
+
+    llm_analyst._get_sub_queries = get_sub_queries
+    llm_analyst._search_by_queries = search_by_queries
+    llm_analyst.context.scrape_urls = scrape_urls
+    llm_analyst._get_similar_content_by_query = get_similar_content_by_query
+
+    actual_result = await llm_analyst.conduct_research()
+    assert scraped_urls == ["https://shared.com", "https://a.com", "https://topic.com"]
+    assert actual_result.research_findings == [
+        ["https://shared.com", "https://a.com"],
+        ["https://shared.com"],
+        ["https://topic.com"],
+    ]
+    assert actual_result.visited_urls == ["https://visited.com"] + scraped_urls
+
+
+@pytest.mark.asyncio
+async def test_analyst_snippet_first_scrape():
+    """Only the URLs whose snippet is relevant are scraped, the others give their snippet"""
+    llm_analyst, research_state = setup_research_state("tst_research_state_1")
+    llm_analyst.cfg.set_values_for_config({"embedding_provider": "hash", "snippet_threshold": 0.3})
+    llm_analyst.visited_urls = []
+    sub_query = "microplastics in marine ecosystems"
+    scraped_urls = []
+
+    async def search_by_query(query):
+        return [
+            {"href": "https://relevant.com", "body": "Microplastics harm marine ecosystems"},
+            {"href": "https://unrelated.com", "body": "Ten easy weeknight pasta recipes"},
+        ]
+
+    def scrape_urls(urls):
+        scraped_urls.extend(urls)
+        return [{"url": url, "raw_content": f"content of {url}"} for url in urls]
+
+    llm_analyst._search_by_query = search_by_query
+    llm_analyst.context.scrape_urls = scrape_urls
+
+    actual_result = await llm_analyst._scrape_sites_by_query(sub_query)
+    assert scraped_urls == ["https://relevant.com"]
+    assert [page["raw_content"] for page in actual_result] == [
+        "content of https://relevant.com",
+        "Ten easy weeknight pasta recipes",
+    ]
+    assert llm_analyst.visited_urls == ["https://relevant.com", "https://unrelated.com"]
+
+
+@pytest.mark.asyncio
+async def test_analyst_search_provided_content():
+    """Pages whose content came with the search results are not scraped again"""
+    llm_analyst, research_state = setup_research_state("tst_research_state_1")
+    llm_analyst.visited_urls = []
+    scraped_urls = []
+
+    async def search_by_query(query):
+        return [
+            {"href": "https://provided.com", "body": "snippet", "raw_content": "page text " * 20},
+            {"href": "https://scraped.com", "body": "snippet"},
+        ]
+
+    def scrape_urls(urls):
+        scraped_urls.extend(urls)
+        return [{"url": url, "raw_content": f"content of {url}"} for url in urls]
+
+    llm_analyst._search_by_query = search_by_query
+    llm_analyst.context.scrape_urls = scrape_urls
+
+    actual_result = await llm_analyst._scrape_sites_by_query("sub query")
+    assert scraped_urls == ["https://scraped.com"]
+    assert sorted(page["url"] for page in actual_result) == [
+        "https://provided.com",
+        "https://scraped.com",
+    ]
+    assert llm_analyst.visited_urls == ["https://provided.com", "https://scraped.com"]
+
+
 # @pytest.mark.asyncio
 # async def test_analyst_conduct_research():
 #     function_name = inspect.currentframe().f_code.co_name
@@ -2,6 +2,7 @@
 
 import inspect
 import logging
+import os
 from tests.utils_for_pytest import (
     dump_test_results,
     get_resource_file_path,
@@ -12,6 +13,7 @@ import pytest
 from llm_analyst.core.research_publisher import LLMPublisher
 from llm_analyst.core.research_state import ResearchState
 from llm_analyst.core.config import Config
+from llm_analyst.core.exceptions import LLMAnalystsException
 
 logger = logging.getLogger(__name__)
 
@@ -58,6 +60,86 @@ async def test_publisher_publish_to_word_file():
     report_intro = await llm_publisher.publish_to_word_file()
     dump_test_results(function_name, report_intro, to_json=False)
 
+@pytest.mark.asyncio
+async def test_publisher_publish_stream_to_md_file():
+    function_name = inspect.currentframe().f_code.co_name
+    llm_publisher, research_state = setup_research_state("tst_research_state_5")
+
+    async def report_stream():
+        for line in research_state.report_md.splitlines(keepends=True):
+            yield line
+
+    pushed = []
+
+    async def on_content(content):
+        pushed.append(content)
+
+    file_path = await llm_publisher.publish_stream_to_md_file(report_stream(), on_content)
+    with open(f"{file_path}.md", "r", encoding="utf-8") as file:
+        assert file.read() == research_state.report_md
+    assert "".join(pushed) == research_state.report_md
+    dump_test_results(function_name, file_path, to_json=False)
+
+@pytest.mark.asyncio
+async def test_publisher_publish_all():
+    function_name = inspect.currentframe().f_code.co_name
+    llm_publisher, research_state = setup_research_state("tst_research_state_5")
+    file_paths = await llm_publisher.publish_all(formats=["md", "docx"])
+
+    assert file_paths["md"].removesuffix(".md") == file_paths["docx"].removesuffix(".docx")
+    with open(file_paths["md"], "r", encoding="utf-8") as file:
+        assert file.read() == research_state.final_report_md
+    assert os.path.getsize(file_paths["docx"]) > 0
+    dump_test_results(function_name, file_paths, to_json=True)
+
+
+@pytest.mark.asyncio
+async def test_publisher_publish_all_unknown_format():
+    llm_publisher, _ = setup_research_state("tst_research_state_5")
+    with pytest.raises(LLMAnalystsException):
+        await llm_publisher.publish_all(formats=["md", "html"])
+
+
+@pytest.mark.asyncio
+async def test_publisher_publish_all_render_cache():
+    llm_publisher, _ = setup_research_state("tst_research_state_5")
+    llm_publisher.cfg.cache_dir = os.path.join(OUTPUT_PATH, "cache")
+    llm_publisher.final_report_md += "\n\nRender cache test"
+    cache_path = llm_publisher._get_render_cache_path(
+        llm_publisher._get_report_to_publish(), "docx"
+    )
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+
+    first_paths = await llm_publisher.publish_all(formats=["docx"])
+    assert os.path.exists(cache_path)
+    second_paths = await llm_publisher.publish_all(formats=["docx"])
+
+    assert first_paths["docx"] != second_paths["docx"]
+    with open(first_paths["docx"], "rb") as first, open(second_paths["docx"], "rb") as second:
+        assert first.read() == second.read()
+
+
+@pytest.mark.asyncio
+async def test_publisher_publish_batch():
+    function_name = inspect.currentframe().f_code.co_name
+    config = Config()
+    config.set_values_for_config(CONFIG_PARAMS)
+    research_state_file_nms = [
+        get_resource_file_path("tst_research_state_5.json"),
+        get_resource_file_path("tst_research_state_5.json"),
+        "does_not_exist.json",
+    ]
+    batch_file_paths = await LLMPublisher.publish_batch(
+        research_state_file_nms, formats=["md"], config=config
+    )
+
+    assert len(batch_file_paths) == 3
+    assert batch_file_paths[0]["md"] != batch_file_paths[1]["md"]
+    assert batch_file_paths[2] == {}
+    dump_test_results(function_name, batch_file_paths, to_json=True)
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
     
\ No newline at end of file
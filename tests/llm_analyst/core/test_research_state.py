@@ -2,7 +2,10 @@
 
 import pytest
 
-from tests.utils_for_pytest import get_resource_file_path
+import json
+import os
+
+from tests.utils_for_pytest import EnumEncoder, get_resource_file_path, OUTPUT_PATH
 from llm_analyst.core.research_state import ResearchState
 from llm_analyst.core.config import ReportType, DataSource
 
@@ -60,7 +63,9 @@ def test_research_state_dump_and_load():
     """Test dump and load ensure that data remain consistent"""
     test_research_state = setup_research_state()
 
-    test_json_file_path = get_resource_file_path("tst_research_state_2.json")
+    # dump also writes the findings chunks next to the file, keep them out of the resources
+    os.makedirs(OUTPUT_PATH, exist_ok=True)
+    test_json_file_path = os.path.join(OUTPUT_PATH, "tst_research_state_2.json")
     test_research_state.dump(test_json_file_path)
 
     loaded_research_state = ResearchState.load(test_json_file_path)
@@ -73,7 +78,8 @@ def test_research_state_dump_and_load_minimal():
     test_research_state = ResearchState(
         active_research_topic="This is the active topic"
     )
-    test_json_file_path = get_resource_file_path("tst_research_state_3.json")
+    os.makedirs(OUTPUT_PATH, exist_ok=True)
+    test_json_file_path = os.path.join(OUTPUT_PATH, "tst_research_state_3.json")
     test_research_state.dump(test_json_file_path)
 
     loaded_research_state = ResearchState.load(test_json_file_path)
@@ -88,5 +94,100 @@ def test_research_state_copy_research_state():
     assert_all_attributes(test_research_state, copy_of_research_state)
 
 
+def test_research_state_copy_is_independent():
+    research_state = ResearchState(
+        active_research_topic="topic",
+        visited_urls=["https://a.com"],
+        research_findings=["finding 1"],
+        report_headings=["heading 1"],
+    )
+    copy_of_research_state = research_state.copy_state()
+    assert copy_of_research_state.get_findings_refs("research_findings") is not (
+        research_state.get_findings_refs("research_findings")
+    )
+
+    copy_of_research_state.visited_urls.add("https://b.com")
+    copy_of_research_state.research_findings = ["finding 2"]
+    copy_of_research_state.report_headings.append("heading 2")
+
+    assert research_state.visited_urls == ["https://a.com"]
+    assert research_state.research_findings == ["finding 1"]
+    assert research_state.report_headings == ["heading 1"]
+    assert copy_of_research_state.visited_urls == ["https://a.com", "https://b.com"]
+
+
+def test_research_state_findings_as_chunk_refs():
+    """Findings are dumped as chunk ids, identical findings are stored once"""
+    research_state = ResearchState.load(get_resource_file_path("tst_research_state_5.json"))
+    research_state.initial_findings = research_state.research_findings
+    os.makedirs(OUTPUT_PATH, exist_ok=True)
+    test_json_file_path = os.path.join(OUTPUT_PATH, "tst_research_state_chunks.json")
+    research_state.dump(test_json_file_path)
+
+    with open(test_json_file_path, "r", encoding="utf-8") as file:
+        research_state_json = json.load(file)
+    chunk_ids = research_state_json["research_findings"]["__chunks__"]
+    assert research_state_json["initial_findings"]["__chunks__"] == chunk_ids
+    chunk_file_nms = os.listdir(os.path.join(OUTPUT_PATH, "chunks"))
+    assert all(
+        any(file_nm.startswith(chunk_id) for file_nm in chunk_file_nms) for chunk_id in chunk_ids
+    )
+
+    loaded_research_state = ResearchState.load(test_json_file_path)
+    assert loaded_research_state.research_findings == research_state.research_findings
+    copy_of_research_state = ResearchState(**research_state.dump())
+    assert copy_of_research_state.initial_findings == research_state.initial_findings
+
+    # dump() is plain JSON data, dump_refs() passes the ChunkRefs on
+    research_state_json = research_state.dump()
+    assert json.loads(json.dumps(research_state_json["research_findings"])) == (
+        research_state.research_findings
+    )
+    research_state_refs = research_state.dump_refs()
+    assert research_state_refs["research_findings"] == research_state.get_findings_refs(
+        "research_findings"
+    )
+    assert ResearchState(**research_state_refs).research_findings == research_state.research_findings
+
+
+def test_research_state_text_findings():
+    """SELECT_URLS research produces a single findings string"""
+    research_state = ResearchState(research_findings="Findings text", initial_findings=None)
+    copy_of_research_state = ResearchState(**research_state.dump())
+
+    assert copy_of_research_state.research_findings == "Findings text"
+    assert copy_of_research_state.initial_findings is None
+
+
+def test_research_state_visited_urls():
+    research_state = ResearchState(
+        visited_urls=["https://www.b.com/page/", "http://a.com", "https://b.com/page#top"]
+    )
+    assert research_state.visited_urls == ["https://www.b.com/page/", "http://a.com"]
+    assert "https://a.com/?utm_source=feed" in research_state.visited_urls
+
+    test_json_file_path = os.path.join(OUTPUT_PATH, "tst_research_state_visited_urls.json")
+    research_state.dump(test_json_file_path)
+    with open(test_json_file_path, "r", encoding="utf-8") as file:
+        assert json.load(file)["visited_urls"] == ["https://www.b.com/page/", "http://a.com"]
+
+    loaded_research_state = ResearchState.load(test_json_file_path)
+    assert loaded_research_state.visited_urls == research_state.visited_urls
+    assert "https://b.com/page" in loaded_research_state.visited_urls
+
+    # dump() is plain JSON data, a state created from dump_refs() shares the visited URLs
+    research_state_json = json.loads(json.dumps(research_state.dump(), cls=EnumEncoder))
+    assert research_state_json["visited_urls"] == [
+        "https://www.b.com/page/",
+        "http://a.com",
+    ]
+    copy_of_research_state = ResearchState(**research_state.dump())
+    copy_of_research_state.visited_urls.add("https://c.com")
+    assert "https://c.com" not in research_state.visited_urls
+    shared_research_state = ResearchState(**research_state.dump_refs())
+    shared_research_state.visited_urls.add("https://c.com")
+    assert "https://c.com" in research_state.visited_urls
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,118 @@
+""" Test Cases for RuntimeContext """
+
+import pytest
+
+from llm_analyst.chat_models.groq import GROQ_Model
+from llm_analyst.chat_models.openai import OPENAI_Model
+from llm_analyst.chat_models.scheduler import ChatScheduler
+from llm_analyst.core.config import Config
+from llm_analyst.core.research_analyst import LLMAnalyst
+from llm_analyst.core.research_publisher import LLMPublisher
+from llm_analyst.core.research_writer import LLMWriter
+from llm_analyst.core.runtime_context import RuntimeContext
+from llm_analyst.utils import metrics
+
+CONFIG_PARAMS = {
+    "llm_provider": "openai",
+    "llm_model": "gpt-3.5-turbo",
+    "llm_temperature": 0,
+}
+
+
+def setup_context():
+    RuntimeContext.reset_instance()
+    config = Config()
+    config.set_values_for_config(CONFIG_PARAMS)
+    return RuntimeContext.for_config(config)
+
+
+def test_runtime_context_for_config():
+    """The same Config always maps to the same context"""
+    context = setup_context()
+    assert RuntimeContext.for_config(context.cfg) is context
+    assert RuntimeContext.for_config(Config()) is not context
+
+
+def test_runtime_context_pooled_llm_client():
+    """One client per provider/model, created on first use"""
+    context = setup_context()
+    assert not context._llm_clients
+
+    llm_client = context.get_llm_client()
+    assert context.get_llm_client() is llm_client
+    assert context.get_llm_client(llm_model="gpt-4o-2024-05-13") is not llm_client
+    assert len(context._llm_clients) == 2
+
+
+def test_runtime_context_prompt_routing():
+    context = setup_context()
+    context.cfg.set_values_for_config(
+        {"llm_prompt_routes": {"choose_agent_prompt": {"llm_model": "gpt-4o-mini"}}}
+    )
+    llm_analyst = LLMAnalyst(context=context, active_research_topic="topic")
+
+    routed_client = llm_analyst.get_llm_provider("choose_agent_prompt")
+    assert routed_client.model == "gpt-4o-mini"
+    assert llm_analyst.get_llm_provider("research_report_prompt") is llm_analyst.llm_provider
+
+
+def test_runtime_context_provider_limits():
+    ChatScheduler.reset_instance()
+    context = setup_context()
+    context.cfg.set_values_for_config(
+        {
+            "llm_tokens_per_minute": 30000,
+            "llm_provider_limits": '{"groq": {"tokens_per_minute": 6000, "max_in_flight": 2}}',
+        }
+    )
+
+    groq_scheduler = context.get_scheduler(GROQ_Model)
+    assert groq_scheduler.token_bucket.capacity == 6000
+    assert groq_scheduler.max_in_flight == 2
+    assert context.get_scheduler(OPENAI_Model).token_bucket.capacity == 30000
+    ChatScheduler.reset_instance()
+
+
+def test_runtime_context_shared_by_roles():
+    """Roles created from the same config borrow the same client"""
+    context = setup_context()
+    llm_analyst = LLMAnalyst(config=context.cfg, active_research_topic="topic")
+    llm_writer = LLMWriter(context=context, active_research_topic="topic")
+
+    assert llm_analyst.context is context
+    assert llm_analyst.llm_provider is llm_writer.llm_provider
+
+
+def test_runtime_context_publisher_has_no_llm_client():
+    context = setup_context()
+    LLMPublisher(context=context, active_research_topic="topic")
+    assert not context._llm_clients
+
+
+def test_runtime_context_lazy_embedding_provider():
+    config = Config()
+    assert config._embedding_provider is None
+    assert config.embedding_provider is not None
+    assert config.embedding_provider is config.embedding_provider
+
+
+
+def test_runtime_context_start_exporters():
+    RuntimeContext.reset_instance()
+    metrics.stop_metrics_server()
+    config = Config()
+    config.set_values_for_config({"metrics_port": "0"})
+    context = RuntimeContext.for_config(config)
+    # Creating the context binds no port
+    assert metrics._metrics_server is None
+
+    try:
+        metrics_server = context.start_exporters()
+        assert metrics_server is metrics._metrics_server
+        assert metrics_server.server_address[1] > 0
+    finally:
+        metrics.stop_metrics_server()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,100 @@
+""" Test Cases for ScrapePlanner """
+
+import pytest
+
+from llm_analyst.core.scrape_planner import ScrapePlanner
+
+
+def get_results(*urls):
+    return [{"href": url, "body": f"snippet of {url}"} for url in urls]
+
+
+def test_plan_ranks_across_queries():
+    search_results_by_query = [
+        ("query 1", get_results("https://a.com", "https://b.com", "https://c.com")),
+        ("query 2", get_results("https://c.com/", "https://d.com", "https://visited.com")),
+    ]
+    planned_urls = ScrapePlanner().plan(search_results_by_query, ["https://visited.com#intro"])
+
+    # c.com is found by both queries, 1/3 + 1/1
+    assert [planned_url["url"] for planned_url in planned_urls] == [
+        "https://c.com",
+        "https://a.com",
+        "https://b.com",
+        "https://d.com",
+    ]
+    assert planned_urls[0]["sub_queries"] == ["query 1", "query 2"]
+    assert planned_urls[0]["score"] == pytest.approx(1 + 1 / 3)
+
+
+def test_plan_page_budget():
+    search_results_by_query = [
+        ("query 1", get_results("https://a.com", "https://b.com")),
+        ("query 2", get_results("https://c.com", "https://d.com")),
+    ]
+    planned_urls = ScrapePlanner(max_pages=2).plan(search_results_by_query)
+
+    # The first result of every query comes before the second result of any
+    assert [planned_url["url"] for planned_url in planned_urls] == [
+        "https://a.com",
+        "https://c.com",
+    ]
+
+
+def test_scrape_byte_budget(monkeypatch):
+    monkeypatch.setattr("llm_analyst.core.scrape_planner.SCRAPE_BATCH_SIZE", 2)
+    scraped_batches = []
+
+    def scrape_urls(urls):
+        scraped_batches.append(urls)
+        return [{"url": url, "raw_content": "x" * 100} for url in urls]
+
+    search_results_by_query = [
+        ("query 1", get_results(*[f"https://{index}.com" for index in range(6)])),
+        ("query 2", get_results("https://0.com")),
+    ]
+    scrape_planner = ScrapePlanner(max_bytes=250)
+    planned_urls = scrape_planner.plan(search_results_by_query)
+    sites_by_query, scraped_urls = scrape_planner.scrape(planned_urls, scrape_urls)
+
+    # One more page uses the 50 bytes left, so the second batch shrinks to it
+    assert scraped_batches == [["https://0.com", "https://1.com"], ["https://2.com"]]
+    assert scraped_urls == ["https://0.com", "https://1.com", "https://2.com"]
+    assert [len(site["raw_content"]) for site in sites_by_query["query 1"]] == [100, 100, 50]
+    assert [site["url"] for site in sites_by_query["query 2"]] == ["https://0.com"]
+
+
+def test_scrape_byte_budget_counts_bytes(monkeypatch):
+    monkeypatch.setattr("llm_analyst.core.scrape_planner.SCRAPE_BATCH_SIZE", 3)
+
+    def scrape_urls(urls):
+        # 60 characters, 120 bytes in UTF-8
+        return [{"url": url, "raw_content": "é" * 60} for url in urls]
+
+    search_results_by_query = [("query 1", get_results("https://a.com", "https://b.com", "https://c.com"))]
+    scrape_planner = ScrapePlanner(max_bytes=150)
+    planned_urls = scrape_planner.plan(search_results_by_query)
+    sites_by_query, scraped_urls = scrape_planner.scrape(planned_urls, scrape_urls)
+
+    # The second page is cut at the budget, the third is dropped and stays unvisited
+    assert scraped_urls == ["https://a.com", "https://b.com"]
+    assert [site["raw_content"] for site in sites_by_query["query 1"]] == ["é" * 60, "é" * 15]
+
+
+def test_plan_canonical_urls():
+    search_results_by_query = [
+        ("query 1", get_results("http://www.a.com/", "https://b.com")),
+        ("query 2", get_results("https://a.com", "http://visited.com")),
+    ]
+    planned_urls = ScrapePlanner().plan(search_results_by_query, ["https://www.visited.com"])
+
+    # http and https, with and without www. are the same page
+    assert [planned_url["url"] for planned_url in planned_urls] == [
+        "http://www.a.com/",
+        "https://b.com",
+    ]
+    assert planned_urls[0]["sub_queries"] == ["query 1", "query 2"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
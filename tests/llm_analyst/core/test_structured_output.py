@@ -0,0 +1,82 @@
+""" Test Cases for structured_output """
+
+import json
+
+import pytest
+
+from llm_analyst.core.structured_output import (
+    extract_json,
+    is_list_of_strings,
+    parse_json_response,
+    strip_markdown_fences,
+)
+from tests.utils_for_pytest import get_resource_file_path
+
+EXPECTED_TYPES = {"list": list, "dict": dict}
+
+
+def load_llm_outputs():
+    file_path = get_resource_file_path("tst_llm_json_outputs.json")
+    with open(file_path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+@pytest.mark.parametrize("llm_output", load_llm_outputs(), ids=lambda output: output["name"])
+def test_structured_output_extract_json(llm_output):
+    expected_type = EXPECTED_TYPES[llm_output["expected_type"]]
+    validate = is_list_of_strings if expected_type is list else None
+    actual_result = extract_json(llm_output["response"], expected_type, validate=validate)
+    assert actual_result == llm_output["expected"]
+
+
+def test_structured_output_strip_markdown_fences():
+    assert strip_markdown_fences('```json\n["a"]\n```') == '["a"]'
+    assert strip_markdown_fences('["a"]') == '["a"]'
+
+
+def test_structured_output_linear_scan():
+    """A long response with many non JSON brackets is still handled quickly"""
+    response = "[x] " * 50000 + '["query"]'
+    assert extract_json(response, list, validate=is_list_of_strings) == ["query"]
+
+
+class RepairLLM:
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+
+    async def get_chat_response(self, llm_system_prompt, llm_user_prompt, prompt_nm=None):
+        self.calls += 1
+        return self.response
+
+
+@pytest.mark.asyncio
+async def test_structured_output_repair_once():
+    llm_provider = RepairLLM('["repaired query"]')
+    actual_result = await parse_json_response(
+        "query one; query two", list, [], llm_provider=llm_provider
+    )
+    assert actual_result == ["repaired query"]
+    assert llm_provider.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_structured_output_repair_fails_to_default():
+    llm_provider = RepairLLM("still not json")
+    actual_result = await parse_json_response(
+        "query one; query two", list, ["default"], llm_provider=llm_provider
+    )
+    assert actual_result == ["default"]
+    assert llm_provider.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_structured_output_no_repair_when_valid():
+    llm_provider = RepairLLM("[]")
+    actual_result = await parse_json_response('["query"]', list, [], llm_provider=llm_provider)
+    assert actual_result == ["query"]
+    assert llm_provider.calls == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,95 @@
+""" Test Cases for VisitedUrls """
+
+import asyncio
+import copy
+import pickle
+
+import pytest
+
+from llm_analyst.core.visited_urls import VisitedUrls, canonicalize_url, normalize_url
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Example.com:443/Path/?utm_source=x&id=1#top") == (
+        "https://example.com/Path?id=1"
+    )
+    assert normalize_url("https://example.com/") == normalize_url("https://example.com")
+    assert normalize_url("http://example.com:8080/a") == "http://example.com:8080/a"
+
+
+def test_canonicalize_url():
+    assert canonicalize_url("http://www.Example.com/a/?utm_medium=x#intro") == (
+        "https://example.com/a"
+    )
+    assert canonicalize_url("https://example.com/a") == canonicalize_url(
+        "http://www.example.com/a/"
+    )
+    # Only the www. prefix of the host is dropped
+    assert canonicalize_url("https://docs.www.example.com") == "https://docs.www.example.com"
+    assert canonicalize_url("http://example.com:8080/a") == "https://example.com:8080/a"
+
+
+def test_visited_urls_order_and_membership():
+    visited_urls = VisitedUrls(["https://b.com", "https://a.com"])
+
+    new_urls = visited_urls.add_many(
+        ["http://www.b.com/", "https://c.com", "https://c.com#top", "https://d.com"]
+    )
+
+    assert new_urls == ["https://c.com", "https://d.com"]
+    assert list(visited_urls) == [
+        "https://b.com",
+        "https://a.com",
+        "https://c.com",
+        "https://d.com",
+    ]
+    assert len(visited_urls) == 4
+    assert "http://www.a.com/?utm_source=feed" in visited_urls
+    assert "https://e.com" not in visited_urls
+    assert visited_urls.add("https://e.com")
+    assert not visited_urls.add("https://e.com/")
+
+
+def test_visited_urls_missing_url():
+    visited_urls = VisitedUrls(["https://a.com", None])
+
+    # Search results without an href are skipped, as the list of visited URLs did
+    assert visited_urls.add_many(["https://b.com", None, ""]) == ["https://b.com"]
+    assert visited_urls == ["https://a.com", "https://b.com"]
+    assert None not in visited_urls
+    assert "" not in visited_urls
+
+
+def test_visited_urls_copy():
+    visited_urls = VisitedUrls(["https://a.com", "https://b.com"])
+
+    for copied_urls in (copy.deepcopy(visited_urls), pickle.loads(pickle.dumps(visited_urls))):
+        assert copied_urls == visited_urls
+        copied_urls.add("https://c.com")
+        assert "https://c.com" not in visited_urls
+
+
+@pytest.mark.asyncio
+async def test_visited_urls_concurrent_add():
+    visited_urls = VisitedUrls()
+    urls = [f"https://example.com/{index}" for index in range(200)]
+
+    async def keep_unique_urls(urls):
+        await asyncio.sleep(0)
+        return visited_urls.add_many(urls)
+
+    def add_in_thread(urls):
+        return visited_urls.add_many(urls)
+
+    new_urls = await asyncio.gather(
+        *[keep_unique_urls(urls) for _ in range(5)],
+        *[asyncio.to_thread(add_in_thread, urls[::-1]) for _ in range(5)],
+    )
+
+    # Every URL is new to exactly one of the callers
+    assert sorted(url for urls in new_urls for url in urls) == sorted(urls)
+    assert len(visited_urls) == len(urls)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
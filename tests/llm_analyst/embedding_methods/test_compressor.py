@@ -7,7 +7,8 @@ import logging
 from tests.utils_for_pytest import dump_test_results, get_resource_file_path
 import pytest
 
-from llm_analyst.embedding_methods.compressor import ContextCompressor
+from llm_analyst.embedding_methods.compressor import ContextCompressor, SnippetFilter
+from llm_analyst.embedding_methods.hash_embeddings import HashEmbeddings
 from llm_analyst.core.config import Config
 
 logger = logging.getLogger(__name__)
@@ -34,6 +35,30 @@ def test_context_compressor_get_context():
 
     dump_test_results(function_name, context, to_json=False)
 
+
+def test_snippet_filter_split():
+    query = "microplastics in marine ecosystems"
+    search_results = [
+        {"href": "https://relevant.com", "body": "Microplastics harm marine ecosystems and fish"},
+        {"href": "https://unrelated.com", "body": "Ten easy weeknight pasta recipes", "title": "Pasta"},
+        {"href": "https://no-snippet.com", "body": ""},
+    ]
+    snippet_filter = SnippetFilter(HashEmbeddings(), similarity_threshold=0.3)
+
+    results_to_scrape, snippet_pages = snippet_filter.split(query, search_results)
+    assert [result["href"] for result in results_to_scrape] == [
+        "https://relevant.com",
+        "https://no-snippet.com",
+    ]
+    assert snippet_pages == [
+        {
+            "url": "https://unrelated.com",
+            "title": "Pasta",
+            "raw_content": "Ten easy weeknight pasta recipes",
+        }
+    ]
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
     
\ No newline at end of file
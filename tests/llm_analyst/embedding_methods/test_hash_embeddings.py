@@ -0,0 +1,46 @@
+""" Test Cases for HashEmbeddings """
+
+import pytest
+
+from llm_analyst.core.config import Config
+from llm_analyst.embedding_methods.compressor import ContextCompressor
+from llm_analyst.embedding_methods.hash_embeddings import HashEmbeddings
+
+
+def cosine_similarity(vector_1, vector_2):
+    return sum(value_1 * value_2 for value_1, value_2 in zip(vector_1, vector_2))
+
+
+def test_hash_embeddings():
+    embeddings = HashEmbeddings()
+    query_vector = embeddings.embed_query("gene expression under stress")
+    similar_vector, other_vector = embeddings.embed_documents(
+        ["Stress changes gene expression", "The weather in Boston"]
+    )
+
+    assert len(query_vector) == embeddings.size
+    assert query_vector == embeddings.embed_query("gene expression under stress")
+    assert cosine_similarity(query_vector, similar_vector) > cosine_similarity(
+        query_vector, other_vector
+    )
+
+
+def test_hash_embeddings_context_compressor():
+    config = Config()
+    config.set_values_for_config({"embedding_provider": "hash"})
+    documents = [
+        {"url": "https://example.com/1", "raw_content": "Stress changes gene expression. " * 20},
+        {"url": "https://example.com/2", "raw_content": "The weather in Boston is cold. " * 20},
+    ]
+
+    context_compressor = ContextCompressor(
+        documents=documents, embeddings=config.embedding_provider
+    )
+    context = context_compressor.get_context("how does stress change gene expression", 5)
+
+    assert "https://example.com/1" in context
+    assert "https://example.com/2" not in context
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
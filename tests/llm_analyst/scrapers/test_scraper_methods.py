@@ -7,7 +7,7 @@ import pytest
 from llm_analyst.core.config import Config
 from llm_analyst.core.research_analyst import LLMAnalyst
 from llm_analyst.core.research_state import ResearchState
-from llm_analyst.scrapers.scraper_methods import scrape_urls,cell_selenium_scraper
+from llm_analyst.scrapers.scraper_methods import scrape_urls,cell_selenium_scraper,get_provided_pages
 from tests.utils_for_pytest import dump_test_results, get_resource_file_path
 
 CONFIG_PARAMS = {
@@ -52,5 +52,22 @@ def test_scraper_cell_selenium_scraper():
     #assert len(actual_result) > 0
     dump_test_results(function_name, actual_result)
 
+
+def test_get_provided_pages():
+    search_results = [
+        {"href": "https://provided.com", "body": "snippet", "raw_content": "page text " * 20},
+        {"href": "https://too-short.com", "body": "snippet", "raw_content": "page text"},
+        {"href": "https://snippet-only.com", "body": "snippet"},
+    ]
+
+    provided_pages, results_to_scrape = get_provided_pages(search_results)
+    assert provided_pages == [
+        {"url": "https://provided.com", "title": "", "raw_content": "page text " * 20}
+    ]
+    assert [result["href"] for result in results_to_scrape] == [
+        "https://too-short.com",
+        "https://snippet-only.com",
+    ]
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
@@ -0,0 +1,116 @@
+""" Test Cases for hedged_search """
+
+import os
+import time
+
+import pytest
+
+from llm_analyst.core.config import Config
+from llm_analyst.search_methods.hedged_search import MIN_LATENCY_SAMPLES, HedgedSearch
+from llm_analyst.search_methods.internet_search import ddg_search, fake_search
+from llm_analyst.utils import metrics
+
+
+def get_search_method(name, results, delay=0.0, error=None):
+    calls = []
+
+    def search_method(query, max_results=7, fallback=True):
+        calls.append({"query": query, "max_results": max_results, "fallback": fallback})
+        time.sleep(delay)
+        if error:
+            raise error
+        return [{"href": f"https://{name}.com/{index}", "body": query} for index in range(results)]
+
+    search_method.__name__ = name
+    search_method.calls = calls
+    return search_method
+
+
+def test_hedged_search_primary():
+    primary = get_search_method("primary", 3)
+    secondary = get_search_method("secondary", 3)
+    hedged_search = HedgedSearch([primary, secondary], initial_delay=1.0)
+
+    search_results = hedged_search("hedged", max_results=3)
+
+    assert hedged_search.__name__ == "primary+secondary"
+    assert [result["href"] for result in search_results][0] == "https://primary.com/0"
+    assert primary.calls == [{"query": "hedged", "max_results": 3, "fallback": False}]
+    assert secondary.calls == []
+
+
+def test_hedged_search_hedges_slow_primary():
+    primary = get_search_method("slow_primary", 3, delay=1.0)
+    secondary = get_search_method("fast_secondary", 3)
+    hedged_search = HedgedSearch([primary, secondary], initial_delay=0.05)
+    hedge_count = metrics.PROCESS_METRICS.get_counter(
+        "search_hedge_total", provider="fast_secondary", role="hedge"
+    )
+
+    start_time = time.perf_counter()
+    search_results = hedged_search("hedged", max_results=3)
+
+    assert time.perf_counter() - start_time < 0.5
+    assert search_results[0]["href"] == "https://fast_secondary.com/0"
+    assert len(primary.calls) == 1
+    assert (
+        metrics.PROCESS_METRICS.get_counter(
+            "search_hedge_total", provider="fast_secondary", role="hedge"
+        )
+        == hedge_count + 1
+    )
+
+
+def test_hedged_search_falls_through_failures():
+    failing = get_search_method("failing", 3, error=RuntimeError("rate limited"))
+    empty = get_search_method("empty", 0)
+    working = get_search_method("working", 2)
+    hedged_search = HedgedSearch([failing, empty, working], initial_delay=5.0)
+
+    start_time = time.perf_counter()
+    search_results = hedged_search("hedged")
+
+    # A failure or an empty answer calls the next provider without waiting for the hedge delay
+    assert time.perf_counter() - start_time < 1.0
+    assert [result["href"] for result in search_results] == [
+        "https://working.com/0",
+        "https://working.com/1",
+    ]
+
+
+def test_hedged_search_all_fail():
+    failing = get_search_method("failing_first", 3, error=RuntimeError("down"))
+    also_failing = get_search_method("failing_second", 3, error=RuntimeError("down"))
+    hedged_search = HedgedSearch([failing, also_failing])
+
+    assert hedged_search("hedged") == []
+
+
+def test_hedged_search_p95_delay():
+    primary = get_search_method("measured", 1)
+    hedged_search = HedgedSearch([primary], initial_delay=2.0)
+    assert hedged_search.get_hedge_delay(primary) == 2.0
+
+    for _ in range(MIN_LATENCY_SAMPLES):
+        hedged_search("hedged")
+
+    assert hedged_search.get_hedge_delay(primary) < 0.5
+
+
+def test_hedged_search_config():
+    os.environ.pop("LLM_ANALYST_CONFIG", None)
+    config = Config()
+
+    config.set_values_for_config({"internet_search": "fake_search"})
+    assert config.internet_search == fake_search
+
+    config.set_values_for_config({"internet_search": "fake_search, ddg_search"})
+    assert isinstance(config.internet_search, HedgedSearch)
+    assert config.internet_search.search_methods == [fake_search, ddg_search]
+
+    config.set_values_for_config({"internet_search": ["fake_search", "ddg_search"]})
+    assert config.internet_search.__name__ == "fake_search+ddg_search"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
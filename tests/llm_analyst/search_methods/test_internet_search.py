@@ -1,14 +1,20 @@
 """ Test Cases for internet_search """
 
 import inspect
+import json
 import os
+import threading
+import time
 
 import pytest
 
 from llm_analyst.core.config import Config
+from llm_analyst.search_methods import internet_search
 from llm_analyst.search_methods.internet_search import (bing_search,
                                                         ddg_search,
+                                                        fake_search,
                                                         google_search,
+                                                        search_many,
                                                         serp_api_search,
                                                         serper_search,
                                                         tavily_search)
@@ -90,5 +96,122 @@ def test_search_bing_search():
     assert 0 < len(actual_result) <= MAX_SEARCH_RESULTS
     dump_test_results(function_name, actual_result)
 
+
+def test_fake_search(monkeypatch):
+    monkeypatch.setenv("FAKE_SEARCH_URL", "http://127.0.0.1:9999")
+    setup_search_config("fake_search", fake_search)
+
+    actual_result = fake_search("research topic", max_results=MAX_SEARCH_RESULTS)
+
+    assert len(actual_result) == MAX_SEARCH_RESULTS
+    assert all(result["href"].startswith("http://127.0.0.1:9999/docs/") for result in actual_result)
+    assert actual_result == fake_search("research topic", max_results=MAX_SEARCH_RESULTS)
+
+
+def test_tavily_search_raw_content(monkeypatch):
+    import tavily
+
+    class FakeTavilyClient:
+        def __init__(self, api_key):
+            pass
+
+        def search(self, query, **kwargs):
+            assert kwargs["include_raw_content"] is True
+            return {
+                "results": [
+                    {"url": "https://a.com", "content": "snippet a", "raw_content": "page a"},
+                    {"url": "https://b.com", "content": "snippet b", "raw_content": None},
+                ]
+            }
+
+    monkeypatch.setenv("TAVILY_API_KEY", "tvly-test")
+    monkeypatch.setattr(tavily, "TavilyClient", FakeTavilyClient)
+
+    actual_result = tavily_search("raw content query", max_results=MAX_SEARCH_RESULTS)
+    assert actual_result == [
+        {"href": "https://a.com", "body": "snippet a", "raw_content": "page a"},
+        {"href": "https://b.com", "body": "snippet b"},
+    ]
+
+
+def test_search_many_fan_out():
+    threads = set()
+
+    def slow_search(query, max_results=7):
+        threads.add(threading.get_ident())
+        time.sleep(0.2)
+        return [{"href": f"https://{query}.com", "body": query}] * max_results
+
+    start_time = time.perf_counter()
+    actual_result = search_many(slow_search, ["a", "b", "c", "d"], max_results=2)
+
+    # The queries are searched concurrently and answered in order
+    assert time.perf_counter() - start_time < 0.6
+    assert len(threads) > 1
+    assert [results[0]["href"] for results in actual_result] == [
+        "https://a.com",
+        "https://b.com",
+        "https://c.com",
+        "https://d.com",
+    ]
+    assert all(len(results) == 2 for results in actual_result)
+    assert search_many(slow_search, []) == []
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.text = json.dumps(payload)
+
+    def raise_for_status(self):
+        pass
+
+
+def test_serper_search_many(monkeypatch):
+    posts = []
+
+    class FakeSession:
+        def post(self, url, timeout=None, headers=None, data=None):
+            searches = json.loads(data)
+            posts.append(searches)
+            return FakeResponse(
+                [
+                    {
+                        "organic": [
+                            {"title": "title", "link": f"https://{search['q']}.com", "snippet": search["q"]}
+                        ]
+                    }
+                    for search in searches
+                ]
+            )
+
+    monkeypatch.setenv("SERPER_API_KEY", "serper-test")
+    monkeypatch.setattr(internet_search, "_get_session", FakeSession)
+
+    actual_result = search_many(serper_search, ["query 1", "query 2"], max_results=3)
+
+    # One request for all the queries
+    assert posts == [[{"q": "query 1", "num": 3}, {"q": "query 2", "num": 3}]]
+    assert actual_result == [
+        [{"title": "title", "href": "https://query 1.com", "body": "query 1"}],
+        [{"title": "title", "href": "https://query 2.com", "body": "query 2"}],
+    ]
+
+
+def test_search_many_batch_failure(monkeypatch):
+    def search_method(query, max_results=7):
+        return [{"href": f"https://{query}.com", "body": query}]
+
+    def failing_search_many(queries, max_results=7):
+        raise RuntimeError("batch rejected")
+
+    search_method.search_many = failing_search_many
+
+    actual_result = search_many(search_method, ["a", "b"])
+    assert actual_result == [
+        [{"href": "https://a.com", "body": "a"}],
+        [{"href": "https://b.com", "body": "b"}],
+    ]
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,90 @@
+""" Import time benchmark for llm_analyst
+
+Runs the interpreter with `-X importtime` in a subprocess so that each test
+measures a cold import, the way a CLI or serverless invocation would see it.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tests.utils_for_pytest import dump_test_results
+
+# Optional backends that must only be loaded when a research run actually uses them
+LAZY_MODULES = [
+    "selenium",
+    "pyvirtualdisplay",
+    "arxiv",
+    "langchain_chroma",
+    "chromadb",
+    "sentence_transformers",
+    "weasyprint",
+    "htmldocx",
+    "docx",
+    "mistune",
+    "markdown",
+    "tavily",
+    "duckduckgo_search",
+    "unstructured",
+]
+
+# Cumulative import budget in microseconds, override with LLM_ANALYST_IMPORT_BUDGET_US
+IMPORT_BUDGET_US = int(os.getenv("LLM_ANALYST_IMPORT_BUDGET_US", "3000000"))
+
+
+def import_times(module_nm):
+    """Return [(module_name, nesting_level, cumulative_us)] for a cold import of module_nm"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_nm}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.getcwd(),
+    )
+    times = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, imported = line[len("import time:"):].split("|")
+        nesting_level = (len(imported) - len(imported.lstrip()) - 1) // 2
+        times.append((imported.strip(), nesting_level, int(cumulative)))
+    return times
+
+
+@pytest.mark.parametrize(
+    "module_nm",
+    [
+        "llm_analyst.core.research_analyst",
+        "llm_analyst.core.research_editor",
+        "llm_analyst.core.research_publisher",
+    ],
+)
+def test_import_time_no_optional_backends(module_nm):
+    times = import_times(module_nm)
+    loaded = sorted(
+        {name.split(".")[0] for name, _, _ in times if name.split(".")[0] in LAZY_MODULES}
+    )
+    assert not loaded, f"{module_nm} eagerly imports {loaded}"
+
+
+def test_import_time_budget():
+    module_nm = "llm_analyst.core.research_analyst"
+    times = import_times(module_nm)
+    # Top level llm_analyst imports include everything they pull in
+    total_us = sum(
+        us for name, level, us in times if level == 0 and name.startswith("llm_analyst")
+    )
+    slowest = sorted(
+        [(name, us) for name, level, us in times if level == 1],
+        key=lambda item: item[1],
+        reverse=True,
+    )[:15]
+    dump_test_results("test_import_time_budget", dict(slowest))
+
+    assert total_us < IMPORT_BUDGET_US, f"Import took {total_us}us, budget {IMPORT_BUDGET_US}us"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
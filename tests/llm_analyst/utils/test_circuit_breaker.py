@@ -0,0 +1,163 @@
+""" Test Cases for the search provider and scraped host circuit breakers """
+
+import json
+import time
+import urllib.request
+
+import pytest
+
+from llm_analyst.core.exceptions import LLMAnalystsException
+from llm_analyst.scrapers import scraper_methods
+from llm_analyst.search_methods.internet_search import search_provider
+from llm_analyst.utils import circuit_breaker, metrics
+from llm_analyst.utils.circuit_breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker,
+                                               CircuitOpenError)
+
+
+@pytest.fixture(autouse=True)
+def reset_breakers():
+    circuit_breaker.reset_circuit_breakers()
+    yield
+    circuit_breaker.reset_circuit_breakers()
+
+
+def fail(breaker, count):
+    for _ in range(count):
+        with pytest.raises(RuntimeError):
+            with breaker.track():
+                raise RuntimeError("rate limited")
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("search", "failing", failure_threshold=3, reset_timeout=60)
+
+    fail(breaker, 2)
+    assert breaker.state == CLOSED
+    fail(breaker, 1)
+    assert breaker.state == OPEN
+
+    assert not breaker.allow_request()
+    with pytest.raises(CircuitOpenError):
+        with breaker.track():
+            pass
+
+
+def test_breaker_opens_on_error_rate():
+    breaker = CircuitBreaker("search", "flaky", failure_threshold=100, min_calls=4)
+
+    for _ in range(2):
+        with breaker.track():
+            pass
+        fail(breaker, 1)
+
+    assert breaker.state == OPEN
+    status = breaker.status()
+    assert status["calls"] == 4
+    assert status["failures"] == 2
+    assert status["error_rate"] == 0.5
+    assert status["retry_in"] > 0
+
+
+def test_breaker_half_open_probe():
+    breaker = CircuitBreaker("scrape", "example.com", failure_threshold=1, reset_timeout=0.05)
+    fail(breaker, 1)
+    assert breaker.state == OPEN
+
+    time.sleep(0.1)
+    # One probe at a time while half open
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()
+    breaker.record_failure(0.1)
+    assert breaker.state == OPEN
+
+    time.sleep(0.1)
+    with breaker.track():
+        pass
+    assert breaker.state == CLOSED
+    assert breaker.status()["consecutive_failures"] == 0
+
+
+def test_search_provider_skips_open_circuit():
+    calls = []
+
+    def failing_search(query, max_results=7):
+        calls.append(query)
+        raise RuntimeError("429 Too Many Requests")
+
+    def fallback_search(query, max_results=7):
+        return [{"href": "https://fallback.com", "body": query}]
+
+    search_method = search_provider(fallback_method=fallback_search)(failing_search)
+
+    for _ in range(circuit_breaker.FAILURE_THRESHOLD):
+        assert search_method("query")[0]["href"] == "https://fallback.com"
+    assert len(calls) == circuit_breaker.FAILURE_THRESHOLD
+
+    # The circuit is open, the provider is not called again
+    assert search_method("query")[0]["href"] == "https://fallback.com"
+    assert len(calls) == circuit_breaker.FAILURE_THRESHOLD
+    with pytest.raises(CircuitOpenError):
+        search_method("query", fallback=False)
+
+    status = circuit_breaker.get_circuit_breaker_status("search")
+    assert status["search"]["failing_search"]["state"] == OPEN
+
+
+def test_search_provider_configuration_error():
+    def unconfigured_search(query, max_results=7):
+        raise LLMAnalystsException("API key not found")
+
+    search_method = search_provider(fallback_method=lambda query, max_results=7: [])(
+        unconfigured_search
+    )
+    for _ in range(circuit_breaker.FAILURE_THRESHOLD + 1):
+        with pytest.raises(LLMAnalystsException):
+            search_method("query")
+    assert circuit_breaker.get_circuit_breaker("search", "unconfigured_search").state == CLOSED
+
+
+def test_scrape_url_skips_failing_host(monkeypatch):
+    calls = []
+
+    def failing_scraper(link):
+        calls.append(link)
+        raise RuntimeError("503 Service Unavailable")
+
+    monkeypatch.setattr(scraper_methods, "web_scraper", failing_scraper)
+    for index in range(circuit_breaker.FAILURE_THRESHOLD + 2):
+        result = scraper_methods.scrape_url(f"https://down.example.com/page-{index}")
+        assert result["raw_content"] is None
+
+    assert len(calls) == circuit_breaker.FAILURE_THRESHOLD
+    status = circuit_breaker.get_circuit_breaker_status("scrape")["scrape"]["down.example.com"]
+    assert status["state"] == OPEN
+    assert status["failures"] == circuit_breaker.FAILURE_THRESHOLD
+
+
+def test_scrape_url_short_content_is_not_a_failure(monkeypatch):
+    monkeypatch.setattr(scraper_methods, "web_scraper", lambda link: "too short")
+    for index in range(circuit_breaker.FAILURE_THRESHOLD + 2):
+        result = scraper_methods.scrape_url(f"https://short.example.com/page-{index}")
+        assert result["raw_content"] is None
+
+    status = circuit_breaker.get_circuit_breaker_status("scrape")["scrape"]["short.example.com"]
+    assert status["state"] == CLOSED
+    assert status["failures"] == 0
+
+
+def test_circuit_breaker_server():
+    fail(circuit_breaker.get_circuit_breaker("search", "served"), 1)
+    server = metrics.serve_metrics(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/circuit_breakers"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            status = json.loads(response.read().decode("utf-8"))
+        assert status["search"]["served"]["failures"] == 1
+        assert status["search"]["served"]["state"] == CLOSED
+    finally:
+        metrics.stop_metrics_server()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
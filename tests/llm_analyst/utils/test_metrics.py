@@ -0,0 +1,112 @@
+""" Test Cases for the token, embedding, search and scrape metrics """
+
+import asyncio
+import urllib.request
+
+import pytest
+
+from llm_analyst.embedding_methods.compressor import MeteredEmbeddings
+from llm_analyst.utils import metrics
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[1.0, 0.0] for _ in texts]
+
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+
+def test_metrics_registry():
+    registry = metrics.MetricsRegistry()
+    registry.inc("llm_input_tokens_total", 120, model="gpt", prompt="choose_agent_prompt")
+    registry.inc("llm_input_tokens_total", 80, model="gpt", prompt="choose_agent_prompt")
+    registry.observe("llm_latency_seconds", 0.3, model="gpt")
+    registry.observe("llm_latency_seconds", 7.0, model="gpt")
+
+    assert registry.get_counter(
+        "llm_input_tokens_total", prompt="choose_agent_prompt", model="gpt"
+    ) == 200
+    histogram = registry.snapshot()["histograms"]["llm_latency_seconds"][0]
+    assert histogram["count"] == 2
+    assert histogram["buckets"]["0.5"] == 1
+    assert histogram["buckets"]["+Inf"] == 2
+
+
+def test_metrics_prometheus_format():
+    registry = metrics.MetricsRegistry()
+    registry.inc("search_queries_total", provider='quoted "provider"')
+    registry.observe("scrape_bytes", 5_000, metrics.SIZE_BUCKETS, scraper="web_scraper")
+    prometheus_text = registry.to_prometheus()
+
+    assert "# TYPE llm_analyst_search_queries_total counter" in prometheus_text
+    assert 'llm_analyst_search_queries_total{provider="quoted \\"provider\\""} 1' in prometheus_text
+    assert 'llm_analyst_scrape_bytes_bucket{scraper="web_scraper",le="10000"} 1' in prometheus_text
+    assert 'llm_analyst_scrape_bytes_count{scraper="web_scraper"} 1' in prometheus_text
+
+
+@pytest.mark.asyncio
+async def test_metrics_per_run():
+    async def research_run(run_id, tokens):
+        with metrics.use_run_metrics(run_id):
+            await asyncio.sleep(0.01)
+            metrics.record_llm_call("openai", "gpt", "research_report_prompt", tokens, 10, 0.1)
+
+    process_tokens = metrics.PROCESS_METRICS.get_counter(
+        "llm_input_tokens_total", provider="openai", model="gpt", prompt="research_report_prompt"
+    )
+    await asyncio.gather(research_run("run-a", 100), research_run("run-b", 300))
+
+    def get_input_tokens(run_id=None):
+        # Only the labels of process_tokens, other tests record tokens of other providers
+        labels = {"provider": "openai", "model": "gpt", "prompt": "research_report_prompt"}
+        samples = metrics.get_metrics(run_id)["counters"]["llm_input_tokens_total"]
+        return sum(sample["value"] for sample in samples if sample["labels"] == labels)
+
+    assert get_input_tokens("run-a") == 100
+    assert get_input_tokens("run-b") == 300
+    assert get_input_tokens() == process_tokens + 400
+    assert metrics.get_metrics("unknown-run") == {"counters": {}, "histograms": {}}
+
+
+@pytest.mark.asyncio
+async def test_metrics_run_does_not_leak():
+    async def research_run():
+        with metrics.use_run_metrics("run-c"):
+            metrics.inc("search_queries_total", provider="leak_test")
+
+    # Awaited directly the run shares the context of the caller, which gets its registry back
+    await research_run()
+    metrics.inc("search_queries_total", provider="leak_test")
+
+    run_samples = metrics.get_metrics("run-c")["counters"]["search_queries_total"]
+    assert [sample["value"] for sample in run_samples] == [1]
+
+
+def test_metered_embeddings():
+    embedding_chunks = metrics.PROCESS_METRICS.get_counter(
+        "embedding_chunks_total", provider="FakeEmbeddings"
+    )
+    embeddings = MeteredEmbeddings(FakeEmbeddings())
+    embeddings.embed_documents(["chunk 1", "chunk 2", "chunk 3"])
+    embeddings.embed_query("query")
+
+    assert metrics.PROCESS_METRICS.get_counter(
+        "embedding_chunks_total", provider="FakeEmbeddings"
+    ) == embedding_chunks + 4
+
+
+def test_metrics_server():
+    metrics.inc("search_queries_total", provider="test_provider")
+    server = metrics.serve_metrics(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            prometheus_text = response.read().decode("utf-8")
+        assert 'llm_analyst_search_queries_total{provider="test_provider"}' in prometheus_text
+    finally:
+        metrics.stop_metrics_server()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
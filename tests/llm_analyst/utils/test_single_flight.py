@@ -0,0 +1,119 @@
+""" Test Cases for SingleFlight """
+
+import asyncio
+import threading
+import time
+from concurrent.futures.thread import ThreadPoolExecutor
+
+import pytest
+
+from llm_analyst.utils.single_flight import SingleFlight, single_flight
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_coroutines():
+    flight = SingleFlight()
+    calls = []
+
+    async def make_call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "response"
+
+    actual_result = await asyncio.gather(
+        *[flight.ado("same prompt", make_call) for _ in range(5)]
+    )
+    assert actual_result == ["response"] * 5
+    assert len(calls) == 1
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_exception():
+    flight = SingleFlight()
+
+    async def make_call():
+        await asyncio.sleep(0.01)
+        raise ValueError("failed")
+
+    actual_result = await asyncio.gather(
+        *[flight.ado("key", make_call) for _ in range(3)], return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in actual_result)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_does_not_cache():
+    flight = SingleFlight()
+    calls = []
+
+    async def make_call():
+        calls.append(1)
+        return len(calls)
+
+    assert await flight.ado("key", make_call) == 1
+    assert await flight.ado("key", make_call) == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_retries_cancelled_leader():
+    flight = SingleFlight()
+    calls = []
+
+    async def make_call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "response"
+
+    leader = asyncio.create_task(flight.ado("key", make_call))
+    await asyncio.sleep(0)
+    followers = [asyncio.create_task(flight.ado("key", make_call)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    actual_result = await asyncio.gather(*followers)
+    assert actual_result == ["response"] * 3
+    assert leader.cancelled()
+    assert len(calls) == 2
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancelled_follower():
+    flight = SingleFlight()
+
+    async def make_call():
+        await asyncio.sleep(0.05)
+        return "response"
+
+    leader = asyncio.create_task(flight.ado("key", make_call))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.ado("key", make_call))
+    await asyncio.sleep(0.01)
+    follower.cancel()
+
+    assert await leader == "response"
+    assert follower.cancelled()
+
+
+def test_single_flight_coalesces_threads():
+    calls = []
+    lock = threading.Lock()
+
+    @single_flight
+    def search(query, max_results=5):
+        with lock:
+            calls.append(query)
+        time.sleep(0.05)
+        return [query] * max_results
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        actual_result = list(
+            executor.map(lambda query: search(query, max_results=2), ["a"] * 6 + ["b"] * 2)
+        )
+    assert actual_result == [["a", "a"]] * 6 + [["b", "b"]] * 2
+    assert sorted(calls) == ["a", "b"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,112 @@
+""" Test Cases for the tracing spans """
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from llm_analyst.utils.app_logging import trace_log
+from llm_analyst.utils.tracing import TRACER, current_span, span, to_chrome_trace, traced
+from tests.utils_for_pytest import OUTPUT_PATH
+
+
+@pytest.fixture
+def finished_spans():
+    finished_spans = []
+    TRACER.add_exporter(finished_spans.append)
+    yield finished_spans
+    TRACER.remove_exporter(finished_spans.append)
+
+
+@traced("fetch")
+async def fetch(query):
+    current_span().set_attribute("query", query)
+    await asyncio.sleep(0.05)
+    return query
+
+
+@pytest.mark.asyncio
+async def test_tracing_async_nesting(finished_spans):
+    with span("research", topic="topic") as research_span:
+        await asyncio.gather(fetch("query 1"), fetch("query 2"))
+
+    fetch_spans = [item for item in finished_spans if item.name == "fetch"]
+    assert len(fetch_spans) == 2
+    assert all(item.parent_id == research_span.span_id for item in fetch_spans)
+    assert all(item.trace_id == research_span.trace_id for item in fetch_spans)
+    assert all(item.duration_ms >= 50 for item in fetch_spans)
+    assert {item.attributes["query"] for item in fetch_spans} == {"query 1", "query 2"}
+    # The gathered fetches overlap, the parent covers both
+    assert research_span.duration_ms < 100
+
+
+@pytest.mark.asyncio
+async def test_tracing_to_thread_nesting(finished_spans):
+    @traced("blocking_call")
+    def blocking_call():
+        return current_span().span_id
+
+    with span("search") as search_span:
+        await asyncio.to_thread(blocking_call)
+
+    assert finished_spans[0].name == "blocking_call"
+    assert finished_spans[0].parent_id == search_span.span_id
+
+
+def test_tracing_error_status(finished_spans):
+    with pytest.raises(ValueError):
+        with span("scrape"):
+            raise ValueError("bad url")
+
+    assert finished_spans[0].status == "error"
+    assert "bad url" in finished_spans[0].error
+
+
+def test_tracing_disabled():
+    assert not TRACER.enabled
+    with span("search") as search_span:
+        search_span.set_attribute("query", "query")
+    assert current_span().span_id is None
+
+
+@pytest.mark.asyncio
+async def test_tracing_trace_file():
+    os.makedirs(OUTPUT_PATH, exist_ok=True)
+    trace_file = os.path.join(OUTPUT_PATH, "tst_trace.jsonl")
+    if os.path.exists(trace_file):
+        os.remove(trace_file)
+
+    TRACER.set_trace_file(trace_file)
+    try:
+        with span("research"):
+            await fetch("query 1")
+    finally:
+        TRACER.set_trace_file(None)
+
+    with open(trace_file, "r", encoding="utf-8") as file:
+        spans = [json.loads(line) for line in file]
+    assert [item["name"] for item in spans] == ["fetch", "research"]
+    assert spans[0]["parent_id"] == spans[1]["span_id"]
+
+    chrome_trace_file = to_chrome_trace(trace_file, os.path.join(OUTPUT_PATH, "tst_trace.json"))
+    with open(chrome_trace_file, "r", encoding="utf-8") as file:
+        trace_events = json.load(file)["traceEvents"]
+    assert {event["ph"] for event in trace_events} == {"X"}
+
+
+@pytest.mark.asyncio
+async def test_tracing_trace_log_coroutine(caplog):
+    @trace_log
+    async def write_report():
+        await asyncio.sleep(0)
+        return "report"
+
+    with caplog.at_level("DEBUG"):
+        assert await write_report() == "report"
+    messages = [record.getMessage() for record in caplog.records if "TRACE" in record.getMessage()]
+    assert messages == ["TRACE: Entering write_report", "TRACE: Exiting write_report"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])